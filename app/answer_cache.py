@@ -0,0 +1,132 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+
+class LRUCache:
+    """Thread-safe in-memory cache that evicts the least recently used entry."""
+
+    def __init__(self, max_entries: int = 1024) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, Any] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value for ``key``, or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache ``value`` under ``key``."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SemanticAnswerCache:
+    """Cache of generated answers looked up by question similarity.
+
+    Answers are grouped by scope: the set of document IDs the question was
+    answered against. A cached answer is reused when a new question's
+    embedding has cosine similarity of at least ``threshold`` with a cached
+    question in the same scope.
+
+    The scope is computed from the vector store's document list, which each
+    process caches for ``DOCUMENT_LIST_CACHE_TTL`` seconds. Adding or
+    deleting documents in this process calls :meth:`invalidate` and drops
+    the cached answers at once; after a change made by another process, an
+    answer for the old document set may still be served until this
+    process's document list expires.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        max_entries_per_scope: int = 1000,
+        max_scopes: int = 32,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries_per_scope = max_entries_per_scope
+        self.max_scopes = max_scopes
+        self.hits = 0
+        self.misses = 0
+        # scope -> (unit question vectors, answers), oldest scope first
+        self._scopes: OrderedDict[frozenset, tuple[List[np.ndarray], List[str]]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_scope(doc_ids: Iterable[str]) -> frozenset:
+        """Return the scope key for a set of document IDs."""
+        return frozenset(doc_ids)
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
+
+    def lookup(self, question_vector: List[float], scope: frozenset) -> Optional[str]:
+        """Return a cached answer for a sufficiently similar question, if any."""
+        with self._lock:
+            entries = self._scopes.get(scope)
+            if entries and entries[0]:
+                self._scopes.move_to_end(scope)
+                vectors, answers = entries
+                similarities = np.stack(vectors) @ self._unit(question_vector)
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self.hits += 1
+                    return answers[best]
+            self.misses += 1
+            return None
+
+    def store(self, question_vector: List[float], scope: frozenset, answer: str) -> None:
+        """Cache ``answer`` for the question embedded as ``question_vector``."""
+        with self._lock:
+            vectors, answers = self._scopes.setdefault(scope, ([], []))
+            self._scopes.move_to_end(scope)
+            vectors.append(self._unit(question_vector))
+            answers.append(answer)
+            if len(answers) > self.max_entries_per_scope:
+                del vectors[0], answers[0]
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+
+    def store_stream(
+        self, question_vector: List[float], scope: frozenset, tokens: Iterable[str]
+    ) -> Iterator[str]:
+        """Pass streamed ``tokens`` through and cache the full answer at the end."""
+        pieces = []
+        for token in tokens:
+            pieces.append(token)
+            yield token
+        self.store(question_vector, scope, "".join(pieces))
+
+    def invalidate(self) -> None:
+        """Drop every cached answer, e.g. after documents change."""
+        with self._lock:
+            self._scopes.clear()
+
+
+# Process-wide answer cache shared by the API and the Streamlit pages
+answer_cache = SemanticAnswerCache(
+    threshold=float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+)
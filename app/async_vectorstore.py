@@ -0,0 +1,668 @@
+import asyncio
+import inspect
+import math
+import os
+import time
+from collections.abc import Sized
+from typing import Any, Awaitable, Callable, Dict, Iterable, List
+
+from collection_config import (
+    SPARSE_VECTOR_NAME,
+    check_vector_size,
+    collection_params,
+    retrieval_mode,
+    search_params,
+)
+from dotenv import load_dotenv
+from metrics import EMBEDDED_TEXTS_TOTAL, EMBEDDING_SECONDS, QDRANT_SECONDS
+from qdrant_client import AsyncQdrantClient, models
+from tracing import span
+from vectorstore import (
+    INDEXED_PAYLOAD_FIELDS,
+    VectorStoreBase,
+    doc_ids_filter,
+    hybrid_query,
+    merge_embeddings,
+    point_id_for_chunk,
+    registry_point_id,
+    registry_points,
+    track_documents,
+    uncached_texts,
+)
+
+load_dotenv()
+
+
+class AsyncQdrantVectorStore(VectorStoreBase):
+    """Asyncio counterpart of ``QdrantVectorStore`` for the FastAPI service.
+
+    The method surface mirrors the synchronous store, but every network call
+    is awaited so a slow ingestion never blocks other requests on the event
+    loop. Call :meth:`initialize` once before use to create the collection.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the async Qdrant and OpenAI clients."""
+        self.qdrant_url = os.getenv("QDRANT_URL")
+        self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
+        self.collection_name = os.getenv("QDRANT_COLLECTION")
+        self.registry_collection_name = f"{self.collection_name}_documents"
+
+        if not self.qdrant_url:
+            raise ValueError("QDRANT_URL environment variable not set.")
+
+        # Initialize Async Qdrant Client
+        self.client = AsyncQdrantClient(
+            url=self.qdrant_url, api_key=self.qdrant_api_key, timeout=30.0
+        )
+        # Quantization rescoring and HNSW search settings (see collection_config)
+        self.search_params = search_params()
+
+        # The document list is reused by every /ask to scope the answer cache
+        self._init_state()
+        self._init_embedding()
+
+    async def initialize(self) -> None:
+        """Create the collection in Qdrant if it does not already exist."""
+        await self._init_collection()
+
+    async def _init_collection(self) -> None:
+        """Create the collection in Qdrant if it does not already exist."""
+        print("Initializing Qdrant collection (async)...")
+        try:
+            collections_response = await self.client.get_collections()
+            collection_names = [col.name for col in collections_response.collections]
+
+            if self.collection_name not in collection_names:
+                print(f"Creating Qdrant collection: {self.collection_name}")
+                await self.client.recreate_collection(
+                    collection_name=self.collection_name,
+                    **collection_params(self.embedder.dimension),
+                )
+                print(f"Collection {self.collection_name} created.")
+            else:
+                print(f"Collection {self.collection_name} already exists.")
+                check_vector_size(
+                    await self.client.get_collection(self.collection_name),
+                    self.embedder.dimension,
+                    self.collection_name,
+                )
+
+            # Also creates the indexes on collections from older versions
+            await self._ensure_payload_indexes()
+            await self._check_sparse_vectors()
+
+            if self.registry_collection_name not in collection_names:
+                print(
+                    f"Creating document registry collection: {self.registry_collection_name}"
+                )
+                await self.client.create_collection(
+                    collection_name=self.registry_collection_name,
+                    vectors_config={},
+                )
+                # Backfill the registry from chunks ingested before it existed
+                await self.rebuild_document_registry()
+
+        except Exception as e:
+            print(f"Error initializing Qdrant collection (async): {e}")
+            raise
+
+    async def _ensure_payload_indexes(self) -> None:
+        """Create keyword payload indexes for the filtered payload fields."""
+        collection_info = await self.client.get_collection(self.collection_name)
+        existing = collection_info.payload_schema or {}
+        for field_name in INDEXED_PAYLOAD_FIELDS:
+            if field_name not in existing:
+                print(f"Creating payload index on '{field_name}'...")
+                await self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                    wait=True,
+                )
+
+    async def _check_sparse_vectors(self) -> None:
+        """Enable BM25 vectors and hybrid search if the collection supports them."""
+        collection_info = await self.client.get_collection(self.collection_name)
+        sparse_vectors = collection_info.config.params.sparse_vectors or {}
+        self.sparse_enabled = SPARSE_VECTOR_NAME in sparse_vectors
+        self.hybrid_search = self.sparse_enabled and retrieval_mode() == "hybrid"
+        if not self.sparse_enabled:
+            print(
+                f"Warning: collection {self.collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vectors; using dense-only retrieval."
+            )
+
+    async def close(self) -> None:
+        """Close the underlying Qdrant client."""
+        await self.client.close()
+
+    async def embed_texts_openai(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for a list of texts with the configured embedder.
+
+        Texts already present in the embedding cache are served from disk;
+        only cache misses are sent to the API.
+        """
+        if not texts:
+            return []
+
+        cache = self.embedding_cache
+        if cache is None:
+            return await self._request_embeddings(texts)
+
+        cached = await asyncio.to_thread(cache.get_many, self.embedding_model, texts)
+        if len(cached) == len(texts):
+            return [cached[i] for i in range(len(texts))]
+
+        missing_texts = uncached_texts(texts, cached)
+        new_embeddings = await self._request_embeddings(missing_texts)
+        await asyncio.to_thread(
+            cache.put_many, self.embedding_model, missing_texts, new_embeddings
+        )
+        return merge_embeddings(texts, cached, missing_texts, new_embeddings)
+
+    async def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call the embedding backend for ``texts``."""
+        try:
+            with span("embedding.batch", texts=len(texts)), EMBEDDING_SECONDS.time():
+                embeddings = await self.embedder.aembed(texts)
+        except Exception as e:
+            print(f"Error getting embeddings (async) for {len(texts)} texts: {e}")
+            raise
+        EMBEDDED_TEXTS_TOTAL.inc(len(texts))
+        return embeddings
+
+    async def upsert(
+        self, embeddings: List[List[float]], metadata_list: List[Dict[str, Any]]
+    ) -> None:
+        """Store vectors and metadata in Qdrant.
+
+        Point IDs are derived from each chunk's ``chunk_id`` when present,
+        otherwise generated randomly. BM25 sparse vectors are computed from
+        the chunk text when the collection has them.
+        """
+        if not embeddings:
+            print("No embeddings provided to upsert.")
+            return
+
+        points = self._chunk_points(embeddings, metadata_list)
+        try:
+            with span("qdrant.upsert", points=len(points)), QDRANT_SECONDS.time(
+                operation="upsert"
+            ):
+                await self.client.upsert(
+                    collection_name=self.collection_name, points=points, wait=True
+                )
+        except Exception as e:
+            print(f"Error upserting {len(points)} points to Qdrant (async): {e}")
+            raise
+
+    async def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter_doc_ids: List[str] | None = None,
+        query_text: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Search the collection for vectors similar to ``query_vector``.
+
+        Args:
+            query_vector: Vector representation of the query.
+            top_k: Number of results to return.
+            filter_doc_ids: Optional list of document IDs to filter by.
+            query_text: The query itself, fused in via BM25 in hybrid mode.
+
+        Returns:
+            List[Dict[str, Any]]: Payloads from matching points.
+        """
+        search_filter = None
+        if filter_doc_ids:
+            print(f"Applying search filter for {len(filter_doc_ids)} doc IDs.")
+            search_filter = doc_ids_filter(filter_doc_ids)
+
+        try:
+            with span(
+                "qdrant.search", top_k=top_k, hybrid=bool(query_text and self.hybrid_search)
+            ), QDRANT_SECONDS.time(operation="search"):
+                if query_text and self.hybrid_search:
+                    response = await self.client.query_points(
+                        collection_name=self.collection_name,
+                        **hybrid_query(
+                            query_vector, query_text, top_k, search_filter, self.search_params
+                        ),
+                    )
+                    return [point.payload for point in response.points]
+
+                results = await self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    query_filter=search_filter,
+                    limit=top_k,
+                    search_params=self.search_params,
+                )
+                return [hit.payload for hit in results]
+        except Exception as e:
+            print(f"Error searching Qdrant (async): {e}")
+            raise
+
+    async def get_missing_chunks(
+        self, chunks: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """Return the chunks whose points are not yet stored in the collection."""
+        point_ids = [point_id_for_chunk(chunk) for chunk in chunks]
+        try:
+            existing = await self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=point_ids,
+                with_payload=False,
+                with_vectors=False,
+            )
+        except Exception as e:
+            print(f"Error checking existing points in Qdrant (async): {e}")
+            raise
+        existing_ids = {str(point.id) for point in existing}
+        return [
+            chunk
+            for chunk, point_id in zip(chunks, point_ids)
+            if point_id not in existing_ids
+        ]
+
+    async def embed_and_store_chunks(
+        self,
+        chunks: Iterable[Dict[str, str]],
+        batch_size: int = 128,
+        progress_bar=None,
+        max_concurrency: int | None = None,
+        resume: bool = False,
+        progress_callback: Callable[[int, int | None, int], Awaitable[None] | None]
+        | None = None,
+    ) -> int:
+        """Embed and store text chunks in concurrent batches.
+
+        At most ``max_concurrency`` embedding requests are in flight, and each
+        batch is upserted as soon as its embeddings arrive. Batches are pulled
+        from ``chunks`` in a worker thread as headroom frees up, so a lazily
+        chunked document is never held in memory in full. Processing stops
+        at the first failing batch; an error raised by ``chunks`` itself
+        propagates.
+
+        Args:
+            chunks: Chunk metadata dictionaries; a list or a lazy iterator
+                (e.g. from ``ingestion.stream_document``).
+            batch_size: Number of chunks to embed per batch.
+            progress_bar: Optional progress bar to update.
+            max_concurrency: Maximum number of embedding batches in flight.
+                Defaults to the ``EMBED_MAX_CONCURRENCY`` setting.
+            resume: Skip chunks whose points already exist, so a retried
+                ingestion only embeds and uploads the missing batches.
+            progress_callback: Optional function called after each batch
+                with the number of completed batches, the total number of
+                batches (None for an iterator) and the number of chunks
+                stored so far. A coroutine function is awaited, so it can
+                do blocking writes in a thread.
+
+        Returns:
+            int: Number of chunks stored (including those skipped on resume).
+        """
+        if isinstance(chunks, Sized) and not len(chunks):
+            print("No chunks provided to embed and store.")
+            return 0
+
+        if max_concurrency is None:
+            max_concurrency = self.embed_max_concurrency
+        max_concurrency = max(1, max_concurrency)
+
+        num_chunks = len(chunks) if isinstance(chunks, Sized) else None
+        num_batches = math.ceil(num_chunks / batch_size) if num_chunks else None
+        documents: Dict[str, Dict[str, Any]] = {}
+        batches = self._iter_batches(
+            track_documents(chunks, documents), batch_size
+        )
+        print(
+            f"Starting ASYNC embedding and storage for {num_chunks or 'streamed'} chunks in {num_batches or 'streamed'} batches (size: {batch_size}, concurrency: {max_concurrency})..."
+        )
+
+        embed_semaphore = asyncio.Semaphore(max_concurrency)
+        upsert_semaphore = asyncio.Semaphore(max_concurrency)
+        total_processed_chunks = 0
+        completed_batches = 0
+
+        async def process_batch(batch_num: int, batch: List[Dict[str, str]]) -> None:
+            nonlocal total_processed_chunks, completed_batches
+            async with embed_semaphore:
+                pending_chunks = batch
+                if resume:
+                    pending_chunks = await self.get_missing_chunks(batch)
+                    # Chunks skipped on resume are already stored
+                    total_processed_chunks += len(batch) - len(pending_chunks)
+                embeddings = await self.embed_texts_openai(
+                    [chunk["text"] for chunk in pending_chunks]
+                )
+            if embeddings:
+                async with upsert_semaphore:
+                    await self.upsert(embeddings, pending_chunks)
+                total_processed_chunks += len(pending_chunks)
+            elif pending_chunks:
+                print(
+                    f"Warning: Embedding returned empty for batch {batch_num}. Skipping upsert."
+                )
+            completed_batches += 1
+            if progress_callback:
+                reported = progress_callback(
+                    completed_batches, num_batches, total_processed_chunks
+                )
+                if inspect.isawaitable(reported):
+                    await reported
+            self._report_batch_progress(progress_bar, completed_batches, num_batches)
+
+        start_time = time.time()
+        # Batches waiting on the embedding semaphore are held in memory too
+        max_in_flight = 2 * max_concurrency
+        in_flight: set[asyncio.Task] = set()
+        batches_exhausted = False
+        total_chunks = 0
+        batch_num = 0
+        errors: List[BaseException] = []
+        try:
+            while not batches_exhausted or in_flight:
+                while not batches_exhausted and len(in_flight) < max_in_flight:
+                    # Pulling a batch may parse PDF pages; keep it off the event loop
+                    batch = await asyncio.to_thread(next, batches, None)
+                    if batch is None:
+                        batches_exhausted = True
+                        break
+                    batch_num += 1
+                    total_chunks += len(batch)
+                    in_flight.add(asyncio.create_task(process_batch(batch_num, batch)))
+
+                if not in_flight:
+                    continue
+
+                done, in_flight = await asyncio.wait(
+                    in_flight, return_when=asyncio.FIRST_COMPLETED
+                )
+                errors = [task.exception() for task in done if task.exception()]
+                if errors:
+                    break
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight, return_exceptions=True)
+
+        if errors:
+            print(f"Error processing batches: {errors[0]}")
+            if progress_bar:
+                progress_bar.progress(1.0, text="Error while embedding! Check logs.")
+
+        end_time = time.time()
+        print("-" * 30)
+        print(f"ASYNC processing complete in {end_time - start_time:.2f} seconds.")
+        print(
+            f"Successfully processed {total_processed_chunks}/{total_chunks} chunks across {batch_num} batches."
+        )
+        print("-" * 30)
+
+        if not errors and total_processed_chunks == total_chunks:
+            await self.register_documents(list(documents.values()))
+            if progress_bar:
+                progress_bar.progress(1.0, text="Embedding complete!")
+
+        return total_processed_chunks
+
+    async def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing recent embeddings of the same text."""
+        key = self._query_cache_key(query)
+        query_vector = self.query_embedding_cache.get(key)
+        if query_vector is None:
+            embeddings = await self.embed_texts_openai([query])
+            if not embeddings:
+                return []
+            query_vector = embeddings[0]
+            self.query_embedding_cache.put(key, query_vector)
+        return query_vector
+
+    async def embed_and_search(
+        self, query: str, top_k: int = 10, filter_doc_ids: List[str] | None = None
+    ) -> List[Dict[str, Any]]:
+        """Embed a query and search the collection.
+
+        Args:
+            query: The query text.
+            top_k: Number of results to return.
+            filter_doc_ids: Optional list of document IDs to filter by.
+
+        Returns:
+            List[Dict[str, Any]]: Payloads from matching points.
+        """
+        query_vector = await self.embed_query(query)
+        if not query_vector:
+            print("Warning: Failed to embed query.")
+            return []
+        # Pass the filter_doc_ids down to the search method
+        return await self.search(
+            query_vector, top_k=top_k, filter_doc_ids=filter_doc_ids, query_text=query
+        )
+
+    async def embed_queries(self, queries: List[str]) -> List[List[float]]:
+        """Embed several search queries with a single embedding request.
+
+        Queries found in the query embedding cache are not sent again.
+        """
+        keys = [self._query_cache_key(query) for query in queries]
+        vectors = [self.query_embedding_cache.get(key) for key in keys]
+        missing = list(
+            dict.fromkeys(query for query, vector in zip(queries, vectors) if vector is None)
+        )
+        if missing:
+            fresh = dict(zip(missing, await self.embed_texts_openai(missing)))
+            for i, query in enumerate(queries):
+                if vectors[i] is None:
+                    vectors[i] = fresh[query]
+                    self.query_embedding_cache.put(keys[i], vectors[i])
+        return vectors
+
+    async def search_batch(
+        self,
+        query_vectors: List[List[float]],
+        top_k: int = 5,
+        filter_doc_ids: List[str] | None = None,
+        query_texts: List[str] | None = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Run several searches in one Qdrant request.
+
+        Args:
+            query_vectors: Vector representation of each query.
+            top_k: Number of results to return per query.
+            filter_doc_ids: Optional list of document IDs to filter by.
+            query_texts: The queries themselves, fused in via BM25 in hybrid
+                mode.
+
+        Returns:
+            List[List[Dict[str, Any]]]: Payloads of the matches of each query,
+            in query order.
+        """
+        if not query_vectors:
+            return []
+        search_filter = doc_ids_filter(filter_doc_ids) if filter_doc_ids else None
+        if query_texts and self.hybrid_search:
+            requests = [
+                models.QueryRequest(
+                    **hybrid_query(vector, text, top_k, search_filter, self.search_params)
+                )
+                for vector, text in zip(query_vectors, query_texts)
+            ]
+        else:
+            requests = [
+                models.QueryRequest(
+                    query=vector,
+                    filter=search_filter,
+                    params=self.search_params,
+                    limit=top_k,
+                    with_payload=True,
+                )
+                for vector in query_vectors
+            ]
+        try:
+            with span("qdrant.search_batch", queries=len(requests)), QDRANT_SECONDS.time(
+                operation="search_batch"
+            ):
+                responses = await self.client.query_batch_points(
+                    collection_name=self.collection_name, requests=requests
+                )
+                return [[point.payload for point in response.points] for response in responses]
+        except Exception as e:
+            print(f"Error batch searching Qdrant (async): {e}")
+            raise
+
+    async def register_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Add or update entries in the document registry.
+
+        Args:
+            documents: Dictionaries with ``doc_id``, ``filename``,
+                ``file_hash`` and ``chunk_count`` keys.
+        """
+        if not documents:
+            return
+        points = registry_points(documents)
+        try:
+            await self.client.upsert(
+                collection_name=self.registry_collection_name, points=points, wait=True
+            )
+        except Exception as e:
+            print(f"Error registering {len(points)} documents (async): {e}")
+            raise
+        finally:
+            self.invalidate_document_cache()
+
+    async def get_document_registry(self) -> List[Dict[str, Any]]:
+        """Return the registry entry of every indexed document.
+
+        The list is cached for ``DOCUMENT_LIST_CACHE_TTL`` seconds; ingests
+        and deletes through this store invalidate it immediately.
+        """
+        documents, generation = self._document_cache.get()
+        if documents is None:
+            documents = await self._fetch_document_registry()
+            self._document_cache.put(documents, generation)
+        return list(documents)
+
+    async def _fetch_document_registry(self) -> List[Dict[str, Any]]:
+        """Scroll the registry collection."""
+        documents: List[Dict[str, Any]] = []
+        next_offset = None
+
+        try:
+            while True:
+                results, next_offset = await self.client.scroll(
+                    collection_name=self.registry_collection_name,
+                    limit=250,
+                    offset=next_offset,
+                    with_payload=True,
+                    with_vectors=False,
+                )
+                documents.extend(hit.payload for hit in results if hit.payload)
+
+                if not next_offset:
+                    break
+
+            return documents
+
+        except Exception as e:
+            print(f"Error fetching document registry: {e}")
+            raise
+
+    async def get_indexed_document_ids(self) -> List[str]:
+        """Return all unique document IDs stored in the collection."""
+        return [document["doc_id"] for document in await self.get_document_registry()]
+
+    async def get_indexed_documents(self) -> List[tuple[str, str]]:
+        """Return a list of document IDs and filenames stored in the collection."""
+        return [
+            (document["doc_id"], document.get("filename", "Unknown"))
+            for document in await self.get_document_registry()
+        ]
+
+    async def rebuild_document_registry(self) -> int:
+        """Rebuild the document registry by scrolling every chunk.
+
+        This is slow on large collections and is only meant for repairs.
+
+        Returns:
+            int: Number of documents registered.
+        """
+        documents: Dict[str, Dict[str, Any]] = {}
+        next_offset = None
+
+        print(f"Scanning all chunks in collection: {self.collection_name}...")
+        try:
+            while True:
+                results, next_offset = await self.client.scroll(
+                    collection_name=self.collection_name,
+                    limit=250,
+                    offset=next_offset,
+                    with_payload=["doc_id", "filename", "file_hash"],
+                    with_vectors=False,
+                )
+                for _ in track_documents((hit.payload or {} for hit in results), documents):
+                    pass
+
+                if not next_offset:
+                    break
+
+            await self.client.delete(
+                collection_name=self.registry_collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter()),
+                wait=True,
+            )
+        except Exception as e:
+            print(f"Error rebuilding document registry: {e}")
+            raise
+        finally:
+            self.invalidate_document_cache()
+
+        await self.register_documents(list(documents.values()))
+        print(f"Document registry rebuilt with {len(documents)} documents.")
+        return len(documents)
+
+    async def delete_documents_by_ids(self, doc_ids_to_delete: List[str]) -> None:
+        """Delete all points associated with the given document IDs.
+
+        Args:
+            doc_ids_to_delete: Document IDs whose chunks should be removed.
+        """
+        if not doc_ids_to_delete:
+            print("No document IDs provided for deletion.")
+            return
+
+        print(
+            f"Attempting to delete points for {len(doc_ids_to_delete)} document IDs..."
+        )
+        qdrant_filter = doc_ids_filter(doc_ids_to_delete)
+
+        try:
+            response = await self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=qdrant_filter,
+                wait=True,
+            )
+            print(f"Qdrant delete operation status: {response.status}")
+            await self.client.delete(
+                collection_name=self.registry_collection_name,
+                points_selector=models.PointIdsList(
+                    points=[registry_point_id(doc_id) for doc_id in doc_ids_to_delete]
+                ),
+                wait=True,
+            )
+            if response.status == models.UpdateStatus.COMPLETED:
+                print(
+                    f"Successfully deleted points for IDs: {', '.join(doc_ids_to_delete)}"
+                )
+            else:
+                print(
+                    f"Deletion might not be fully completed. Status: {response.status}"
+                )
+
+        except Exception as e:
+            print(f"Error deleting points from Qdrant (async): {e}")
+        finally:
+            self.invalidate_document_cache()
@@ -0,0 +1,156 @@
+import os
+from typing import Any, Dict
+
+from qdrant_client import models
+
+QUANTIZATION_MODES = ("none", "scalar", "binary")
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+# Name of the BM25 sparse vector stored next to the (unnamed) dense vector
+SPARSE_VECTOR_NAME = "bm25"
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or value == "":
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def quantization_mode() -> str:
+    """Return the quantization selected by ``QDRANT_QUANTIZATION``."""
+    mode = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(
+            f"Unknown QDRANT_QUANTIZATION: {mode} (expected one of {', '.join(QUANTIZATION_MODES)})"
+        )
+    return mode
+
+
+def quantization_config() -> Any:
+    """Return the Qdrant quantization config for the configured mode, or None.
+
+    Quantized vectors are always kept in RAM; with ``QDRANT_ON_DISK`` the
+    original float32 vectors move to disk and are only read for rescoring.
+    """
+    mode = quantization_mode()
+    if mode == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=float(os.getenv("QDRANT_SCALAR_QUANTILE", "0.99")),
+                always_ram=True,
+            )
+        )
+    if mode == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
+
+def retrieval_mode() -> str:
+    """Return the query mode selected by ``RETRIEVAL_MODE``."""
+    mode = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(
+            f"Unknown RETRIEVAL_MODE: {mode} (expected one of {', '.join(RETRIEVAL_MODES)})"
+        )
+    return mode
+
+
+def sparse_vectors_config() -> Dict[str, Any]:
+    """Return the sparse vector config; Qdrant applies the BM25 IDF weighting."""
+    return {SPARSE_VECTOR_NAME: models.SparseVectorParams(modifier=models.Modifier.IDF)}
+
+
+def hnsw_config() -> Any:
+    """Return the HNSW overrides from ``QDRANT_HNSW_M``/``QDRANT_HNSW_EF_CONSTRUCT``."""
+    m = _env_int("QDRANT_HNSW_M")
+    ef_construct = _env_int("QDRANT_HNSW_EF_CONSTRUCT")
+    if m is None and ef_construct is None:
+        return None
+    return models.HnswConfigDiff(m=m, ef_construct=ef_construct)
+
+
+def collection_params(dimension: int) -> Dict[str, Any]:
+    """Return the keyword arguments for creating the chunk collection.
+
+    Args:
+        dimension: Size of the embedding vectors.
+    """
+    return {
+        "vectors_config": models.VectorParams(
+            size=dimension,
+            distance=models.Distance.COSINE,
+            on_disk=_env_flag("QDRANT_ON_DISK"),
+        ),
+        "sparse_vectors_config": sparse_vectors_config(),
+        "hnsw_config": hnsw_config(),
+        "quantization_config": quantization_config(),
+    }
+
+
+def check_vector_size(collection_info: Any, dimension: int, collection_name: str) -> None:
+    """Raise ``ValueError`` if an existing collection's vectors are not ``dimension``-sized.
+
+    Args:
+        collection_info: Result of ``get_collection`` for the collection.
+        dimension: Output size of the configured embedder.
+        collection_name: Name used in the error message.
+    """
+    vectors = collection_info.config.params.vectors
+    # Collections created here use a single unnamed dense vector
+    if isinstance(vectors, dict):
+        vectors = vectors.get("")
+    size = getattr(vectors, "size", None)
+    if size is not None and size != dimension:
+        raise ValueError(
+            f"Collection {collection_name} holds {size}-dimensional vectors but the "
+            f"embedder produces {dimension}. Use a new QDRANT_COLLECTION or re-embed "
+            "the documents after changing EMBEDDING_BACKEND or EMBEDDING_MODEL."
+        )
+
+
+def collection_update_params() -> Dict[str, Any]:
+    """Return the keyword arguments for applying the configuration in place.
+
+    Used with ``QdrantClient.update_collection`` to migrate an existing
+    collection without re-embedding it. Setting ``QDRANT_QUANTIZATION=none``
+    removes existing quantization.
+    """
+    quantization = quantization_config()
+    return {
+        "vectors_config": {"": models.VectorParamsDiff(on_disk=_env_flag("QDRANT_ON_DISK"))},
+        "hnsw_config": hnsw_config(),
+        "quantization_config": quantization or models.Disabled.DISABLED,
+    }
+
+
+def search_params() -> Any:
+    """Return the search parameters matching the collection configuration.
+
+    With quantization enabled, candidates are searched on the quantized
+    vectors, oversampled by ``QDRANT_QUANTIZATION_OVERSAMPLING`` and rescored
+    with the original vectors unless ``QDRANT_QUANTIZATION_RESCORE`` is off.
+    ``QDRANT_HNSW_EF`` sets the search beam width.
+    """
+    hnsw_ef = _env_int("QDRANT_HNSW_EF")
+    quantization = None
+    mode = quantization_mode()
+    if mode != "none":
+        default_oversampling = "3.0" if mode == "binary" else "1.5"
+        quantization = models.QuantizationSearchParams(
+            rescore=_env_flag("QDRANT_QUANTIZATION_RESCORE", default=True),
+            oversampling=float(
+                os.getenv("QDRANT_QUANTIZATION_OVERSAMPLING", default_oversampling)
+            ),
+        )
+    if hnsw_ef is None and quantization is None:
+        return None
+    return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
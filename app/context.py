@@ -0,0 +1,150 @@
+import math
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+# Separator placed between context passages in the prompt
+CONTEXT_SEPARATOR = "\n\n---\n\n"
+
+# Longest chunk overlap looked for when merging adjacent chunks; a little
+# above the splitter's 150 characters since pieces are cut at separators
+MAX_OVERLAP_CHARS = 400
+
+
+@lru_cache(maxsize=1)
+def get_token_counter() -> Callable[[str], int]:
+    """Return a function counting the prompt tokens of a text.
+
+    Uses the Hugging Face tokenizer at ``CONTEXT_TOKENIZER_PATH`` (e.g. the
+    ``tokenizer.json`` of the Groq model) if set, else ``tiktoken``'s
+    ``cl100k_base`` if installed, else an estimate of four characters per
+    token.
+    """
+    tokenizer_path = os.getenv("CONTEXT_TOKENIZER_PATH")
+    if tokenizer_path:
+        from tokenizers import Tokenizer
+
+        tokenizer = Tokenizer.from_file(tokenizer_path)
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False).ids)
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: math.ceil(len(text) / 4)
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _chunk_index(chunk: Dict[str, Any]) -> Optional[int]:
+    """Return the position of a chunk within its document, if known."""
+    chunk_id = chunk.get("chunk_id") or ""
+    _, _, index = chunk_id.rpartition("_")
+    return int(index) if index.isdigit() else None
+
+
+def _overlap(left: str, right: str) -> int:
+    """Return the length of the longest suffix of ``left`` that starts ``right``."""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), 0, -1):
+        if left.endswith(right[:size]):
+            return size
+    return 0
+
+
+def merge_chunks(chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Deduplicate retrieved chunks and merge consecutive chunks of a document.
+
+    Chunks that follow each other in the same document are joined into one
+    passage with their shared overlap included only once. Passages keep the
+    order of their best-ranked chunk.
+
+    Args:
+        chunks: Retrieved chunk payloads, most relevant first.
+
+    Returns:
+        List[Dict[str, Any]]: Passages with ``text``, ``doc_id``,
+        ``filename``, ``page_start`` and ``page_end``.
+    """
+    seen_texts = set()
+    # (rank, doc_id, chunk index, chunk) of each distinct chunk
+    ranked = []
+    for rank, chunk in enumerate(chunks):
+        text = chunk.get("text", "")
+        if not text.strip() or text in seen_texts:
+            continue
+        seen_texts.add(text)
+        ranked.append((rank, chunk.get("doc_id"), _chunk_index(chunk), chunk))
+
+    passages: List[Dict[str, Any]] = []
+    ranks: List[int] = []
+    previous = None
+    for rank, doc_id, index, chunk in sorted(
+        ranked, key=lambda r: (str(r[1]), r[2] if r[2] is not None else -1, r[0])
+    ):
+        is_next = (
+            previous is not None
+            and index is not None
+            and previous[1] == doc_id
+            and previous[2] is not None
+            and index == previous[2] + 1
+        )
+        if is_next:
+            passage = passages[-1]
+            text = chunk["text"]
+            overlap = _overlap(passage["text"], text)
+            passage["text"] += text[overlap:] if overlap else "\n" + text
+            passage["page_end"] = chunk.get("page_end", passage.get("page_end"))
+            ranks[-1] = min(ranks[-1], rank)
+        else:
+            passages.append(
+                {
+                    "text": chunk["text"],
+                    "doc_id": doc_id,
+                    "filename": chunk.get("filename"),
+                    "page_start": chunk.get("page_start"),
+                    "page_end": chunk.get("page_end"),
+                }
+            )
+            ranks.append(rank)
+        previous = (rank, doc_id, index)
+
+    return [passage for _, passage in sorted(zip(ranks, passages), key=lambda p: p[0])]
+
+
+def build_context(
+    chunks: List[Dict[str, Any]], token_budget: Optional[int] = None
+) -> str:
+    """Assemble the prompt context from retrieved chunks within a token budget.
+
+    Passages from :func:`merge_chunks` are added in relevance order while
+    they fit; ones that do not fit are skipped in favour of smaller, less
+    relevant ones. If not even the most relevant passage fits, it is
+    truncated to the budget.
+
+    Args:
+        chunks: Retrieved chunk payloads, most relevant first.
+        token_budget: Maximum context tokens. Defaults to the
+            ``CONTEXT_TOKEN_BUDGET`` setting.
+
+    Returns:
+        str: The passages joined by ``CONTEXT_SEPARATOR``.
+    """
+    if token_budget is None:
+        token_budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+    count_tokens = get_token_counter()
+    separator_tokens = count_tokens(CONTEXT_SEPARATOR)
+
+    selected: List[str] = []
+    used = 0
+    for passage in merge_chunks(chunks):
+        text = passage["text"]
+        cost = count_tokens(text) + (separator_tokens if selected else 0)
+        if used + cost <= token_budget:
+            selected.append(text)
+            used += cost
+        elif not selected:
+            # Shrink proportionally until the top passage fits
+            while text and count_tokens(text) > token_budget:
+                text = text[: int(len(text) * token_budget / count_tokens(text) * 0.95)]
+            if text:
+                selected.append(text)
+                used += count_tokens(text)
+    return CONTEXT_SEPARATOR.join(selected)
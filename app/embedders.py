@@ -0,0 +1,355 @@
+import asyncio
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List
+
+import numpy as np
+from metrics import EMBEDDING_TOKENS_TOTAL, UPSTREAM_RETRIES_TOTAL
+from rate_limit import RateLimiter, backoff_delay, is_transient, retry_after
+
+
+class Embedder:
+    """Interface for the text embedding backends used by the vector stores.
+
+    Subclasses set ``model_name`` (used to key the embedding cache) and
+    ``dimension`` (used to size the Qdrant collection) and implement
+    :meth:`embed`.
+    """
+
+    model_name: str
+    dimension: int
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        """Return one embedding per text."""
+        raise NotImplementedError
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """Async variant of :meth:`embed`; runs it in a worker thread by default."""
+        return await asyncio.to_thread(self.embed, texts)
+
+
+def _token_counter() -> Callable[[str], int]:
+    """Return a function estimating the OpenAI tokens of a text.
+
+    Uses ``tiktoken`` if installed, otherwise a conservative three
+    characters per token.
+    """
+    try:
+        import tiktoken
+    except ImportError:
+        return lambda text: len(text) // 3 + 1
+    encoding = tiktoken.get_encoding("cl100k_base")
+    return lambda text: len(encoding.encode(text, disallowed_special=()))
+
+
+def _files_digest(paths: List[str], extra: str = "") -> str:
+    """Return a SHA-256 hex digest of the contents of ``paths`` and ``extra``."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    digest.update(extra.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class OpenAIEmbedder(Embedder):
+    """Embeddings from the OpenAI API.
+
+    Texts are grouped into requests by estimated token count, and requests
+    are paced by a :class:`RateLimiter` for the account's requests and
+    tokens per minute, shared by every thread and coroutine using this
+    embedder. Rate-limit (429), server (5xx) and connection errors are
+    retried with exponential backoff and jitter; a batch rejected as too
+    large is split in half and retried.
+    """
+
+    # Output sizes of the OpenAI embedding models
+    DIMENSIONS = {
+        "text-embedding-3-small": 1536,
+        "text-embedding-3-large": 3072,
+        "text-embedding-ada-002": 1536,
+    }
+
+    # Most inputs the API accepts in one request
+    MAX_BATCH_INPUTS = 2048
+
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "text-embedding-3-small",
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_batch_tokens: int = 100_000,
+        max_retries: int = 6,
+    ) -> None:
+        """Create the API clients.
+
+        Args:
+            api_key: OpenAI API key.
+            model_name: Embedding model to use.
+            requests_per_minute: Request rate limit; None disables it.
+            tokens_per_minute: Token rate limit; None disables it.
+            max_batch_tokens: Maximum estimated tokens per request.
+            max_retries: Retries of a request after transient errors.
+        """
+        import openai
+
+        if model_name not in self.DIMENSIONS:
+            raise ValueError(f"Unknown OpenAI embedding model: {model_name}")
+        self.model_name = model_name
+        self.dimension = self.DIMENSIONS[model_name]
+        # Retries are handled here, in step with the rate limiter
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+        self.async_client = openai.AsyncOpenAI(api_key=api_key, max_retries=0)
+        self._connection_errors = (openai.APIConnectionError,)
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        self.count_tokens = _token_counter()
+
+    def _token_batches(self, texts: List[str]) -> List[List[str]]:
+        """Group ``texts`` into requests of at most ``max_batch_tokens`` tokens."""
+        batches: List[List[str]] = []
+        batch: List[str] = []
+        batch_tokens = 0
+        for text in texts:
+            tokens = self.count_tokens(text)
+            if batch and (
+                batch_tokens + tokens > self.max_batch_tokens
+                or len(batch) >= self.MAX_BATCH_INPUTS
+            ):
+                batches.append(batch)
+                batch, batch_tokens = [], 0
+            batch.append(text)
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    @staticmethod
+    def _is_oversize(error: Exception) -> bool:
+        """Return True if the request was rejected for having too many tokens or inputs."""
+        if getattr(error, "status_code", None) not in (400, 413):
+            return False
+        message = str(error).lower()
+        return any(
+            marker in message
+            for marker in ("maximum context length", "too many", "too large", "max", "exceed")
+        )
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float | None:
+        """Return the delay before retrying after ``error``, or None to give up."""
+        if attempt >= self.max_retries or not is_transient(error, self._connection_errors):
+            return None
+        delay = backoff_delay(attempt, retry_after=retry_after(error))
+        UPSTREAM_RETRIES_TOTAL.inc(service="embedding")
+        print(
+            f"Embedding request failed ({error}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s."
+        )
+        return delay
+
+    @staticmethod
+    def _record_usage(response) -> None:
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            EMBEDDING_TOKENS_TOTAL.inc(usage.total_tokens)
+
+    def _request(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(self.count_tokens(text) for text in texts)
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire(tokens)
+            try:
+                response = self.client.embeddings.create(model=self.model_name, input=texts)
+                self._record_usage(response)
+                return [d.embedding for d in response.data]
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return self._request(texts)
+        except Exception as e:
+            if len(texts) > 1 and self._is_oversize(e):
+                middle = len(texts) // 2
+                print(f"Embedding batch of {len(texts)} texts too large; splitting it.")
+                return self._embed_batch(texts[:middle]) + self._embed_batch(texts[middle:])
+            raise
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        embeddings: List[List[float]] = []
+        for batch in self._token_batches(texts):
+            embeddings.extend(self._embed_batch(batch))
+        return embeddings
+
+    async def _arequest(self, texts: List[str]) -> List[List[float]]:
+        tokens = sum(self.count_tokens(text) for text in texts)
+        attempt = 0
+        while True:
+            await self.rate_limiter.aacquire(tokens)
+            try:
+                response = await self.async_client.embeddings.create(
+                    model=self.model_name, input=texts
+                )
+                self._record_usage(response)
+                return [d.embedding for d in response.data]
+            except Exception as e:
+                delay = self._retry_delay(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def _aembed_batch(self, texts: List[str]) -> List[List[float]]:
+        try:
+            return await self._arequest(texts)
+        except Exception as e:
+            if len(texts) > 1 and self._is_oversize(e):
+                middle = len(texts) // 2
+                print(f"Embedding batch of {len(texts)} texts too large; splitting it.")
+                return await self._aembed_batch(texts[:middle]) + await self._aembed_batch(
+                    texts[middle:]
+                )
+            raise
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        embeddings: List[List[float]] = []
+        for batch in self._token_batches(texts):
+            embeddings.extend(await self._aembed_batch(batch))
+        return embeddings
+
+
+class OnnxEmbedder(Embedder):
+    """Local CPU embeddings from an ONNX sentence-embedding model.
+
+    Works with exported sentence-transformers models such as
+    ``all-MiniLM-L6-v2``: token embeddings are mean-pooled over the attention
+    mask and L2-normalized. Batches are run through a thread pool, as ONNX
+    Runtime releases the GIL during inference.
+    """
+
+    def __init__(
+        self,
+        model_path: str,
+        tokenizer_path: str,
+        batch_size: int = 32,
+        max_workers: int | None = None,
+        max_length: int = 256,
+    ) -> None:
+        """Load the model and tokenizer.
+
+        Args:
+            model_path: Path to the ``.onnx`` model file.
+            tokenizer_path: Path to the model's ``tokenizer.json``.
+            batch_size: Number of texts per inference call.
+            max_workers: Threads running inference batches concurrently.
+            max_length: Maximum number of tokens per text.
+        """
+        try:
+            import onnxruntime
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise ImportError(
+                "The ONNX embedding backend requires the 'onnxruntime' and 'tokenizers' packages."
+            ) from e
+
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+
+        session_options = onnxruntime.SessionOptions()
+        # Parallelism comes from the thread pool, one intra-op thread per batch
+        session_options.intra_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path,
+            sess_options=session_options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            thread_name_prefix="onnx-embed",
+        )
+        self.dimension = len(self._embed_batch(["dimension probe"])[0])
+        # Exports are almost always named model.onnx, so key the embedding
+        # cache on the model and tokenizer contents rather than the file name
+        fingerprint = _files_digest([model_path, tokenizer_path], f"max_length={max_length}")
+        self.model_name = (
+            f"onnx:{os.path.basename(model_path)}:{fingerprint[:16]}:{self.dimension}"
+        )
+
+    @staticmethod
+    def _mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        """Average token embeddings over the attention mask and L2-normalize."""
+        mask = attention_mask[..., np.newaxis].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.clip(norms, 1e-12, None)
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        encodings = self.tokenizer.encode_batch(texts)
+        inputs = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array(
+                [e.attention_mask for e in encodings], dtype=np.int64
+            ),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        outputs = self.session.run(
+            None, {name: value for name, value in inputs.items() if name in self.input_names}
+        )
+        return self._mean_pool(outputs[0], inputs["attention_mask"]).tolist()
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        batches = [
+            texts[start : start + self.batch_size]
+            for start in range(0, len(texts), self.batch_size)
+        ]
+        embeddings: List[List[float]] = []
+        for batch_embeddings in self.executor.map(self._embed_batch, batches):
+            embeddings.extend(batch_embeddings)
+        return embeddings
+
+
+def get_embedder() -> Embedder:
+    """Create the embedder selected by the ``EMBEDDING_BACKEND`` setting.
+
+    ``openai`` (the default) uses ``OPENAI_API_KEY`` and ``EMBEDDING_MODEL``,
+    rate-limited by ``EMBED_REQUESTS_PER_MINUTE`` and ``EMBED_TOKENS_PER_MINUTE``;
+    ``onnx`` uses ``ONNX_MODEL_PATH`` and ``ONNX_TOKENIZER_PATH``.
+    """
+    backend = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+    if backend == "openai":
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            raise ValueError("OPENAI_API_KEY environment variable not set.")
+        return OpenAIEmbedder(
+            api_key,
+            model_name=os.getenv("EMBEDDING_MODEL", "text-embedding-3-small"),
+            requests_per_minute=float(os.getenv("EMBED_REQUESTS_PER_MINUTE", "3000")),
+            tokens_per_minute=float(os.getenv("EMBED_TOKENS_PER_MINUTE", "1000000")),
+            max_batch_tokens=int(os.getenv("EMBED_MAX_BATCH_TOKENS", "100000")),
+            max_retries=int(os.getenv("EMBED_MAX_RETRIES", "6")),
+        )
+    if backend == "onnx":
+        model_path = os.getenv("ONNX_MODEL_PATH")
+        tokenizer_path = os.getenv("ONNX_TOKENIZER_PATH")
+        if not model_path or not tokenizer_path:
+            raise ValueError(
+                "ONNX_MODEL_PATH and ONNX_TOKENIZER_PATH environment variables must be set."
+            )
+        return OnnxEmbedder(
+            model_path,
+            tokenizer_path,
+            batch_size=int(os.getenv("ONNX_BATCH_SIZE", "32")),
+        )
+    raise ValueError(f"Unknown EMBEDDING_BACKEND: {backend}")
@@ -0,0 +1,169 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from array import array
+from typing import Dict, List
+
+
+class EmbeddingCache:
+    """Persistent, content-addressed cache of text embeddings backed by SQLite.
+
+    Entries are keyed by a hash of the embedding model name and the exact
+    chunk text. The cache holds at most ``max_entries`` vectors; when it
+    grows past that the least recently used entries are evicted.
+
+    Several processes may share the database, so the entry count kept by
+    :meth:`put_many` is only an estimate: it is re-read from the table every
+    ``RECOUNT_INTERVAL`` inserts and before evicting. Cache hits record
+    their access time in memory; the times are written in batches, at the
+    latest every ``ACCESS_FLUSH_INTERVAL`` seconds and before evicting.
+    """
+
+    RECOUNT_INTERVAL = 1000
+    ACCESS_FLUSH_INTERVAL = 30.0
+    ACCESS_FLUSH_SIZE = 1000
+
+    def __init__(self, path: str, max_entries: int = 200_000) -> None:
+        """Open (or create) the cache database at ``path``.
+
+        Args:
+            path: Location of the SQLite database file.
+            max_entries: Maximum number of embeddings kept on disk.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                vector BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings (last_access)"
+        )
+        self._conn.commit()
+        self._recount()
+        # Last access times of cache hits not yet written to the table
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+
+    def _recount(self) -> None:
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._inserts_since_count = 0
+
+    def _flush_access_times(self) -> None:
+        """Write the buffered last access times; the caller holds the lock and commits."""
+        if self._pending_access:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(last_access, key) for key, last_access in self._pending_access.items()],
+            )
+            self._pending_access = {}
+        self._last_access_flush = time.monotonic()
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Return the cache key for ``text`` embedded with ``model``."""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> Dict[int, List[float]]:
+        """Look up cached embeddings for ``texts``.
+
+        Returns:
+            Dict[int, List[float]]: Mapping of input positions to the cached
+            embedding for every text that was found.
+        """
+        keys = [self.make_key(model, text) for text in texts]
+        found: Dict[str, List[float]] = {}
+        unique_keys = list(dict.fromkeys(keys))
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(unique_keys), 500):
+                key_batch = unique_keys[start : start + 500]
+                placeholders = ",".join("?" * len(key_batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})",
+                    key_batch,
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                self._pending_access.update((key, now) for key in found)
+                if (
+                    len(self._pending_access) >= self.ACCESS_FLUSH_SIZE
+                    or time.monotonic() - self._last_access_flush
+                    >= self.ACCESS_FLUSH_INTERVAL
+                ):
+                    self._flush_access_times()
+                    self._conn.commit()
+            results = {i: found[key] for i, key in enumerate(keys) if key in found}
+            self.hits += len(results)
+            self.misses += len(texts) - len(results)
+        return results
+
+    def put_many(
+        self, model: str, texts: List[str], embeddings: List[List[float]]
+    ) -> None:
+        """Store ``embeddings`` for ``texts`` and evict old entries if needed."""
+        if not texts:
+            return
+        now = time.time()
+        rows = [
+            (self.make_key(model, text), array("f", embedding).tobytes(), now)
+            for text, embedding in zip(texts, embeddings)
+        ]
+        with self._lock:
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)",
+                rows,
+            ).rowcount
+            if inserted < len(rows):
+                # Refresh entries that were already cached
+                self._conn.executemany(
+                    "UPDATE embeddings SET vector = ?, last_access = ? WHERE key = ?",
+                    [(vector, last_access, key) for key, vector, last_access in rows],
+                )
+            self._count += inserted
+            self._inserts_since_count += inserted
+            if (
+                self._count > self.max_entries
+                or self._inserts_since_count >= self.RECOUNT_INTERVAL
+            ):
+                # Other processes may have inserted or evicted entries too
+                self._recount()
+            if self._count > self.max_entries:
+                # Evict by up-to-date access times
+                self._flush_access_times()
+                evicted = self._conn.execute(
+                    """
+                    DELETE FROM embeddings WHERE key IN (
+                        SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?
+                    )
+                    """,
+                    (self._count - self.max_entries,),
+                ).rowcount
+                self._count -= evicted
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return count
+
+    def close(self) -> None:
+        """Write the buffered access times and close the database connection."""
+        with self._lock:
+            self._flush_access_times()
+            self._conn.commit()
+            self._conn.close()
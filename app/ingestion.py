@@ -1,24 +1,222 @@
 import hashlib
+import multiprocessing
+import os
+import time
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Union
-from uuid import uuid4
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+from uuid import NAMESPACE_URL, uuid4, uuid5
 
-import pymupdf
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from metrics import (
+    CHUNKING_SECONDS,
+    CHUNKS_TOTAL,
+    PDF_EXTRACTION_SECONDS,
+    PDF_PAGES_TOTAL,
+)
+from tracing import span
 
+# pymupdf and the langchain splitter are slow to import, so they are
+# imported on first use (see _pymupdf) to keep startup fast
+pymupdf = None
+
+# Documents shorter than this many pages per worker are extracted in-process,
+# since starting a process pool costs more than it saves.
+MIN_PAGES_PER_WORKER = 50
+
+# Extraction runs from threaded processes (API job workers, Streamlit script
+# threads, embedding pools); forking those can copy held locks into the child
+# and deadlock it, so workers are started from a clean process instead.
+EXTRACTION_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# Namespace for document IDs derived from file hashes
+DOC_ID_NAMESPACE = uuid5(NAMESPACE_URL, "fin-know/documents")
+
+
+def _pymupdf():
+    """Return the pymupdf module, importing it on first use."""
+    global pymupdf
+    if pymupdf is None:
+        import pymupdf as module
+
+        pymupdf = module
+    return pymupdf
+
+
+# PDF bytes shared with each extraction worker process
+_worker_pdf_bytes: Optional[bytes] = None
+
+
+def _init_extraction_worker(pdf_bytes: bytes) -> None:
+    global _worker_pdf_bytes
+    _worker_pdf_bytes = pdf_bytes
 
-def process_document(file: Union[str, Path, object]) -> dict:
-    """Process a PDF document and return chunk metadata.
+
+def _extract_page_range(start: int, end: int) -> List[str]:
+    """Extract the text of pages ``start`` to ``end`` in a worker process."""
+    pdf = _pymupdf().open(stream=_worker_pdf_bytes, filetype="pdf")
+    try:
+        return [pdf.load_page(page_num).get_text("text") for page_num in range(start, end)]
+    finally:
+        pdf.close()
+
+
+def iter_page_texts(
+    pdf, pdf_bytes: Optional[bytes], max_workers: Optional[int] = None
+) -> Iterator[str]:
+    """Yield the text of every page of ``pdf`` in page order.
+
+    Large documents are split into page ranges that are extracted in a
+    process pool, each worker opening its own copy of the PDF from
+    ``pdf_bytes``.
 
     Args:
-        file: Path to the PDF or an uploaded file-like object.
+        pdf: Opened pymupdf document.
+        pdf_bytes: Raw PDF contents, required for parallel extraction.
+        max_workers: Number of extraction processes. Defaults to the
+            ``PDF_EXTRACT_WORKERS`` setting, or the CPU count.
+    """
+    num_pages = len(pdf)
+    if max_workers is None:
+        max_workers = int(os.getenv("PDF_EXTRACT_WORKERS", "0")) or os.cpu_count() or 1
+    max_workers = min(max_workers, num_pages // MIN_PAGES_PER_WORKER)
+
+    if max_workers <= 1 or not pdf_bytes:
+        for page_num in range(num_pages):
+            yield pdf.load_page(page_num).get_text("text")
+        return
+
+    # Several ranges per worker so that slow pages do not leave cores idle
+    num_ranges = max_workers * 4
+    range_size = -(-num_pages // num_ranges)
+    starts = list(range(0, num_pages, range_size))
+    ends = [min(start + range_size, num_pages) for start in starts]
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(EXTRACTION_START_METHOD),
+        initializer=_init_extraction_worker,
+        initargs=(pdf_bytes,),
+    ) as executor:
+        for range_texts in executor.map(_extract_page_range, starts, ends):
+            yield from range_texts
+
+
+def _timed_pages(page_texts: Iterator[str], num_pages: int) -> Iterator[str]:
+    """Pass page texts through, recording the time spent extracting them."""
+    elapsed = 0.0
+    for page_num in range(1, num_pages + 1):
+        start = time.perf_counter()
+        with span("pdf.extract_page", page=page_num):
+            text = next(page_texts)
+        elapsed += time.perf_counter() - start
+        yield text
+    PDF_EXTRACTION_SECONDS.observe(elapsed)
+    PDF_PAGES_TOTAL.inc(num_pages)
+
+
+def _locate_pieces(text: str, pieces: List[str]) -> List[int]:
+    """Return the start offset of each split ``piece`` within ``text``."""
+    starts = []
+    search_from = 0
+    for piece in pieces:
+        start = text.find(piece, search_from)
+        if start == -1:
+            start = search_from
+        starts.append(start)
+        search_from = start + 1
+    return starts
+
+
+def _page_at(page_bounds: List[tuple[int, int]], offset: int) -> int:
+    """Return the page number containing ``offset`` given page start offsets."""
+    offsets = [start for start, _ in page_bounds]
+    return page_bounds[max(0, bisect_right(offsets, offset) - 1)][1]
+
+
+def _locate_chunks(
+    text: str, pieces: List[str], page_bounds: List[tuple[int, int]]
+) -> List[Dict[str, Any]]:
+    """Attach the page range of each split piece of ``text``."""
+    return [
+        {
+            "text": piece,
+            "start": start,
+            "page_start": _page_at(page_bounds, start),
+            "page_end": _page_at(page_bounds, start + len(piece) - 1),
+        }
+        for piece, start in zip(pieces, _locate_pieces(text, pieces))
+    ]
+
+
+def split_pages(
+    page_texts: Iterable[str], chunk_size: int = 1000, chunk_overlap: int = 150
+) -> Iterator[Dict[str, Any]]:
+    """Chunk a document page by page without holding its full text.
+
+    Each page is split together with the unfinished tail of the previous
+    page, so chunks (and their overlap) carry across page boundaries while
+    only about one page of text is held in memory at a time.
+
+    Args:
+        page_texts: Text of each page, in page order.
+        chunk_size: Maximum number of characters per chunk.
+        chunk_overlap: Number of characters shared by consecutive chunks.
+
+    Yields:
+        Dict[str, Any]: Chunk ``text`` with its ``page_start`` and ``page_end``
+        (1-based, inclusive).
+    """
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap,
+        length_function=len,
+        separators=["\n\n", "\n", " ", ""],
+    )
+    carry = ""
+    # (offset, page number) for each page that starts within ``carry``
+    carry_pages: List[tuple[int, int]] = []
+
+    for page_num, page_text in enumerate(page_texts, start=1):
+        combined = f"{carry}\n\nPage {page_num}\n{page_text}"
+        page_bounds = carry_pages + [(len(carry), page_num)]
+        with span("chunking.split_page", page=page_num), CHUNKING_SECONDS.time():
+            chunks = _locate_chunks(combined, splitter.split_text(combined), page_bounds)
+        if not chunks:
+            carry, carry_pages = "", []
+            continue
+        CHUNKS_TOTAL.inc(len(chunks) - 1)
+
+        # The last chunk may continue on the next page, so hold it back
+        for chunk in chunks[:-1]:
+            yield {key: chunk[key] for key in ("text", "page_start", "page_end")}
+
+        last_start = chunks[-1]["start"]
+        carry = combined[last_start:]
+        carry_pages = [(0, chunks[-1]["page_start"])] + [
+            (offset - last_start, num)
+            for offset, num in page_bounds
+            if offset > last_start
+        ]
+
+    if carry.strip():
+        with span("chunking.split_page"), CHUNKING_SECONDS.time():
+            chunks = _locate_chunks(carry, splitter.split_text(carry), carry_pages)
+        CHUNKS_TOTAL.inc(len(chunks))
+        for chunk in chunks:
+            yield {key: chunk[key] for key in ("text", "page_start", "page_end")}
+
+
+def _open_pdf(file: Union[str, Path, object]) -> tuple[Any, Optional[bytes], str]:
+    """Open ``file`` with pymupdf.
 
     Returns:
-        dict: Metadata including the chunks and a hash of the file contents.
+        tuple: The opened document, its raw bytes and the original filename.
     """
-    doc_id = str(uuid4())
     file_content_bytes = None
-    file_hash = None
     original_filename = "Unknown Document"  # Default
 
     # Determine input type and read bytes for hashing
@@ -26,7 +224,7 @@ def process_document(file: Union[str, Path, object]) -> dict:
         file_path = Path(file)
         original_filename = file_path.name  # Extract filename
         file_content_bytes = file_path.read_bytes()
-        pdf = pymupdf.open(str(file_path))  # Load from path
+        pdf = _pymupdf().open(str(file_path))  # Load from path
     else:  # Handle UploadedFile (Streamlit/FastAPI)
         if hasattr(file, "name"):  # Get filename from UploadedFile
             original_filename = file.name
@@ -36,51 +234,103 @@ def process_document(file: Union[str, Path, object]) -> dict:
             file_content_bytes = file.getvalue()
             # Reset pointer for pymupdf if needed
             file.seek(0)
-            pdf = pymupdf.open(stream=file_content_bytes, filetype="pdf")
+            pdf = _pymupdf().open(stream=file_content_bytes, filetype="pdf")
         # Check for FastAPI UploadFile
         elif hasattr(file, "file") and hasattr(file.file, "read"):
             file_content_bytes = file.file.read()
             # Reset pointer for pymupdf
             file.file.seek(0)
-            pdf = pymupdf.open(stream=file_content_bytes, filetype="pdf")
+            pdf = _pymupdf().open(stream=file_content_bytes, filetype="pdf")
         else:
             raise TypeError("Unsupported file input type")
 
+    return pdf, file_content_bytes, original_filename
+
+
+def doc_id_for_hash(file_hash: Optional[str]) -> str:
+    """Return the document ID for a file hash.
+
+    The same file always maps to the same ID, which keeps re-ingestion
+    idempotent. A random ID is used when no hash is available.
+    """
+    if file_hash:
+        return str(uuid5(DOC_ID_NAMESPACE, file_hash))
+    return str(uuid4())
+
+
+def stream_document(
+    file: Union[str, Path, object], max_workers: Optional[int] = None
+) -> dict:
+    """Open a PDF document and lazily chunk it page by page.
+
+    Unlike :func:`process_document` the chunks are produced by a generator,
+    so embedding can start before extraction finishes and memory use does
+    not grow with the size of the document.
+
+    Args:
+        file: Path to the PDF or an uploaded file-like object.
+        max_workers: Number of processes used for page text extraction.
+
+    Returns:
+        dict: Document metadata with ``chunks`` as an iterator of chunk
+        metadata dictionaries.
+    """
+    with span("pdf.open"):
+        pdf, file_content_bytes, original_filename = _open_pdf(file)
+
     # Calculate hash
+    file_hash = None
     if file_content_bytes:
         file_hash = hashlib.sha256(file_content_bytes).hexdigest()
+    doc_id = doc_id_for_hash(file_hash)
 
-    # Extract text from all pages
-    all_text = ""
-    for page_num in range(len(pdf)):
-        page = pdf.load_page(page_num)
-        text = page.get_text("text")
-        all_text += f"\n\nPage {page_num + 1}\n{text}"
+    def iter_chunks() -> Iterator[Dict[str, Any]]:
+        # The document stays open until the chunks are exhausted or discarded
+        try:
+            page_texts = _timed_pages(
+                iter_page_texts(pdf, file_content_bytes, max_workers=max_workers), len(pdf)
+            )
+            for i, chunk in enumerate(split_pages(page_texts)):
+                yield {
+                    "chunk_id": f"{doc_id}_{i}",
+                    "text": chunk["text"],
+                    "doc_id": doc_id,
+                    "filename": original_filename,  # Add filename to metadata
+                    "file_hash": file_hash,
+                    "page_start": chunk["page_start"],
+                    "page_end": chunk["page_end"],
+                }
+        finally:
+            pdf.close()
 
-    # Chunk the text
-    splitter = RecursiveCharacterTextSplitter(
-        chunk_size=1000,
-        chunk_overlap=150,
-        length_function=len,
-        separators=["\n\n", "\n", " ", ""],
-    )
-    chunks = splitter.split_text(all_text)
-
-    # Formatting and metadata
-    chunked_docs = []
-    for i, chunk in enumerate(chunks):
-        chunked_docs.append(
-            {
-                "chunk_id": f"{doc_id}_{i}",
-                "text": chunk,
-                "doc_id": doc_id,
-                "filename": original_filename,  # Add filename to metadata
-            }
-        )
+    return {
+        "doc_id": doc_id,
+        "filename": original_filename,
+        "num_pages": len(pdf),
+        "chunks": iter_chunks(),
+        "file_hash": file_hash,
+    }
+
+
+def process_document(
+    file: Union[str, Path, object], max_workers: Optional[int] = None
+) -> dict:
+    """Process a PDF document and return chunk metadata.
+
+    Args:
+        file: Path to the PDF or an uploaded file-like object.
+        max_workers: Number of processes used for page text extraction.
+
+    Returns:
+        dict: Metadata including the chunks and a hash of the file contents.
+    """
+    doc_data = stream_document(file, max_workers=max_workers)
+    chunked_docs = list(doc_data["chunks"])
 
     return {
         "num_chunks": len(chunked_docs),
-        "doc_id": doc_id,
+        "num_pages": doc_data["num_pages"],
+        "doc_id": doc_data["doc_id"],
         "chunks": chunked_docs,
-        "file_hash": file_hash,
+        "file_hash": doc_data["file_hash"],
     }
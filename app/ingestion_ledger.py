@@ -0,0 +1,237 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+STATUS_PROCESSING = "processing"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+class IngestionLedger:
+    """Record of ingested files backed by SQLite in WAL mode.
+
+    Each file is keyed by the SHA-256 of its contents. Workers call
+    :meth:`claim` before ingesting a file; the claim is an atomic
+    check-and-set, so two Streamlit sessions or API workers sharing the
+    ledger never ingest the same file at once.
+    """
+
+    def __init__(self, path: str, stale_after: float = 3600.0) -> None:
+        """Open (or create) the ledger database at ``path``.
+
+        Args:
+            path: Location of the SQLite database file.
+            stale_after: Seconds after which an unfinished claim is assumed
+                to belong to a crashed worker and may be taken over.
+        """
+        self.path = path
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ingestions (
+                file_hash TEXT PRIMARY KEY,
+                doc_id TEXT NOT NULL,
+                filename TEXT,
+                status TEXT NOT NULL,
+                num_chunks INTEGER,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_ingestions_doc_id ON ingestions (doc_id)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+        )
+
+    def claim(self, file_hash: str, doc_id: str, filename: Optional[str] = None) -> bool:
+        """Atomically claim ``file_hash`` for ingestion.
+
+        A file can be claimed if it is unknown, previously failed, or its
+        previous claim has gone stale.
+
+        Returns:
+            bool: True if the caller now owns the ingestion of this file.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    """
+                    INSERT INTO ingestions
+                        (file_hash, doc_id, filename, status, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (file_hash) DO UPDATE SET
+                        doc_id = excluded.doc_id,
+                        filename = excluded.filename,
+                        status = excluded.status,
+                        error = NULL,
+                        updated_at = excluded.updated_at
+                    WHERE ingestions.status = ?
+                        OR (ingestions.status = ? AND ingestions.updated_at < ?)
+                    """,
+                    (
+                        file_hash,
+                        doc_id,
+                        filename,
+                        STATUS_PROCESSING,
+                        now,
+                        now,
+                        STATUS_FAILED,
+                        STATUS_PROCESSING,
+                        now - self.stale_after,
+                    ),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount == 1
+
+    def complete(self, file_hash: str, num_chunks: Optional[int] = None) -> None:
+        """Mark the ingestion of ``file_hash`` as completed."""
+        self._set_status(file_hash, STATUS_COMPLETED, num_chunks=num_chunks)
+
+    def fail(self, file_hash: str, error: str) -> None:
+        """Mark the ingestion of ``file_hash`` as failed so it can be retried."""
+        self._set_status(file_hash, STATUS_FAILED, error=error)
+
+    def renew(self, file_hashes: List[str]) -> None:
+        """Refresh the claims on ``file_hashes`` so they do not go stale.
+
+        Call this periodically for files that are still queued or being
+        ingested, as they may take longer than ``stale_after``.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE ingestions SET updated_at = ? WHERE file_hash = ? AND status = ?",
+                [(now, file_hash, STATUS_PROCESSING) for file_hash in file_hashes],
+            )
+
+    def _set_status(
+        self,
+        file_hash: str,
+        status: str,
+        num_chunks: Optional[int] = None,
+        error: Optional[str] = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                """
+                UPDATE ingestions
+                SET status = ?, num_chunks = COALESCE(?, num_chunks), error = ?,
+                    updated_at = ?
+                WHERE file_hash = ?
+                """,
+                (status, num_chunks, error, time.time(), file_hash),
+            )
+
+    def get(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the ledger entry for ``file_hash``, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM ingestions WHERE file_hash = ?", (file_hash,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def is_processed(self, file_hash: str) -> bool:
+        """Return True if ``file_hash`` has been ingested successfully."""
+        entry = self.get(file_hash)
+        return bool(entry) and entry["status"] == STATUS_COMPLETED
+
+    def get_by_doc_ids(self, doc_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Return ledger entries keyed by doc ID for the given ``doc_ids``."""
+        entries: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for start in range(0, len(doc_ids), 500):
+                id_batch = doc_ids[start : start + 500]
+                placeholders = ",".join("?" * len(id_batch))
+                rows = self._conn.execute(
+                    f"SELECT * FROM ingestions WHERE doc_id IN ({placeholders})",
+                    id_batch,
+                ).fetchall()
+                entries.update({row["doc_id"]: dict(row) for row in rows})
+        return entries
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """Import a legacy ``processed_cache.json`` (file hash -> doc ID).
+
+        The import runs once per ledger; later calls are no-ops.
+
+        Returns:
+            int: Number of entries imported.
+        """
+        if not os.path.exists(json_path) or self._get_meta("json_migrated"):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                legacy_cache = json.load(f)
+        except json.JSONDecodeError:
+            print(f"Warning: Cache file {json_path} is corrupted. Skipping migration.")
+            legacy_cache = {}
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.executemany(
+                    """
+                    INSERT OR IGNORE INTO ingestions
+                        (file_hash, doc_id, status, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (file_hash, doc_id, STATUS_COMPLETED, now, now)
+                        for file_hash, doc_id in legacy_cache.items()
+                    ],
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('json_migrated', ?)",
+                    (json_path,),
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        imported = max(cursor.rowcount, 0)
+        print(f"Migrated {imported} entries from {json_path} to the ingestion ledger.")
+        return imported
+
+    def _get_meta(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row["value"] if row else None
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def open_ledger() -> IngestionLedger:
+    """Open the ledger configured by ``INGESTION_LEDGER_PATH``.
+
+    Entries from the legacy ``processed_cache.json`` are imported the first
+    time the ledger is opened.
+    """
+    ledger = IngestionLedger(
+        os.getenv("INGESTION_LEDGER_PATH", "ingestion_ledger.sqlite3")
+    )
+    ledger.migrate_from_json(os.getenv("LEGACY_CACHE_FILE", "processed_cache.json"))
+    return ledger
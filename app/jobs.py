@@ -0,0 +1,446 @@
+import asyncio
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from answer_cache import SemanticAnswerCache
+from ingestion import doc_id_for_hash, stream_document
+from ingestion_ledger import IngestionLedger
+from starlette.concurrency import run_in_threadpool
+from tracing import span
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+# Progress fields reported by ``GET /jobs/{id}``
+PROGRESS_FIELDS = (
+    "num_pages",
+    "pages_extracted",
+    "num_chunks",
+    "chunks_embedded",
+    "num_batches",
+    "batches_upserted",
+)
+
+
+class JobStore:
+    """Persistent table of ingestion jobs backed by SQLite in WAL mode."""
+
+    def __init__(self, path: str, lease_seconds: float = 60.0) -> None:
+        """Open (or create) the job database at ``path``.
+
+        Args:
+            path: Location of the SQLite database file.
+            lease_seconds: How long a worker owns a job without renewing its
+                lease. Jobs whose lease has expired belong to a stopped
+                worker and may be claimed by another one.
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30.0, check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                file_hash TEXT NOT NULL,
+                doc_id TEXT NOT NULL,
+                filename TEXT,
+                file_path TEXT,
+                status TEXT NOT NULL,
+                num_pages INTEGER,
+                pages_extracted INTEGER NOT NULL DEFAULT 0,
+                num_chunks INTEGER,
+                chunks_embedded INTEGER NOT NULL DEFAULT 0,
+                num_batches INTEGER,
+                batches_upserted INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                owner TEXT,
+                lease_expires_at REAL,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        # Job tables created before leases were added
+        for column, column_type in (("owner", "TEXT"), ("lease_expires_at", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {column_type}")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_file_hash ON jobs (file_hash)"
+        )
+
+    def create(
+        self,
+        file_hash: str,
+        doc_id: str,
+        filename: Optional[str],
+        file_path: str,
+        owner: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Record a new queued job, leased to ``owner`` if given, and return it."""
+        now = time.time()
+        job_id = str(uuid4())
+        lease_expires_at = now + self.lease_seconds if owner else None
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO jobs
+                    (job_id, file_hash, doc_id, filename, file_path, status,
+                     owner, lease_expires_at, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job_id,
+                    file_hash,
+                    doc_id,
+                    filename,
+                    file_path,
+                    JOB_QUEUED,
+                    owner,
+                    lease_expires_at,
+                    now,
+                    now,
+                ),
+            )
+        return self.get(job_id)
+
+    def claim(self, job_id: str, owner: str) -> bool:
+        """Atomically take over an unfinished job nobody holds a live lease on.
+
+        Returns:
+            bool: True if ``owner`` now holds the lease on the job.
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE jobs SET owner = ?, lease_expires_at = ?, updated_at = ?
+                WHERE job_id = ? AND status IN (?, ?)
+                    AND (owner IS NULL OR owner = ? OR lease_expires_at < ?)
+                """,
+                (
+                    owner,
+                    now + self.lease_seconds,
+                    now,
+                    job_id,
+                    JOB_QUEUED,
+                    JOB_RUNNING,
+                    owner,
+                    now,
+                ),
+            )
+        return cursor.rowcount == 1
+
+    def renew_leases(self, owner: str) -> List[Dict[str, Any]]:
+        """Extend the lease on every unfinished job held by ``owner``.
+
+        Returns:
+            List[Dict[str, Any]]: The jobs whose leases were renewed.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET lease_expires_at = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + self.lease_seconds, owner, JOB_QUEUED, JOB_RUNNING),
+            )
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE owner = ? AND status IN (?, ?)",
+                (owner, JOB_QUEUED, JOB_RUNNING),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        """Set the given columns of a job."""
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._conn.execute(
+                f"UPDATE jobs SET {assignments}, updated_at = ? WHERE job_id = ?",
+                (*fields.values(), time.time(), job_id),
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job with ``job_id``, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    def latest_for_file(self, file_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the most recent job for ``file_hash``, if any."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE file_hash = ? ORDER BY created_at DESC LIMIT 1",
+                (file_hash,),
+            ).fetchone()
+        return dict(row) if row else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        """Return queued and running jobs without a live lease, oldest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT * FROM jobs
+                WHERE status IN (?, ?) AND (owner IS NULL OR lease_expires_at < ?)
+                ORDER BY created_at
+                """,
+                (JOB_QUEUED, JOB_RUNNING, time.time()),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
+
+
+def job_status(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the public view of a job for the API."""
+    return {
+        "job_id": job["job_id"],
+        "doc_id": job["doc_id"],
+        "filename": job["filename"],
+        "status": job["status"],
+        "progress": {name: job[name] for name in PROGRESS_FIELDS},
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+    }
+
+
+class IngestionQueue:
+    """Queue of uploaded PDFs ingested by a pool of background workers.
+
+    Uploads are spooled to disk and recorded in a :class:`JobStore`. Each
+    queue leases the jobs it owns and keeps renewing those leases, along
+    with the ingestion ledger claims taken at upload time, while the jobs
+    wait or run. Jobs whose lease expires because their process stopped
+    are claimed by whichever queue notices first, so several API workers
+    can share the job table without ingesting a file twice.
+    """
+
+    # Extraction progress is written to the job table every this many chunks
+    PROGRESS_EVERY_CHUNKS = 50
+
+    def __init__(
+        self,
+        vectorstore,
+        ledger: IngestionLedger,
+        store: JobStore,
+        spool_dir: str,
+        num_workers: int = 2,
+        answer_cache: Optional[SemanticAnswerCache] = None,
+    ) -> None:
+        """Create the queue; call :meth:`start` from the running event loop.
+
+        Args:
+            vectorstore: ``AsyncQdrantVectorStore`` to store chunks in.
+            ledger: Ledger holding the claims of the queued files.
+            store: Persistent job table.
+            spool_dir: Directory uploaded files are kept in until ingested.
+            num_workers: Number of documents ingested concurrently.
+            answer_cache: Answer cache to invalidate when a document is added.
+        """
+        self.vectorstore = vectorstore
+        self.ledger = ledger
+        self.store = store
+        self.spool_dir = spool_dir
+        self.num_workers = max(1, num_workers)
+        self.answer_cache = answer_cache
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}"
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Claim orphaned unfinished jobs and start the workers."""
+        os.makedirs(self.spool_dir, exist_ok=True)
+        await self._claim_orphaned_jobs()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.num_workers)
+        ]
+        self._workers.append(asyncio.create_task(self._lease_keeper()))
+
+    async def stop(self) -> None:
+        """Stop the workers; interrupted jobs resume once their lease expires."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def _claim_orphaned_jobs(self) -> None:
+        """Requeue unfinished jobs whose owner stopped renewing their lease."""
+        for job in await run_in_threadpool(self.store.unfinished):
+            if not await run_in_threadpool(self.store.claim, job["job_id"], self.owner):
+                continue  # Another worker claimed it first
+            if job["file_path"] and os.path.exists(job["file_path"]):
+                print(f"Requeuing ingestion job {job['job_id']} ({job['filename']}).")
+                await run_in_threadpool(self.store.update, job["job_id"], status=JOB_QUEUED)
+                self._queue.put_nowait(job["job_id"])
+            else:
+                await self._fail(job, "Uploaded file was lost before ingestion.")
+
+    async def _lease_keeper(self) -> None:
+        """Renew this queue's job leases and ledger claims; adopt orphaned jobs."""
+        while True:
+            await asyncio.sleep(self.store.lease_seconds / 3)
+            try:
+                owned = await run_in_threadpool(self.store.renew_leases, self.owner)
+                await run_in_threadpool(
+                    self.ledger.renew, [job["file_hash"] for job in owned]
+                )
+                await self._claim_orphaned_jobs()
+            except Exception as e:
+                print(f"Error renewing ingestion job leases: {e}")
+
+    async def submit(
+        self, content: bytes, file_hash: str, filename: Optional[str]
+    ) -> Dict[str, Any]:
+        """Spool an uploaded file and queue it for ingestion.
+
+        The caller must already hold the ledger claim for ``file_hash``.
+        """
+        file_path = os.path.join(self.spool_dir, f"{file_hash}.pdf")
+
+        def spool() -> Dict[str, Any]:
+            with open(file_path, "wb") as f:
+                f.write(content)
+            return self.store.create(
+                file_hash, doc_id_for_hash(file_hash), filename, file_path, self.owner
+            )
+
+        job = await run_in_threadpool(spool)
+        self._queue.put_nowait(job["job_id"])
+        return job
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                with span("ingestion.job", job_id=job_id):
+                    await self._run(job_id)
+            except Exception as e:
+                print(f"Unexpected error in ingestion job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _iter_chunks(
+        self, job: Dict[str, Any], extracted: Dict[str, int]
+    ) -> Iterator[Dict[str, Any]]:
+        """Stream the chunks of the spooled PDF, recording extraction progress.
+
+        The vector store pulls from this generator in a worker thread, so
+        the PDF is parsed off the event loop. ``extracted["num_chunks"]`` is
+        set once every chunk has been produced.
+        """
+        doc_data = stream_document(job["file_path"])
+        self.store.update(job["job_id"], num_pages=doc_data["num_pages"])
+        num_chunks = 0
+        try:
+            for chunk in doc_data["chunks"]:
+                # Keep the original upload filename rather than the spool file name
+                chunk["filename"] = job["filename"] or chunk["filename"]
+                num_chunks += 1
+                if num_chunks % self.PROGRESS_EVERY_CHUNKS == 0:
+                    self.store.update(job["job_id"], pages_extracted=chunk["page_end"])
+                yield chunk
+        finally:
+            # Closes the PDF and waits for its extraction processes
+            doc_data["chunks"].close()
+        self.store.update(
+            job["job_id"],
+            pages_extracted=doc_data["num_pages"],
+            num_chunks=num_chunks,
+        )
+        extracted["num_chunks"] = num_chunks
+
+    async def _run(self, job_id: str) -> None:
+        job = await run_in_threadpool(self.store.get, job_id)
+        await run_in_threadpool(self.store.update, job_id, status=JOB_RUNNING, error=None)
+        try:
+            extracted: Dict[str, int] = {}
+            progress_lock = asyncio.Lock()
+            reported_batches = 0
+
+            async def report(
+                completed_batches: int, num_batches: Optional[int], stored_chunks: int
+            ) -> None:
+                nonlocal reported_batches
+                async with progress_lock:
+                    # Batches finish out of order; never overwrite newer progress
+                    if completed_batches <= reported_batches:
+                        return
+                    reported_batches = completed_batches
+                    await run_in_threadpool(
+                        self.store.update,
+                        job_id,
+                        batches_upserted=completed_batches,
+                        # Unknown until the streamed document is fully chunked
+                        num_batches=num_batches or completed_batches,
+                        chunks_embedded=stored_chunks,
+                    )
+
+            chunks = self._iter_chunks(job, extracted)
+            try:
+                stored_chunks = await self.vectorstore.embed_and_store_chunks(
+                    chunks, resume=True, progress_callback=report
+                )
+            finally:
+                # Finalizing extraction blocks on its process pool; keep it off the loop
+                await run_in_threadpool(chunks.close)
+            num_chunks = extracted.get("num_chunks")
+            if num_chunks is None or stored_chunks < num_chunks:
+                raise RuntimeError(
+                    f"Only {stored_chunks}/{num_chunks or 'unknown'} chunks were stored."
+                )
+        except Exception as e:
+            print(f"Ingestion job {job_id} failed: {e}")
+            await self._fail(job, str(e))
+            return
+
+        await run_in_threadpool(self.ledger.complete, job["file_hash"], stored_chunks)
+        if self.answer_cache is not None:
+            self.answer_cache.invalidate()
+        await run_in_threadpool(self.store.update, job_id, status=JOB_COMPLETED)
+        await run_in_threadpool(self._remove_spooled, job)
+
+    async def _fail(self, job: Dict[str, Any], error: str) -> None:
+        await run_in_threadpool(self.ledger.fail, job["file_hash"], error)
+        await run_in_threadpool(
+            self.store.update, job["job_id"], status=JOB_FAILED, error=error
+        )
+        await run_in_threadpool(self._remove_spooled, job)
+
+    @staticmethod
+    def _remove_spooled(job: Dict[str, Any]) -> None:
+        if job["file_path"] and os.path.exists(job["file_path"]):
+            os.remove(job["file_path"])
+
+
+def open_job_queue(
+    vectorstore,
+    ledger: IngestionLedger,
+    answer_cache: Optional[SemanticAnswerCache] = None,
+) -> IngestionQueue:
+    """Create the ingestion queue configured by the ``INGESTION_JOBS_*`` settings."""
+    return IngestionQueue(
+        vectorstore,
+        ledger,
+        JobStore(
+            os.getenv("INGESTION_JOBS_DB_PATH", "ingestion_jobs.sqlite3"),
+            lease_seconds=float(os.getenv("INGESTION_JOBS_LEASE_SECONDS", "60")),
+        ),
+        spool_dir=os.getenv("INGESTION_JOBS_SPOOL_DIR", "ingestion_uploads"),
+        num_workers=int(os.getenv("INGESTION_JOBS_WORKERS", "2")),
+        answer_cache=answer_cache,
+    )
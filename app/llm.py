@@ -1,14 +1,70 @@
 import os
+import threading
+from typing import Dict, Iterator, List
 
 from dotenv import load_dotenv
-from openai import OpenAI
+from llm_gateway import LLMGateway
 
 load_dotenv()
 
-# Initialize OpenAI client
-client = OpenAI(
-    api_key=os.getenv("GROQ_API_KEY"), base_url="https://api.groq.com/openai/v1"
-)
+
+_gateway: LLMGateway | None = None
+_gateway_lock = threading.Lock()
+
+
+def get_gateway() -> LLMGateway:
+    """Return the LLM gateway shared by the process.
+
+    The Groq client is created on first use rather than at import, which
+    keeps startup fast.
+    """
+    global _gateway
+    with _gateway_lock:
+        if _gateway is None:
+            from openai import APIConnectionError, OpenAI
+
+            # Retries are handled by the gateway
+            client = OpenAI(
+                api_key=os.getenv("GROQ_API_KEY"),
+                base_url="https://api.groq.com/openai/v1",
+                max_retries=0,
+            )
+            _gateway = LLMGateway(
+                client,
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", "8")),
+                max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+                timeout=float(os.getenv("LLM_TIMEOUT", "60")),
+                connection_errors=(APIConnectionError,),
+            )
+        return _gateway
+
+
+def _answer_messages(question: str, context: str) -> List[Dict[str, str]]:
+    """Build the chat messages for a question answered from ``context``."""
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful assistant that answers questions using the provided document context. Only use the context below to answer the question.",
+        },
+        {
+            "role": "user",
+            "content": f"Context:\n{context}\n\nQuestion:\n{question}",
+        },
+    ]
+
+
+def _chat_messages(message: str) -> List[Dict[str, str]]:
+    """Build the chat messages for a conversation without document context."""
+    return [
+        {
+            "role": "system",
+            "content": "You are a helpful and friendly AI assistant. Provide direct and conversational responses to the user's messages.",
+        },
+        {
+            "role": "user",
+            "content": message,
+        },
+    ]
 
 
 def generate_answer(
@@ -28,21 +84,27 @@ def generate_answer(
     Returns:
         str: The generated answer.
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful assistant that answers questions using the provided document context. Only use the context below to answer the question.",
-            },
-            {
-                "role": "user",
-                "content": f"Context:\n{context}\n\nQuestion:\n{question}",
-            },
-        ],
-        max_tokens=max_tokens,
-    )
-    return response.choices[0].message.content
+    return get_gateway().complete(model, _answer_messages(question, context), max_tokens)
+
+
+def stream_answer(
+    question: str,
+    context: str,
+    model: str = "llama3-8b-8192",
+    max_tokens: int = 512,
+) -> Iterator[str]:
+    """Stream an answer from the Groq-hosted LLM as it is generated.
+
+    Args:
+        question: The user question.
+        context: Concatenated relevant chunks.
+        model: Groq model to use.
+        max_tokens: Maximum tokens to generate.
+
+    Yields:
+        str: Successive pieces of the generated answer.
+    """
+    yield from get_gateway().stream(model, _answer_messages(question, context), max_tokens)
 
 
 def generate_chat_response(
@@ -60,18 +122,22 @@ def generate_chat_response(
     Returns:
         str: The generated response.
     """
-    response = client.chat.completions.create(
-        model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": "You are a helpful and friendly AI assistant. Provide direct and conversational responses to the user's messages.",
-            },
-            {
-                "role": "user",
-                "content": message,
-            },
-        ],
-        max_tokens=max_tokens,
-    )
-    return response.choices[0].message.content
+    return get_gateway().complete(model, _chat_messages(message), max_tokens)
+
+
+def stream_chat_response(
+    message: str,
+    model: str = "llama3-8b-8192",
+    max_tokens: int = 512,
+) -> Iterator[str]:
+    """Stream a chat response without document context.
+
+    Args:
+        message: The user's message.
+        model: Groq model to use.
+        max_tokens: Maximum tokens to generate.
+
+    Yields:
+        str: Successive pieces of the generated response.
+    """
+    yield from get_gateway().stream(model, _chat_messages(message), max_tokens)
@@ -0,0 +1,300 @@
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from metrics import (
+    LLM_COALESCED_TOTAL,
+    LLM_SECONDS,
+    LLM_TOKENS_TOTAL,
+    UPSTREAM_RETRIES_TOTAL,
+)
+from rate_limit import backoff_delay, is_transient, retry_after
+from tracing import span, start_span
+
+
+class LLMTimeoutError(TimeoutError):
+    """Raised when an LLM call does not finish within its deadline."""
+
+
+def _request_key(model: str, messages: List[Dict[str, str]], max_tokens: int) -> str:
+    """Return a key identifying identical completion requests."""
+    payload = json.dumps([model, messages, max_tokens], sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _remaining(deadline: float) -> float:
+    return max(0.0, deadline - time.monotonic())
+
+
+class _SharedStream:
+    """Pieces of one upstream stream, replayed to every caller reading it."""
+
+    def __init__(self) -> None:
+        self.pieces: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        # Callers still reading; changed under the gateway's lock
+        self.readers = 0
+        self.changed = threading.Condition()
+
+
+class LLMGateway:
+    """Front for chat completion calls shared by all threads of the process.
+
+    At most ``max_concurrency`` requests are sent upstream at once; callers
+    beyond that wait for a free slot. Rate-limit (429), server (5xx) and
+    connection errors are retried with exponential backoff and jitter.
+    Every call has a deadline covering the wait for a slot, the requests and
+    the backoff; :class:`LLMTimeoutError` is raised when it passes.
+
+    Identical requests in flight at the same time are coalesced: the first
+    caller makes the upstream call and the others wait for and share its
+    result (or error). Streamed requests are coalesced with each other, not
+    with non-streamed ones; a caller joining a stream late first receives
+    the pieces generated so far.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_concurrency: int = 8,
+        max_retries: int = 3,
+        timeout: float = 60.0,
+        connection_errors: Tuple[type, ...] = (),
+    ) -> None:
+        """Create the gateway.
+
+        Args:
+            client: OpenAI-compatible client, ideally with its own retries
+                disabled.
+            max_concurrency: Maximum upstream requests in flight.
+            max_retries: Retries of a request after transient errors.
+            timeout: Default deadline of a call in seconds.
+            connection_errors: Exception types of connection failures and
+                timeouts, which are retried.
+        """
+        self.client = client
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.connection_errors = connection_errors
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrency))
+        self._in_flight: Dict[str, Future] = {}
+        self._streams_in_flight: Dict[str, _SharedStream] = {}
+        self._lock = threading.Lock()
+
+    def _acquire_slot(self, deadline: float) -> None:
+        if not self._slots.acquire(timeout=_remaining(deadline)):
+            raise LLMTimeoutError("Timed out waiting for a free LLM request slot.")
+
+    def _with_retries(self, request: Callable[[float], Any], deadline: float) -> Any:
+        """Call ``request(timeout)`` until it succeeds, retrying transient errors."""
+        attempt = 0
+        while True:
+            remaining = _remaining(deadline)
+            if not remaining:
+                raise LLMTimeoutError("LLM request did not complete before its deadline.")
+            try:
+                return request(remaining)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_transient(e, self.connection_errors):
+                    raise
+                delay = backoff_delay(attempt, retry_after=retry_after(e))
+                if delay >= _remaining(deadline):
+                    raise LLMTimeoutError(
+                        f"LLM request failed ({e}) with no time left to retry."
+                    ) from e
+                UPSTREAM_RETRIES_TOTAL.inc(service="llm")
+                print(
+                    f"LLM request failed ({e}); retry {attempt + 1}/{self.max_retries} in {delay:.1f}s."
+                )
+                time.sleep(delay)
+                attempt += 1
+
+    def _complete_upstream(
+        self, model: str, messages: List[Dict[str, str]], max_tokens: int, deadline: float
+    ) -> str:
+        with span("llm.complete", model=model, coalesced=False) as current:
+            self._acquire_slot(deadline)
+            try:
+                with LLM_SECONDS.time(mode="complete"):
+                    response = self._with_retries(
+                        lambda timeout: self.client.chat.completions.create(
+                            model=model, messages=messages, max_tokens=max_tokens, timeout=timeout
+                        ),
+                        deadline,
+                    )
+            finally:
+                self._slots.release()
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS_TOTAL.inc(usage.prompt_tokens, type="prompt")
+                LLM_TOKENS_TOTAL.inc(usage.completion_tokens, type="completion")
+                current.set_attribute("prompt_tokens", usage.prompt_tokens)
+                current.set_attribute("completion_tokens", usage.completion_tokens)
+            return response.choices[0].message.content
+
+    def complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        timeout: Optional[float] = None,
+    ) -> str:
+        """Return the content of a chat completion.
+
+        Args:
+            model: Model to use.
+            messages: Chat messages.
+            max_tokens: Maximum tokens to generate.
+            timeout: Deadline in seconds; defaults to the gateway's.
+
+        Returns:
+            str: The generated message content.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        key = _request_key(model, messages, max_tokens)
+        with self._lock:
+            future = self._in_flight.get(key)
+            is_leader = future is None
+            if is_leader:
+                future = self._in_flight[key] = Future()
+
+        if not is_leader:
+            LLM_COALESCED_TOTAL.inc()
+            try:
+                with span("llm.complete", model=model, coalesced=True):
+                    return future.result(timeout=_remaining(deadline))
+            except LLMTimeoutError:
+                raise
+            except FutureTimeoutError:
+                raise LLMTimeoutError(
+                    "Identical LLM request in flight did not complete before the deadline."
+                ) from None
+
+        try:
+            content = self._complete_upstream(model, messages, max_tokens, deadline)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(content)
+            return content
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+
+    def stream(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        timeout: Optional[float] = None,
+    ) -> Iterator[str]:
+        """Yield the content of a streamed chat completion piece by piece.
+
+        The upstream stream is read by a background thread and fanned out to
+        every caller of an identical request; it holds a slot until it ends,
+        and is abandoned once all of its callers have stopped reading. Only
+        opening the stream is retried and bounded by the deadline; once
+        tokens flow, the time that was left also bounds the wait for each
+        piece.
+        """
+        deadline = time.monotonic() + (timeout or self.timeout)
+        key = _request_key(model, messages, max_tokens)
+        with self._lock:
+            shared = self._streams_in_flight.get(key)
+            is_leader = shared is None
+            if is_leader:
+                shared = self._streams_in_flight[key] = _SharedStream()
+            shared.readers += 1
+
+        # Not made current: the caller runs between the yielded pieces
+        stream_span = start_span("llm.stream", model=model, coalesced=not is_leader)
+        if is_leader:
+            threading.Thread(
+                target=self._pump_stream,
+                args=(key, shared, model, messages, max_tokens, deadline),
+                daemon=True,
+            ).start()
+        else:
+            LLM_COALESCED_TOTAL.inc()
+
+        try:
+            position = 0
+            while True:
+                with shared.changed:
+                    # The upstream request timeout bounds this wait
+                    while position == len(shared.pieces) and not shared.done:
+                        shared.changed.wait()
+                    pieces = shared.pieces[position:]
+                    done, error = shared.done, shared.error
+                position += len(pieces)
+                yield from pieces
+                if done and position == len(shared.pieces):
+                    if error is not None:
+                        raise error
+                    return
+        except Exception as e:
+            stream_span.record_exception(e)
+            raise
+        finally:
+            with self._lock:
+                shared.readers -= 1
+            stream_span.end()
+
+    def _pump_stream(
+        self,
+        key: str,
+        shared: _SharedStream,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        deadline: float,
+    ) -> None:
+        """Read an upstream stream into ``shared`` until it ends or has no readers."""
+        error: Optional[BaseException] = None
+        try:
+            self._acquire_slot(deadline)
+            start = time.perf_counter()
+            try:
+                stream = self._with_retries(
+                    lambda request_timeout: self.client.chat.completions.create(
+                        model=model,
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        stream=True,
+                        timeout=request_timeout,
+                    ),
+                    deadline,
+                )
+                for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        with shared.changed:
+                            shared.pieces.append(chunk.choices[0].delta.content)
+                            shared.changed.notify_all()
+                    with self._lock:
+                        abandoned = shared.readers == 0
+                        if abandoned:
+                            # Later callers start a stream of their own
+                            del self._streams_in_flight[key]
+                    if abandoned:
+                        close = getattr(stream, "close", None)
+                        if close is not None:
+                            close()
+                        return
+                LLM_SECONDS.observe(time.perf_counter() - start, mode="stream")
+            finally:
+                self._slots.release()
+        except BaseException as e:
+            error = e
+        with self._lock:
+            if self._streams_in_flight.get(key) is shared:
+                del self._streams_in_flight[key]
+        with shared.changed:
+            shared.error = error
+            shared.done = True
+            shared.changed.notify_all()
@@ -1,25 +1,344 @@
-from fastapi import FastAPI, Form, UploadFile
+import asyncio
+import hashlib
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Iterator, List, Optional
 
-from app.ingestion import process_document
-from app.llm import generate_answer
-from app.retriever import get_relevant_chunks
-from app.vectorstore import QdrantVectorStore
+from fastapi import FastAPI, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
 
-app = FastAPI()
+from app.answer_cache import answer_cache
+from app.context import build_context
+from app.ingestion import doc_id_for_hash
+from app.ingestion_ledger import open_ledger
+from app.jobs import job_status, open_job_queue
+from app.llm import generate_answer, get_gateway, stream_answer
+from app.rate_limit import backoff_delay
+from app.retriever import aget_relevant_chunks
 
-vectorstore = QdrantVectorStore()
+# Imported as top-level modules, like the instrumented modules import them,
+# so the endpoint renders the same metrics registry and request spans are the
+# parents of theirs
+import metrics
+from tracing import span
 
+# Created by _start_services, in the background at startup or by the first
+# request that needs them, so the server accepts connections immediately
+vectorstore = None
+ledger = None
+job_queue = None
+_services_lock = asyncio.Lock()
+llm_ready = False
+# Why each component is not warm yet, reported by GET /ready
+startup_errors: Dict[str, str] = {}
 
-@app.post("/upload")
+MAX_BATCH_QUESTIONS = int(os.getenv("MAX_BATCH_QUESTIONS", "500"))
+# Bounds the batch answers waiting on the LLM gateway, so they do not tie up
+# the thread pool
+llm_semaphore = asyncio.Semaphore(int(os.getenv("LLM_MAX_CONCURRENCY", "8")))
+
+
+async def _start_services() -> None:
+    """Create the vector store, ledger and ingestion queue, once."""
+    global vectorstore, ledger, job_queue
+    async with _services_lock:
+        if job_queue is not None:
+            return
+        # Imported here: the Qdrant client and embedding backend are slow to load
+        from app.async_vectorstore import AsyncQdrantVectorStore
+
+        store = await run_in_threadpool(AsyncQdrantVectorStore)
+        try:
+            await store.initialize()
+            store_ledger = await run_in_threadpool(open_ledger)
+            queue = await run_in_threadpool(
+                open_job_queue, store, store_ledger, answer_cache
+            )
+            await queue.start()
+        except BaseException:
+            await store.close()
+            raise
+        vectorstore, ledger, job_queue = store, store_ledger, queue
+        startup_errors.pop("qdrant", None)
+
+
+async def ensure_services() -> None:
+    """Start the services if needed, answering 503 while they are unavailable."""
+    if job_queue is not None:
+        return
+    try:
+        await _start_services()
+    except Exception as e:
+        startup_errors["qdrant"] = str(e)
+        raise HTTPException(status_code=503, detail=f"Service unavailable: {e}")
+
+
+async def _start_llm() -> None:
+    global llm_ready
+    await run_in_threadpool(get_gateway)
+    llm_ready = True
+    startup_errors.pop("llm", None)
+
+
+async def _warm_up() -> None:
+    """Warm the Qdrant and LLM clients, retrying with backoff until both are up."""
+    attempt = 0
+    while True:
+        components = []
+        if job_queue is None:
+            components.append(("qdrant", _start_services()))
+        if not llm_ready:
+            components.append(("llm", _start_llm()))
+        if not components:
+            print("Service is ready.")
+            return
+        results = await asyncio.gather(
+            *(start for _, start in components), return_exceptions=True
+        )
+        for (name, _), result in zip(components, results):
+            if isinstance(result, Exception):
+                startup_errors[name] = str(result)
+                print(f"Warming up {name} failed: {result}")
+        if any(isinstance(result, Exception) for result in results):
+            await asyncio.sleep(backoff_delay(attempt, maximum=30.0))
+            attempt += 1
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm up in the background so the server starts accepting requests at once
+    warm_up = asyncio.create_task(_warm_up())
+    yield
+    warm_up.cancel()
+    await asyncio.gather(warm_up, return_exceptions=True)
+    if job_queue is not None:
+        await job_queue.stop()
+    if vectorstore is not None:
+        await vectorstore.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Record each request as the root span of its trace.
+
+    Streamed responses end the span when streaming starts; the LLM stream
+    has a span of its own.
+    """
+    with span(request.method) as current:
+        current.set_attribute("http.method", request.method)
+        current.set_attribute("http.target", request.url.path)
+        response = await call_next(request)
+        # Named after the route template, e.g. "GET /jobs/{job_id}"
+        route = request.scope.get("route")
+        if route is not None:
+            current.update_name(f"{request.method} {route.path}")
+            current.set_attribute("http.route", route.path)
+        current.set_attribute("http.status_code", response.status_code)
+        return response
+
+
+@app.get("/ready")
+async def readiness():
+    """Report whether the Qdrant and LLM clients are warm.
+
+    Answers 503 until they are, so load balancers only route traffic to
+    warm workers. Requests sent earlier still work; they wait for the
+    services to start.
+    """
+    components = {"qdrant": job_queue is not None, "llm": llm_ready}
+    ready = all(components.values())
+    return JSONResponse(
+        {"ready": ready, "components": components, "errors": startup_errors},
+        status_code=200 if ready else 503,
+    )
+
+
+def _cache_stats() -> Dict[str, tuple[int, int]]:
+    """Return the (hits, misses) of the caches on the query path."""
+    caches = {"answer": answer_cache}
+    if vectorstore is not None:
+        caches["query_embedding"] = vectorstore.query_embedding_cache
+        if vectorstore.embedding_cache is not None:
+            caches["embedding"] = vectorstore.embedding_cache
+    return {name: (cache.hits, cache.misses) for name, cache in caches.items()}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Expose per-stage latency histograms and counters for Prometheus.
+
+    Covers PDF extraction, chunking, embedding, Qdrant requests, LLM
+    completions and cache hit rates.
+    """
+    return PlainTextResponse(
+        metrics.render() + metrics.render_cache_stats(_cache_stats()),
+        media_type="text/plain; version=0.0.4",
+    )
+
+
+@app.post("/upload", status_code=202)
 async def upload_document(file: UploadFile):
-    doc_data = process_document(file)
-    vectorstore.embed_and_store_chunks(doc_data["chunks"])
-    return {"num_chunks": doc_data["num_chunks"], "doc_id": doc_data["doc_id"]}
+    """Queue a PDF for ingestion and return its job ID immediately.
+
+    Poll ``GET /jobs/{job_id}`` for progress. Files that were already
+    ingested (or are being ingested) are not queued again.
+    """
+    await ensure_services()
+    content = await file.read()
+    file_hash = hashlib.sha256(content).hexdigest()
+
+    # Only one worker may ingest a given file at a time
+    claimed = await run_in_threadpool(
+        ledger.claim, file_hash, doc_id_for_hash(file_hash), file.filename
+    )
+    if not claimed:
+        entry = await run_in_threadpool(ledger.get, file_hash)
+        job = await run_in_threadpool(job_queue.store.latest_for_file, file_hash)
+        return {
+            "job_id": job["job_id"] if job else None,
+            "num_chunks": entry["num_chunks"],
+            "doc_id": entry["doc_id"],
+            "status": entry["status"],
+        }
+
+    try:
+        job = await job_queue.submit(content, file_hash, file.filename)
+    except Exception as e:
+        await run_in_threadpool(ledger.fail, file_hash, str(e))
+        raise HTTPException(status_code=500, detail=f"Error queuing document: {e}")
+    return {"job_id": job["job_id"], "doc_id": job["doc_id"], "status": job["status"]}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return the status and progress of an ingestion job."""
+    await ensure_services()
+    job = await run_in_threadpool(job_queue.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
+
+
+def _sse_events(tokens: Iterator[str]) -> Iterator[str]:
+    """Format generated tokens as server-sent events, ending with ``done``."""
+    try:
+        for token in tokens:
+            # Multi-line tokens need one data field per line
+            yield "".join(f"data: {line}\n" for line in token.split("\n")) + "\n"
+    except Exception as e:
+        yield f"event: error\ndata: {e}\n\n"
+        return
+    yield "event: done\ndata: \n\n"
 
 
 @app.post("/ask")
-async def ask_question(question: str = Form(...)):
-    context_chunks = get_relevant_chunks(question, vectorstore)
-    context_str = "\n\n---\n\n".join([chunk["text"] for chunk in context_chunks])
-    answer = generate_answer(question, context_str)
+async def ask_question(question: str = Form(...), stream: bool = Form(False)):
+    await ensure_services()
+    # Reuse the answer to an equivalent question over the same documents
+    question_vector = await vectorstore.embed_query(question)
+    scope = answer_cache.make_scope(await vectorstore.get_indexed_document_ids())
+    cached_answer = answer_cache.lookup(question_vector, scope)
+    if cached_answer is not None:
+        if stream:
+            return StreamingResponse(
+                _sse_events(iter([cached_answer])), media_type="text/event-stream"
+            )
+        return {"answer": cached_answer}
+
+    context_chunks = await aget_relevant_chunks(question, vectorstore)
+    with span("context.build", chunks=len(context_chunks)):
+        context_str = build_context(context_chunks)
+    if stream:
+        # The sync generator is iterated in the thread pool by Starlette
+        tokens = answer_cache.store_stream(
+            question_vector, scope, stream_answer(question, context_str)
+        )
+        return StreamingResponse(_sse_events(tokens), media_type="text/event-stream")
+    try:
+        answer = await run_in_threadpool(generate_answer, question, context_str)
+    except TimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    answer_cache.store(question_vector, scope, answer)
     return {"answer": answer}
+
+
+class BatchAskRequest(BaseModel):
+    questions: List[str]
+    doc_ids: Optional[List[str]] = None
+
+
+async def _answer_from_chunks(
+    question: str, chunks: List[Dict[str, Any]], question_vector: List[float], scope
+) -> Dict[str, Any]:
+    """Generate and cache the answer to one question of a batch."""
+    async with llm_semaphore:
+        try:
+            with span("context.build", chunks=len(chunks)):
+                context_str = build_context(chunks)
+            answer = await run_in_threadpool(generate_answer, question, context_str)
+        except Exception as e:
+            return {"question": question, "answer": None, "error": str(e)}
+    answer_cache.store(question_vector, scope, answer)
+    return {"question": question, "answer": answer, "error": None}
+
+
+@app.post("/ask/batch")
+async def ask_questions(request: BatchAskRequest):
+    """Answer many questions with shared embedding and retrieval.
+
+    The questions are embedded in one request and searched in one Qdrant
+    batch query; answers are generated with bounded concurrency
+    (``LLM_MAX_CONCURRENCY``) and returned in question order. A failed
+    answer is reported in its ``error`` field without failing the batch.
+    """
+    questions = request.questions
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {MAX_BATCH_QUESTIONS} questions per batch.",
+        )
+    if not questions:
+        return {"answers": []}
+    await ensure_services()
+
+    question_vectors = await vectorstore.embed_queries(questions)
+    # Scope by the listed documents that are actually indexed, so the key
+    # changes when one of them is ingested or deleted (even elsewhere)
+    indexed_doc_ids = await vectorstore.get_indexed_document_ids()
+    if request.doc_ids:
+        scope_doc_ids = set(request.doc_ids) & set(indexed_doc_ids)
+    else:
+        scope_doc_ids = indexed_doc_ids
+    scope = answer_cache.make_scope(scope_doc_ids)
+
+    results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+    pending = []
+    for i, (question, vector) in enumerate(zip(questions, question_vectors)):
+        cached_answer = answer_cache.lookup(vector, scope)
+        if cached_answer is not None:
+            results[i] = {"question": question, "answer": cached_answer, "error": None}
+        else:
+            pending.append(i)
+
+    if pending:
+        chunk_lists = await vectorstore.search_batch(
+            [question_vectors[i] for i in pending],
+            top_k=5,
+            filter_doc_ids=request.doc_ids,
+            query_texts=[questions[i] for i in pending],
+        )
+        answers = await asyncio.gather(
+            *(
+                _answer_from_chunks(questions[i], chunks, question_vectors[i], scope)
+                for i, chunks in zip(pending, chunk_lists)
+            )
+        )
+        for i, answer in zip(pending, answers):
+            results[i] = answer
+
+    return {"answers": results}
@@ -0,0 +1,223 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+# Latency buckets in seconds, from a cached lookup to a slow LLM completion
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+_registry: List["_Metric"] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    """Base of the process-wide metrics rendered by :func:`render`."""
+
+    type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines) + "\n"
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, e.g. of requests or tokens."""
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        """Add ``amount`` to the count for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current count for ``labels``."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        if not values and not self.labelnames:
+            values = [((), 0.0)]
+        for key, value in values:
+            pairs = list(zip(self.labelnames, key))
+            yield f"{self.name}{_format_labels(pairs)} {_format_value(value)}"
+
+
+class Histogram(_Metric):
+    """Distribution of observed values, e.g. latencies, in cumulative buckets."""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # labels -> (count per bucket, sum, count)
+        self._values: Dict[Tuple[str, ...], List] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation of ``value`` for ``labels``."""
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the ``with`` block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for ``labels``."""
+        with self._lock:
+            state = self._values.get(self._key(labels))
+            return state[2] if state else 0
+
+    def _samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(
+                (key, (list(state[0]), state[1], state[2]))
+                for key, state in self._values.items()
+            )
+        if not values and not self.labelnames:
+            values = [((), ([0] * len(self.buckets), 0.0, 0))]
+        for key, (bucket_counts, total, count) in values:
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(pairs)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(pairs)} {count}"
+
+
+def render() -> str:
+    """Return every metric in the Prometheus text exposition format."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return "".join(metric.render() for metric in metrics)
+
+
+def render_cache_stats(stats: Dict[str, Tuple[int, int]]) -> str:
+    """Render the hits and misses of caches that keep their own counts.
+
+    Args:
+        stats: Cache name -> (hits, misses).
+    """
+    families = (
+        ("cache_hits_total", "counter", "Cache lookups answered from the cache.", 0),
+        ("cache_misses_total", "counter", "Cache lookups that missed.", 1),
+    )
+    lines = []
+    for name, metric_type, documentation, index in families:
+        lines += [f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}"]
+        for cache, counts in sorted(stats.items()):
+            lines.append(f"{name}{_format_labels([('cache', cache)])} {counts[index]}")
+    lines += [
+        "# HELP cache_hit_ratio Share of cache lookups answered from the cache since start.",
+        "# TYPE cache_hit_ratio gauge",
+    ]
+    for cache, (hits, misses) in sorted(stats.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f"cache_hit_ratio{_format_labels([('cache', cache)])} {_format_value(ratio)}")
+    return "\n".join(lines) + "\n"
+
+
+# Pipeline stages. The metrics live here, rather than in the modules they
+# instrument, so they are registered once even when a module is imported
+# both as ``app.x`` and ``x``.
+PDF_EXTRACTION_SECONDS = Histogram(
+    "pdf_extraction_seconds", "Time spent extracting the page text of one PDF."
+)
+PDF_PAGES_TOTAL = Counter("pdf_pages_extracted_total", "PDF pages extracted.")
+CHUNKING_SECONDS = Histogram(
+    "chunking_seconds", "Time spent splitting one page of text into chunks."
+)
+CHUNKS_TOTAL = Counter("chunks_created_total", "Chunks produced by the splitter.")
+EMBEDDING_SECONDS = Histogram(
+    "embedding_batch_seconds", "Latency of one call to the embedding backend."
+)
+EMBEDDED_TEXTS_TOTAL = Counter("embedded_texts_total", "Texts sent to the embedding backend.")
+EMBEDDING_TOKENS_TOTAL = Counter(
+    "embedding_tokens_total", "Tokens billed by the OpenAI embeddings API."
+)
+QDRANT_SECONDS = Histogram(
+    "qdrant_request_seconds", "Latency of Qdrant requests.", ("operation",)
+)
+LLM_SECONDS = Histogram(
+    "llm_request_seconds",
+    "Latency of LLM completions, from sending to the last token.",
+    ("mode",),
+)
+LLM_TOKENS_TOTAL = Counter(
+    "llm_tokens_total", "Tokens reported by the LLM API.", ("type",)
+)
+LLM_COALESCED_TOTAL = Counter(
+    "llm_coalesced_requests_total",
+    "LLM calls answered by an identical request already in flight.",
+)
+UPSTREAM_RETRIES_TOTAL = Counter(
+    "upstream_retries_total", "Requests retried after transient errors.", ("service",)
+)
@@ -0,0 +1,491 @@
+import glob
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+import numpy as np
+from vectorstore import QdrantVectorStore, point_id_for_chunk, track_documents
+
+if sys.platform == "win32":
+    import msvcrt
+else:
+    import fcntl
+
+
+class NumpyVectorStore(QdrantVectorStore):
+    """In-process vector store on a memory-mapped float32 matrix.
+
+    A drop-in replacement for :class:`QdrantVectorStore` for single-machine
+    deployments that do not want to run a Qdrant server. The index directory
+    holds:
+
+    - ``vectors.f32``: unit-normalized embeddings, one row per point. The file
+      grows by doubling, so appends do not rewrite existing rows.
+    - ``payloads.jsonl``: an append-only log of inserted payloads and deletion
+      tombstones, replayed on startup.
+    - After compaction, ``vectors.<n>.f32`` and ``payloads.<n>.jsonl`` take
+      the place of the two files above.
+    - ``registry.json``: the document registry.
+    - ``meta.json``: the vector dimension and the generation of the vector
+      and payload files in use.
+    - ``.lock``: held with an exclusive lock while the index is open, so a
+      second process (e.g. the ingestion script next to the Streamlit app)
+      fails to open it instead of losing writes.
+
+    Search is an exact cosine top-k over all live rows. Deleted and
+    overwritten rows are only masked out; :meth:`compact` writes a new
+    generation of the files without them and runs automatically once they
+    exceed ``compact_threshold`` of the index. The new generation takes
+    effect when ``meta.json`` is atomically replaced, so a crash during
+    compaction leaves the previous files in use.
+    """
+
+    INITIAL_CAPACITY = 1024
+
+    def __init__(self, path: str | None = None, compact_threshold: float = 0.3) -> None:
+        """Open (or create) the index stored in the directory ``path``.
+
+        Args:
+            path: Index directory. Defaults to the ``NUMPY_INDEX_PATH``
+                setting.
+            compact_threshold: Fraction of dead rows that triggers compaction.
+        """
+        self.path = path or os.getenv("NUMPY_INDEX_PATH", "numpy_index")
+        self.compact_threshold = compact_threshold
+        self.collection_name = os.path.basename(os.path.abspath(self.path))
+        self.registry_collection_name = f"{self.collection_name}_documents"
+        self._lock = threading.RLock()
+        # No server: there are no Qdrant search parameters or sparse vectors
+        self.client = None
+        self.search_params = None
+        self._lock_file = None
+
+        self._init_state()
+        self._init_embedding()
+        self._acquire_directory_lock()
+        try:
+            self._init_collection()
+        except BaseException:
+            self.close()
+            raise
+
+    def _acquire_directory_lock(self) -> None:
+        """Take an exclusive lock on the index directory, failing if it is held."""
+        os.makedirs(self.path, exist_ok=True)
+        lock_file = open(os.path.join(self.path, ".lock"), "a+b")
+        try:
+            if sys.platform == "win32":
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+            else:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise RuntimeError(
+                f"Index at {self.path} is open in another process; "
+                "close it there or use a different NUMPY_INDEX_PATH."
+            )
+        self._lock_file = lock_file
+
+    def close(self) -> None:
+        """Release the lock on the index directory so another process can open it."""
+        with self._lock:
+            if self._lock_file is None:
+                return
+            if sys.platform == "win32":
+                self._lock_file.seek(0)
+                msvcrt.locking(self._lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            # Closing the file releases the flock
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _data_path(self, stem: str, extension: str, generation: int) -> str:
+        # Generation 0 keeps the names used before compaction was versioned
+        suffix = f".{generation}" if generation else ""
+        return os.path.join(self.path, f"{stem}{suffix}.{extension}")
+
+    @property
+    def _vectors_path(self) -> str:
+        return self._data_path("vectors", "f32", self._generation)
+
+    @property
+    def _payloads_path(self) -> str:
+        return self._data_path("payloads", "jsonl", self._generation)
+
+    @property
+    def _registry_path(self) -> str:
+        return os.path.join(self.path, "registry.json")
+
+    @property
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "meta.json")
+
+    def _init_collection(self) -> None:
+        """Load the index from disk, creating an empty one if necessary."""
+        print(f"Initializing NumPy index at {self.path}...")
+        os.makedirs(self.path, exist_ok=True)
+        self.dimension = self.embedder.dimension
+
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path, "r") as f:
+                meta = json.load(f)
+            if meta["dimension"] != self.dimension:
+                raise ValueError(
+                    f"Index at {self.path} holds {meta['dimension']}-dimensional vectors "
+                    f"but the embedder produces {self.dimension}."
+                )
+            self._generation = meta.get("generation", 0)
+        else:
+            self._generation = 0
+            self._save_meta(self._generation)
+        self._remove_stale_files()
+
+        self._load_payloads()
+        row_bytes = self.dimension * 4
+        stored_rows = (
+            os.path.getsize(self._vectors_path) // row_bytes
+            if os.path.exists(self._vectors_path)
+            else 0
+        )
+        if stored_rows < self._num_rows:
+            raise ValueError(
+                f"Index at {self.path} is corrupt: {self._payloads_path} references "
+                f"{self._num_rows} rows but {self._vectors_path} holds {stored_rows}."
+            )
+        self._open_vectors(max(self.INITIAL_CAPACITY, self._num_rows))
+        self._registry = self._load_registry()
+        if self._registry is None:
+            # Backfill the registry from chunks ingested before it existed
+            self._registry = {}
+            self.rebuild_document_registry()
+
+    def _save_meta(self, generation: int) -> None:
+        """Atomically write ``meta.json``, committing ``generation`` of the data files."""
+        tmp_path = f"{self._meta_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dimension": self.dimension, "generation": generation}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path)
+
+    def _remove_stale_files(self) -> None:
+        """Delete data files of other generations left by an interrupted compaction."""
+        current = {self._vectors_path, self._payloads_path}
+        candidates = glob.glob(os.path.join(self.path, "vectors*.f32*")) + glob.glob(
+            os.path.join(self.path, "payloads*.jsonl*")
+        )
+        for path in candidates:
+            if path not in current:
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    print(f"Warning: Could not remove stale index file {path}: {e}")
+
+    def _ensure_payload_indexes(self) -> None:
+        """Doc IDs are always indexed in memory; nothing to create."""
+
+    def _load_payloads(self) -> None:
+        """Replay the payload log into the in-memory row tables."""
+        self._payloads: List[Dict[str, Any] | None] = []
+        self._row_ids: List[str | None] = []
+        self._id_to_row: Dict[str, int] = {}
+        self._doc_codes: Dict[str, int] = {}
+        row_doc_codes: List[int] = []
+
+        if os.path.exists(self._payloads_path):
+            with open(self._payloads_path, "r") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    point_ids = record.get("deleted", [record.get("id")])
+                    for point_id in point_ids:
+                        old_row = self._id_to_row.pop(point_id, None)
+                        if old_row is not None:
+                            self._payloads[old_row] = None
+                    if "deleted" in record:
+                        continue
+                    row = record["row"]
+                    while len(self._payloads) <= row:
+                        self._payloads.append(None)
+                        self._row_ids.append(None)
+                        row_doc_codes.append(-1)
+                    self._payloads[row] = record["payload"]
+                    self._row_ids[row] = record["id"]
+                    self._id_to_row[record["id"]] = row
+                    row_doc_codes[row] = self._doc_code(record["payload"].get("doc_id"))
+
+        self._num_rows = len(self._payloads)
+        self._alive = np.array([p is not None for p in self._payloads], dtype=bool)
+        self._row_doc_codes = np.array(row_doc_codes, dtype=np.int64)
+
+    def _open_vectors(self, capacity: int) -> None:
+        """Memory-map the vector file, growing it to ``capacity`` rows."""
+        needed_bytes = capacity * self.dimension * 4
+        mode = "r+b" if os.path.exists(self._vectors_path) else "w+b"
+        with open(self._vectors_path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            if f.tell() < needed_bytes:
+                f.truncate(needed_bytes)
+            capacity = f.tell() // (self.dimension * 4)
+        self._vectors = np.memmap(
+            self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dimension)
+        )
+        self._alive = np.resize(self._alive, capacity)
+        self._alive[self._num_rows :] = False
+        self._row_doc_codes = np.resize(self._row_doc_codes, capacity)
+        self._row_doc_codes[self._num_rows :] = -1
+
+    def _doc_code(self, doc_id: str | None) -> int:
+        """Return the integer code used to filter rows by ``doc_id``."""
+        if doc_id is None:
+            return -1
+        return self._doc_codes.setdefault(doc_id, len(self._doc_codes))
+
+    def _kill_row(self, point_id: str) -> None:
+        row = self._id_to_row.pop(point_id, None)
+        if row is not None:
+            self._payloads[row] = None
+            self._alive[row] = False
+
+    def _append_log(self, records: List[Dict[str, Any]]) -> None:
+        with open(self._payloads_path, "a") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.clip(norms, 1e-12, None)
+
+    @property
+    def num_dead_rows(self) -> int:
+        """Number of deleted or overwritten rows still occupying space."""
+        return self._num_rows - len(self._id_to_row)
+
+    @property
+    def num_points(self) -> int:
+        """Number of live points in the index."""
+        return len(self._id_to_row)
+
+    def upsert(
+        self, embeddings: List[List[float]], metadata_list: List[Dict[str, Any]]
+    ) -> None:
+        """Append vectors and metadata to the index.
+
+        Point IDs are derived from each chunk's ``chunk_id`` as in Qdrant, so
+        upserting an existing chunk replaces its previous row.
+        """
+        if not embeddings:
+            print("No embeddings provided to upsert.")
+            return
+
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32))
+        point_ids = [point_id_for_chunk(metadata) for metadata in metadata_list]
+        with self._lock:
+            start = self._num_rows
+            end = start + len(vectors)
+            if end > len(self._vectors):
+                self._vectors.flush()
+                self._open_vectors(max(end, 2 * len(self._vectors)))
+
+            # Vectors are persisted before the log records that reference them
+            self._vectors[start:end] = vectors
+            self._vectors.flush()
+            self._append_log(
+                [
+                    {"row": row, "id": point_id, "payload": metadata}
+                    for row, point_id, metadata in zip(
+                        range(start, end), point_ids, metadata_list
+                    )
+                ]
+            )
+
+            for row, point_id, metadata in zip(range(start, end), point_ids, metadata_list):
+                self._kill_row(point_id)
+                self._payloads.append(metadata)
+                self._row_ids.append(point_id)
+                self._id_to_row[point_id] = row
+                self._row_doc_codes[row] = self._doc_code(metadata.get("doc_id"))
+                self._alive[row] = True
+            self._num_rows = end
+            self._maybe_compact()
+
+    def search(
+        self,
+        query_vector: List[float],
+        top_k: int = 5,
+        filter_doc_ids: List[str] | None = None,
+        query_text: str | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the payloads of the ``top_k`` rows most similar to ``query_vector``.
+
+        Args:
+            query_vector: Vector representation of the query.
+            top_k: Number of results to return.
+            filter_doc_ids: Optional list of document IDs to filter by.
+            query_text: Unused; this backend only does dense retrieval.
+
+        Returns:
+            List[Dict[str, Any]]: Payloads from matching points.
+        """
+        query = self._normalize(np.asarray(query_vector, dtype=np.float32))
+        # Snapshot the live rows under the lock and score them outside it.
+        # Upserts only append past ``num_rows`` and compaction swaps in new
+        # arrays, so the snapshot's vector rows stay valid.
+        with self._lock:
+            num_rows = self._num_rows
+            vectors = self._vectors[:num_rows]
+            payloads = self._payloads[:num_rows]
+            mask = self._alive[:num_rows].copy()
+            if filter_doc_ids:
+                codes = [self._doc_codes[d] for d in filter_doc_ids if d in self._doc_codes]
+                mask &= np.isin(self._row_doc_codes[:num_rows], codes)
+        top_k = min(top_k, int(mask.sum()))
+        if top_k <= 0:
+            return []
+
+        scores = np.asarray(vectors @ query)
+        scores[~mask] = -np.inf
+        best = np.argpartition(-scores, top_k - 1)[:top_k]
+        best = best[np.argsort(-scores[best])]
+        return [payloads[row] for row in best]
+
+    def get_missing_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the chunks whose points are not yet stored in the index."""
+        with self._lock:
+            return [
+                chunk for chunk in chunks if point_id_for_chunk(chunk) not in self._id_to_row
+            ]
+
+    def _load_registry(self) -> Dict[str, Dict[str, Any]] | None:
+        if not os.path.exists(self._registry_path):
+            return None
+        with open(self._registry_path, "r") as f:
+            return {document["doc_id"]: document for document in json.load(f)}
+
+    def _save_registry(self) -> None:
+        tmp_path = f"{self._registry_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(list(self._registry.values()), f)
+        os.replace(tmp_path, self._registry_path)
+
+    def register_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Add or update entries in the document registry.
+
+        Args:
+            documents: Dictionaries with ``doc_id``, ``filename``,
+                ``file_hash`` and ``chunk_count`` keys.
+        """
+        if not documents:
+            return
+        ingested_at = datetime.now(timezone.utc).isoformat()
+        with self._lock:
+            for document in documents:
+                self._registry[document["doc_id"]] = {"ingested_at": ingested_at, **document}
+            self._save_registry()
+
+    def get_document_registry(self) -> List[Dict[str, Any]]:
+        """Return the registry entry of every indexed document."""
+        with self._lock:
+            return list(self._registry.values())
+
+    def scan_indexed_documents(self) -> List[Dict[str, Any]]:
+        """Derive the document list from the payload of every live row."""
+        docs: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for _ in track_documents((p for p in self._payloads if p is not None), docs):
+                pass
+        return list(docs.values())
+
+    def rebuild_document_registry(self) -> int:
+        """Rebuild the document registry from the rows in the index.
+
+        Returns:
+            int: Number of documents registered.
+        """
+        documents = self.scan_indexed_documents()
+        with self._lock:
+            self._registry = {}
+            self._save_registry()
+            self.register_documents(documents)
+        print(f"Document registry rebuilt with {len(documents)} documents.")
+        return len(documents)
+
+    def delete_documents_by_ids(self, doc_ids_to_delete: List[str]) -> None:
+        """Delete all rows associated with the given document IDs.
+
+        Args:
+            doc_ids_to_delete: Document IDs whose chunks should be removed.
+        """
+        if not doc_ids_to_delete:
+            print("No document IDs provided for deletion.")
+            return
+
+        with self._lock:
+            codes = [self._doc_codes[d] for d in doc_ids_to_delete if d in self._doc_codes]
+            num_rows = self._num_rows
+            rows = np.flatnonzero(
+                self._alive[:num_rows] & np.isin(self._row_doc_codes[:num_rows], codes)
+            )
+            point_ids = [self._row_ids[row] for row in rows]
+            if point_ids:
+                self._append_log([{"deleted": point_ids}])
+                for point_id in point_ids:
+                    self._kill_row(point_id)
+
+            for doc_id in doc_ids_to_delete:
+                self._registry.pop(doc_id, None)
+            self._save_registry()
+            print(f"Deleted {len(point_ids)} rows for IDs: {', '.join(doc_ids_to_delete)}")
+            self._maybe_compact()
+
+    def _maybe_compact(self) -> None:
+        if self._num_rows and self.num_dead_rows / self._num_rows > self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Rewrite the index files without deleted and overwritten rows.
+
+        The compacted files are written as a new generation and committed by
+        replacing ``meta.json``; the previous generation is deleted after.
+        """
+        with self._lock:
+            live_rows = np.flatnonzero(self._alive[: self._num_rows])
+            print(
+                f"Compacting NumPy index: {len(live_rows)} live of {self._num_rows} rows..."
+            )
+            capacity = max(self.INITIAL_CAPACITY, 2 * len(live_rows))
+            new_generation = self._generation + 1
+            new_vectors_path = self._data_path("vectors", "f32", new_generation)
+            compacted = np.memmap(
+                new_vectors_path,
+                dtype=np.float32,
+                mode="w+",
+                shape=(capacity, self.dimension),
+            )
+            compacted[: len(live_rows)] = self._vectors[live_rows]
+            compacted.flush()
+            del compacted
+
+            new_payloads_path = self._data_path("payloads", "jsonl", new_generation)
+            with open(new_payloads_path, "w") as f:
+                for new_row, row in enumerate(live_rows):
+                    record = {
+                        "row": new_row,
+                        "id": self._row_ids[row],
+                        "payload": self._payloads[row],
+                    }
+                    f.write(json.dumps(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Switching the generation in meta.json commits both files at once
+            self._save_meta(new_generation)
+            self._generation = new_generation
+            del self._vectors
+            self._remove_stale_files()
+            self._load_payloads()
+            self._open_vectors(capacity)
@@ -1,32 +1,20 @@
 import hashlib
-import json
-import os
 
 import streamlit as st
-from ingestion import process_document
-from vectorstore import QdrantVectorStore
+from answer_cache import answer_cache
+from ingestion import doc_id_for_hash, stream_document
+from ingestion_ledger import STATUS_COMPLETED, IngestionLedger, open_ledger
+from vectorstore import get_shared_vectorstore
 
-# Define cache file relative to the main app script's location or workspace root.
-CACHE_FILE = "processed_cache.json"
+_ledger: IngestionLedger | None = None
 
 
-def load_cache() -> dict:
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "r") as f:
-                return json.load(f)
-        except json.JSONDecodeError:
-            print(f"Warning: Cache file {CACHE_FILE} is corrupted. Starting fresh.")
-            return {}
-    return {}
-
-
-def save_cache(cache_data: dict) -> None:
-    try:
-        with open(CACHE_FILE, "w") as f:
-            json.dump(cache_data, f)
-    except IOError as e:
-        print(f"Error saving cache to {CACHE_FILE}: {e}")
+def get_ledger() -> IngestionLedger:
+    """Return the ingestion ledger shared by every session in this process."""
+    global _ledger
+    if _ledger is None:
+        _ledger = open_ledger()
+    return _ledger
 
 
 def show_add_documents_page():
@@ -39,12 +27,13 @@ def show_add_documents_page():
     )
     st.divider()
 
-    processed_files_cache = load_cache()
+    ledger = get_ledger()
 
-    if "vectorstore" not in st.session_state:
+    # The store is shared by all sessions; retry if it failed to initialize
+    if not st.session_state.get("vectorstore"):
         try:
-            st.session_state.vectorstore = QdrantVectorStore()
-            print("Initialized vectorstore on Add Documents page.")
+            st.session_state.vectorstore = get_shared_vectorstore()
+            print("Attached shared vectorstore on Add Documents page.")
         except Exception as e:
             st.error(f"Failed to initialize vector store connection: {e}")
             st.stop()  # Stop if vectorstore connection fails
@@ -65,13 +54,20 @@ def show_add_documents_page():
             f"**File selected:** {uploaded_file.name} (Hash: `{current_file_hash[:8]}...`)"
         )
 
-        if current_file_hash in processed_files_cache:
+        ledger_entry = ledger.get(current_file_hash)
+        if ledger_entry and ledger_entry["status"] == STATUS_COMPLETED:
             status_placeholder_add_docs.info(
-                f"💾 This file ({uploaded_file.name}) has a matching hash in the local cache."
+                f"💾 This file ({uploaded_file.name}) has a matching hash in the ingestion ledger."
             )
             st.warning(
-                "This document content (based on its hash) appears to be in the local cache. "
-                "If you recently cleared the vector store and want to re-process, ensure `processed_cache.json` is also cleared and restart the app."
+                "This document content (based on its hash) has already been processed. "
+                "If you recently cleared the vector store and want to re-process, clear the ingestion ledger as well."
+            )
+        elif not ledger.claim(
+            current_file_hash, doc_id_for_hash(current_file_hash), uploaded_file.name
+        ):
+            status_placeholder_add_docs.info(
+                f"⏳ This file ({uploaded_file.name}) is already being processed elsewhere."
             )
         else:
             st.info(
@@ -86,31 +82,56 @@ def show_add_documents_page():
                         "vectorstore" not in st.session_state
                         or st.session_state.vectorstore is None
                     ):
-                        st.session_state.vectorstore = QdrantVectorStore()
+                        st.session_state.vectorstore = get_shared_vectorstore()
                         print(
                             "Re-initialized vectorstore before processing on Add Docs page."
                         )
 
-                    status_bar.write("📄 Extracting text and chunking document...")
-                    doc_data = process_document(uploaded_file)
-                    chunks = doc_data["chunks"]
-                    new_doc_id = doc_data["doc_id"]
-                    num_chunks = doc_data["num_chunks"]
-                    status_bar.write(f"Found {num_chunks} text chunks.")
-
                     status_bar.write(
-                        f"🧠 Embedding {num_chunks} chunks and storing in Qdrant..."
+                        "📄 Extracting, chunking and embedding the document page by page..."
                     )
+                    doc_data = stream_document(uploaded_file)
+                    num_pages = doc_data["num_pages"]
                     progress_bar = progress_bar_placeholder.progress(
-                        0, text="Embedding 0%..."
-                    )
-                    st.session_state.vectorstore.embed_and_store_chunks(
-                        chunks, progress_bar=progress_bar
+                        0, text=f"Extracted 0/{num_pages} pages..."
                     )
+                    # Set to the chunk count once every chunk has been produced
+                    extracted = {}
+
+                    def tracked_chunks():
+                        # Embedding pulls chunks as pages are extracted, so the
+                        # extracted pages measure the progress of both
+                        num_chunks = 0
+                        pages_extracted = 0
+                        for chunk in doc_data["chunks"]:
+                            num_chunks += 1
+                            if chunk["page_end"] > pages_extracted:
+                                pages_extracted = chunk["page_end"]
+                                progress_bar.progress(
+                                    pages_extracted / max(num_pages, 1),
+                                    text=f"Extracted {pages_extracted}/{num_pages} pages...",
+                                )
+                            yield chunk
+                        extracted["num_chunks"] = num_chunks
+
+                    try:
+                        # Resume skips chunks already stored by an earlier failed attempt
+                        stored_chunks = st.session_state.vectorstore.embed_and_store_chunks(
+                            tracked_chunks(), progress_bar=progress_bar, resume=True
+                        )
+                    finally:
+                        # Closes the PDF even if embedding stopped early
+                        doc_data["chunks"].close()
                     progress_bar_placeholder.empty()
+                    num_chunks = extracted.get("num_chunks")
+                    if num_chunks is None or stored_chunks < num_chunks:
+                        raise RuntimeError(
+                            f"Only {stored_chunks}/{num_chunks or 'unknown'} chunks were stored. Upload again to resume."
+                        )
+                    status_bar.write(f"Stored {num_chunks} text chunks.")
 
-                    processed_files_cache[current_file_hash] = new_doc_id
-                    save_cache(processed_files_cache)
+                    ledger.complete(current_file_hash, num_chunks=num_chunks)
+                    answer_cache.invalidate()
 
                     status_bar.update(
                         label=f"✅ Processing successful!",
@@ -122,14 +143,21 @@ def show_add_documents_page():
                     )
 
                 except Exception as e:
+                    ledger.fail(current_file_hash, str(e))
                     progress_bar_placeholder.empty()
                     status_bar.update(
                         label=f"❌ Error processing", state="error", expanded=True
                     )
                     st.error(f"Error during processing: {e}")
                     status_placeholder_add_docs.error("Processing failed.")
+                except BaseException:
+                    # Streamlit reruns and stops interrupt the script with
+                    # non-Exception errors; release the claim so a re-upload
+                    # can resume instead of waiting for it to go stale
+                    ledger.fail(current_file_hash, "Processing was interrupted.")
+                    raise
     else:
         status_placeholder_add_docs.info("Upload a new PDF file above.")
 
     st.divider()
-    st.caption(f"Note: Processed file status is tracked locally in `{CACHE_FILE}`.")
+    st.caption(f"Note: Processed file status is tracked locally in `{ledger.path}`.")
@@ -1,5 +1,5 @@
 import streamlit as st
-from llm import generate_chat_response
+from llm import stream_chat_response
 
 
 def show_chat_page():
@@ -22,11 +22,9 @@ def show_chat_page():
         with st.spinner("🤔 Thinking..."):
             try:
                 # Direct chat without context
-                answer = generate_chat_response(question)
-
                 st.markdown("### 🧠 Response")
                 with st.chat_message("ai"):
-                    st.write(answer)
+                    st.write_stream(stream_chat_response(question))
 
             except Exception as e:
                 st.error(f"Error during chat: {e}")
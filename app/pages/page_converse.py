@@ -1,7 +1,9 @@
 import streamlit as st
-from llm import generate_answer
+from answer_cache import answer_cache
+from context import build_context
+from llm import stream_answer
 from retriever import get_relevant_chunks
-from vectorstore import QdrantVectorStore
+from vectorstore import get_shared_vectorstore
 
 
 def show_converse_page():
@@ -10,11 +12,11 @@ def show_converse_page():
         "Ask questions about your documents below. The search will cover all processed documents."
     )
 
-    # Initialize vectorstore in session state if it doesn't exist
-    if "vectorstore" not in st.session_state:
+    # The store is shared by all sessions; retry if it failed to initialize
+    if not st.session_state.get("vectorstore"):
         try:
-            st.session_state.vectorstore = QdrantVectorStore()
-            print("Initialized vectorstore on Converse page.")
+            st.session_state.vectorstore = get_shared_vectorstore()
+            print("Attached shared vectorstore on Converse page.")
         except Exception as e:
             st.error(f"Failed to initialize vector store connection: {e}")
             st.session_state.vectorstore = None
@@ -28,8 +30,10 @@ def show_converse_page():
     else:
         # Show which documents are indexed
         docs = []
+        docs_loaded = False
         try:
             docs = st.session_state.vectorstore.get_indexed_documents()
+            docs_loaded = True
         except Exception as e:
             st.warning(f"Unable to fetch document list: {e}")
 
@@ -52,19 +56,43 @@ def show_converse_page():
             with st.spinner("🤔 Thinking..."):
                 try:
                     vectorstore_instance = st.session_state.vectorstore
-                    results = get_relevant_chunks(
-                        question,
-                        vectorstore_instance,
-                    )
-                    if results:
-                        context_str = "\n\n---\n\n".join(
-                            [chunk["text"] for chunk in results]
+                    # Reuse the answer to an equivalent question over the same
+                    # documents; without the document list the scope is unknown
+                    question_vector = vectorstore_instance.embed_query(question)
+                    scope = None
+                    cached_answer = None
+                    if docs_loaded:
+                        scope = answer_cache.make_scope(doc_id for doc_id, _ in docs)
+                        cached_answer = answer_cache.lookup(question_vector, scope)
+
+                    results = []
+                    if cached_answer is not None:
+                        st.markdown("### 🧠 Answer")
+                        with st.chat_message("ai"):
+                            st.write(cached_answer)
+                        st.caption("Answer reused from an equivalent earlier question.")
+                    else:
+                        # The query embedding above is reused from the store's cache
+                        results = get_relevant_chunks(
+                            question,
+                            vectorstore_instance,
                         )
-                        answer = generate_answer(question, context_str)
+                        if not results:
+                            st.warning(
+                                "Could not retrieve relevant context for this question."
+                            )
+
+                    if results:
+                        context_str = build_context(results)
+                        tokens = stream_answer(question, context_str)
+                        if scope is not None:
+                            tokens = answer_cache.store_stream(
+                                question_vector, scope, tokens
+                            )
 
                         st.markdown("### 🧠 Answer")
                         with st.chat_message("ai"):
-                            st.write(answer)
+                            st.write_stream(tokens)
 
                         with st.expander("📄 Show retrieved context chunks"):
                             for i, chunk in enumerate(results):
@@ -92,9 +120,5 @@ def show_converse_page():
                                     disabled=True,
                                     label_visibility="collapsed",
                                 )
-                    else:
-                        st.warning(
-                            "Could not retrieve relevant context for this question."
-                        )
                 except Exception as e:
                     st.error(f"Error during question answering: {e}")
@@ -0,0 +1,115 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Optional, Tuple
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests per minute and tokens per minute.
+
+    Both budgets refill continuously and may burst up to one minute's worth.
+    :meth:`acquire` blocks the calling thread and :meth:`aacquire` suspends
+    the calling coroutine until a request of the given size fits both
+    budgets. One limiter can be shared by threads and coroutines.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ) -> None:
+        """Create a limiter; a limit of None or 0 is not enforced."""
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self._requests = float(self.requests_per_minute or 0)
+        self._tokens = float(self.tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Take the budget for one request if available.
+
+        Returns:
+            float: 0 if the budget was taken, otherwise the seconds to wait
+            before trying again.
+        """
+        with self._lock:
+            now = time.monotonic()
+            elapsed = now - self._updated
+            self._updated = now
+            wait = 0.0
+            if self.requests_per_minute:
+                self._requests = min(
+                    self.requests_per_minute,
+                    self._requests + elapsed * self.requests_per_minute / 60,
+                )
+                if self._requests < 1:
+                    wait = (1 - self._requests) * 60 / self.requests_per_minute
+            if self.tokens_per_minute:
+                # A request larger than the whole budget waits for a full bucket
+                tokens = min(tokens, self.tokens_per_minute)
+                self._tokens = min(
+                    self.tokens_per_minute,
+                    self._tokens + elapsed * self.tokens_per_minute / 60,
+                )
+                if self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+            if wait:
+                return wait
+            if self.requests_per_minute:
+                self._requests -= 1
+            if self.tokens_per_minute:
+                self._tokens -= tokens
+            return 0.0
+
+    def acquire(self, tokens: int = 0) -> None:
+        """Block until a request of ``tokens`` tokens is allowed."""
+        while wait := self._reserve(tokens):
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int = 0) -> None:
+        """Async variant of :meth:`acquire`."""
+        while wait := self._reserve(tokens):
+            await asyncio.sleep(wait)
+
+
+def backoff_delay(
+    attempt: int,
+    base: float = 1.0,
+    maximum: float = 60.0,
+    retry_after: Optional[float] = None,
+) -> float:
+    """Return the delay before retry number ``attempt`` (starting at 0).
+
+    Exponential backoff with jitter (between half and all of the
+    exponential delay), or the server's ``Retry-After`` if it asked for
+    longer.
+    """
+    cap = min(maximum, base * 2**attempt)
+    delay = random.uniform(cap / 2, cap)
+    if retry_after:
+        delay = max(delay, retry_after)
+    return delay
+
+
+def is_transient(error: Exception, connection_errors: Tuple[type, ...] = ()) -> bool:
+    """Return True if a failed API request is worth retrying.
+
+    Rate-limit (429) and server (5xx) responses are transient, as are the
+    given ``connection_errors`` (connection failures and timeouts).
+    """
+    status_code = getattr(error, "status_code", None)
+    if status_code is not None:
+        return status_code == 429 or status_code >= 500
+    return isinstance(error, connection_errors)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Return the ``Retry-After`` seconds of a failed API response, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
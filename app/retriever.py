@@ -1,13 +1,30 @@
-from typing import Any, Dict, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
 
-from vectorstore import QdrantVectorStore
+from tracing import span
+
+if TYPE_CHECKING:
+    # Only needed for annotations; importing them pulls in the Qdrant client
+    from async_vectorstore import AsyncQdrantVectorStore
+    from vectorstore import QdrantVectorStore
 
 
 def get_relevant_chunks(
     question: str,
-    vectorstore: QdrantVectorStore,
+    vectorstore: "QdrantVectorStore",
+    filter_doc_ids: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    with span("retrieve", top_k=5):
+        return vectorstore.embed_and_search(
+            question, top_k=5, filter_doc_ids=filter_doc_ids
+        )
+
+
+async def aget_relevant_chunks(
+    question: str,
+    vectorstore: "AsyncQdrantVectorStore",
     filter_doc_ids: Optional[List[str]] = None,
 ) -> List[Dict[str, Any]]:
-    return vectorstore.embed_and_search(
-        question, top_k=5, filter_doc_ids=filter_doc_ids
-    )
+    with span("retrieve", top_k=5):
+        return await vectorstore.embed_and_search(
+            question, top_k=5, filter_doc_ids=filter_doc_ids
+        )
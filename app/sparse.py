@@ -0,0 +1,70 @@
+import re
+import zlib
+from collections import Counter
+from typing import List, Tuple
+
+# BM25 term-frequency saturation and length normalization. The IDF part of
+# BM25 is applied by Qdrant at query time (``Modifier.IDF``).
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Typical token count of a 1000-character chunk, used as the average length
+BM25_AVG_DOC_LENGTH = 150.0
+
+# Words, tickers and identifiers, keeping figures such as ``1,234.56``,
+# ``10-K`` or ``2023/24`` together as one token
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.,/\-][a-z0-9]+)*")
+
+STOPWORDS = frozenset(
+    """
+    a an and are as at be by for from has have in is it its of on or that the
+    this to was were will with which what who how when where why do does did
+    """.split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split ``text`` into lowercase terms for sparse retrieval."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        # Also index the parts of compound figures so "1,234.56" matches "1234.56"
+        if any(sep in token for sep in ".,/-"):
+            squashed = re.sub(r"[.,/\-]", "", token)
+            if squashed != token:
+                tokens.append(squashed)
+    return tokens
+
+
+def term_index(term: str) -> int:
+    """Return the sparse vector dimension of ``term``."""
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _to_sparse(weights: Counter) -> Tuple[List[int], List[float]]:
+    merged: Counter = Counter()
+    # Hash collisions just add up the weights of the colliding terms
+    for term, weight in weights.items():
+        merged[term_index(term)] += weight
+    indices = sorted(merged)
+    return indices, [float(merged[i]) for i in indices]
+
+
+def document_sparse_vector(text: str) -> Tuple[List[int], List[float]]:
+    """Return the BM25 term weights of a chunk as sparse ``(indices, values)``."""
+    counts = Counter(tokenize(text))
+    length_norm = 1 - BM25_B + BM25_B * sum(counts.values()) / BM25_AVG_DOC_LENGTH
+    return _to_sparse(
+        Counter(
+            {
+                term: tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+                for term, tf in counts.items()
+            }
+        )
+    )
+
+
+def query_sparse_vector(text: str) -> Tuple[List[int], List[float]]:
+    """Return the sparse ``(indices, values)`` of a query, one unit per distinct term."""
+    return _to_sparse(Counter(dict.fromkeys(tokenize(text), 1.0)))
@@ -0,0 +1,205 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+# Span being recorded in the current thread or asyncio task
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+_backend: Optional[tuple] = None
+_backend_lock = threading.Lock()
+
+
+def _clean(attributes: Dict[str, Any]) -> Dict[str, Any]:
+    """Drop unset attributes; OpenTelemetry rejects None values."""
+    return {key: value for key, value in attributes.items() if value is not None}
+
+
+class Span:
+    """One timed operation, recorded in the OpenTelemetry span data model.
+
+    Used by the built-in JSON file exporter when the OpenTelemetry SDK is
+    not in use; it has the subset of the OpenTelemetry ``Span`` interface
+    the app needs.
+    """
+
+    def __init__(
+        self, name: str, exporter: "JsonFileExporter", attributes: Dict[str, Any]
+    ) -> None:
+        parent = _current_span.get()
+        self.name = name
+        self.exporter = exporter
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = _clean(attributes)
+        self.events = []
+        self.status = "UNSET"
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano: Optional[int] = None
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def record_exception(self, exception: BaseException) -> None:
+        self.status = "ERROR"
+        self.events.append(
+            {
+                "name": "exception",
+                "timeUnixNano": time.time_ns(),
+                "attributes": {
+                    "exception.type": type(exception).__name__,
+                    "exception.message": str(exception),
+                },
+            }
+        )
+
+    def end(self) -> None:
+        if self.end_time_unix_nano is None:
+            self.end_time_unix_nano = time.time_ns()
+            self.exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Return the span with OTLP JSON field names."""
+        return {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "parentSpanId": self.parent_span_id,
+            "name": self.name,
+            "startTimeUnixNano": self.start_time_unix_nano,
+            "endTimeUnixNano": self.end_time_unix_nano,
+            "durationMs": (self.end_time_unix_nano - self.start_time_unix_nano) / 1e6,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status,
+        }
+
+
+class _NoopSpan:
+    """Span returned while tracing is disabled."""
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_exception(self, exception: BaseException) -> None:
+        pass
+
+    def end(self) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonFileExporter:
+    """Appends finished spans to a file, one JSON object per line."""
+
+    def __init__(self, path: str, service_name: str) -> None:
+        self.path = path
+        self.service_name = service_name
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8")
+
+    def export(self, span: Span) -> None:
+        record = {"service": self.service_name, **span.to_dict()}
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+
+def _otel_tracer(service_name: str):
+    """Create an OpenTelemetry tracer exporting to an OTLP collector.
+
+    The collector endpoint is read by the exporter from the standard
+    ``OTEL_EXPORTER_OTLP_ENDPOINT`` setting (default ``localhost:4318``).
+    """
+    from opentelemetry import trace
+    from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    provider = TracerProvider(resource=Resource.create({"service.name": service_name}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+    trace.set_tracer_provider(provider)
+    return trace.get_tracer(service_name)
+
+
+def _get_backend() -> tuple:
+    """Return the configured tracing backend, creating it on first use.
+
+    ``TRACING_EXPORTER`` selects ``none`` (the default), ``json`` (spans
+    appended to ``TRACE_FILE``) or ``otlp`` (OpenTelemetry SDK and OTLP
+    exporter, which must be installed).
+    """
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                exporter = os.getenv("TRACING_EXPORTER", "none").lower()
+                service_name = os.getenv("OTEL_SERVICE_NAME", "fin-know")
+                if exporter == "json":
+                    path = os.getenv("TRACE_FILE", "traces.jsonl")
+                    _backend = ("json", JsonFileExporter(path, service_name))
+                elif exporter == "otlp":
+                    _backend = ("otlp", _otel_tracer(service_name))
+                elif exporter == "none":
+                    _backend = ("none", None)
+                else:
+                    raise ValueError(f"Unknown TRACING_EXPORTER: {exporter}")
+    return _backend
+
+
+def start_span(name: str, **attributes: Any):
+    """Start a span that the caller ends with ``end()``.
+
+    The span is a child of the current span but does not become current
+    itself, so it can cover work that is interleaved with other work, such
+    as a streamed response.
+    """
+    kind, backend = _get_backend()
+    if kind == "json":
+        return Span(name, backend, attributes)
+    if kind == "otlp":
+        return backend.start_span(name, attributes=_clean(attributes))
+    return _NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """Record the ``with`` block as a span, the parent of spans started inside it.
+
+    Exceptions raised in the block are recorded on the span and re-raised.
+    Context follows asyncio tasks and ``run_in_threadpool`` calls, so a
+    request's spans form one trace.
+    """
+    kind, backend = _get_backend()
+    if kind == "otlp":
+        with backend.start_as_current_span(name, attributes=_clean(attributes)) as current:
+            yield current
+        return
+    if kind == "none":
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, backend, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
@@ -1,17 +1,285 @@
 import math
 import os
+import threading
 import time
-from typing import Any, Dict, List
-from uuid import uuid4
-
+from collections.abc import Sized
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextvars import copy_context
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List
+from uuid import NAMESPACE_URL, uuid4, uuid5
+
+from answer_cache import LRUCache
+from collection_config import (
+    SPARSE_VECTOR_NAME,
+    check_vector_size,
+    collection_params,
+    retrieval_mode,
+    search_params,
+)
 from dotenv import load_dotenv
-from openai import OpenAI
+from embedders import Embedder, get_embedder
+from embedding_cache import EmbeddingCache
+from metrics import EMBEDDED_TEXTS_TOTAL, EMBEDDING_SECONDS, QDRANT_SECONDS
 from qdrant_client import QdrantClient, models
+from sparse import document_sparse_vector, query_sparse_vector
+from tracing import span
 
 load_dotenv()
 
+# Namespace for point IDs derived from chunk IDs
+POINT_ID_NAMESPACE = uuid5(NAMESPACE_URL, "fin-know/points")
+
+
+# Payload fields that are filtered on and therefore indexed as keywords
+INDEXED_PAYLOAD_FIELDS = ("doc_id", "filename")
+
+
+def doc_ids_filter(doc_ids: List[str]) -> models.Filter:
+    """Return a filter matching points whose ``doc_id`` is in ``doc_ids``."""
+    return models.Filter(
+        must=[models.FieldCondition(key="doc_id", match=models.MatchAny(any=doc_ids))]
+    )
+
+
+def registry_point_id(doc_id: str) -> str:
+    """Return the ID of a document's entry in the document registry."""
+    return str(uuid5(POINT_ID_NAMESPACE, f"document:{doc_id}"))
+
+
+def track_documents(
+    chunks: Iterable[Dict[str, Any]], documents: Dict[str, Dict[str, Any]]
+) -> Iterator[Dict[str, Any]]:
+    """Pass ``chunks`` through, collecting document registry entries.
+
+    Args:
+        chunks: Chunk metadata dictionaries.
+        documents: Mapping of doc ID to registry entry, filled in as the
+            chunks are consumed.
+    """
+    for chunk in chunks:
+        doc_id = chunk.get("doc_id")
+        if doc_id:
+            if doc_id not in documents:
+                documents[doc_id] = {
+                    "doc_id": doc_id,
+                    "filename": chunk.get("filename", "Unknown"),
+                    "file_hash": chunk.get("file_hash"),
+                    "chunk_count": 0,
+                }
+            documents[doc_id]["chunk_count"] += 1
+        yield chunk
+
+
+def point_id_for_chunk(metadata: Dict[str, Any]) -> str:
+    """Return the Qdrant point ID for a chunk.
+
+    Chunks carrying a ``chunk_id`` get a deterministic UUID so that re-running
+    an ingestion overwrites the same points instead of duplicating them.
+    """
+    chunk_id = metadata.get("chunk_id")
+    if chunk_id:
+        return str(uuid5(POINT_ID_NAMESPACE, chunk_id))
+    return str(uuid4())
+
+
+def point_vector(
+    embedding: List[float], metadata: Dict[str, Any], with_sparse: bool
+) -> Any:
+    """Return the vectors of a chunk's point: dense, plus BM25 if enabled."""
+    if not with_sparse:
+        return embedding
+    indices, values = document_sparse_vector(metadata.get("text", ""))
+    return {
+        "": embedding,
+        SPARSE_VECTOR_NAME: models.SparseVector(indices=indices, values=values),
+    }
+
+
+def hybrid_query(
+    query_vector: List[float],
+    query_text: str,
+    top_k: int,
+    query_filter: Any = None,
+    params: Any = None,
+) -> Dict[str, Any]:
+    """Return ``query_points`` arguments fusing dense and BM25 hits with RRF.
+
+    Both retrievers fetch a deeper candidate list, which reciprocal-rank
+    fusion merges into the final ``top_k``.
+    """
+    indices, values = query_sparse_vector(query_text)
+    prefetch_limit = max(4 * top_k, 20)
+    return {
+        "prefetch": [
+            models.Prefetch(
+                query=query_vector, filter=query_filter, params=params, limit=prefetch_limit
+            ),
+            models.Prefetch(
+                query=models.SparseVector(indices=indices, values=values),
+                using=SPARSE_VECTOR_NAME,
+                filter=query_filter,
+                limit=prefetch_limit,
+            ),
+        ],
+        "query": models.FusionQuery(fusion=models.Fusion.RRF),
+        "limit": top_k,
+        "with_payload": True,
+    }
+
+
+def chunk_points(
+    embeddings: List[List[float]], metadata_list: List[Dict[str, Any]], with_sparse: bool
+) -> List[Any]:
+    """Return the Qdrant points storing chunks with their embeddings.
+
+    Point IDs are derived from each chunk's ``chunk_id`` when present,
+    otherwise generated randomly.
+    """
+    return [
+        models.PointStruct(
+            id=point_id_for_chunk(metadata),
+            vector=point_vector(embedding, metadata, with_sparse),
+            payload=metadata,
+        )
+        for embedding, metadata in zip(embeddings, metadata_list)
+    ]
+
+
+def registry_points(documents: List[Dict[str, Any]]) -> List[Any]:
+    """Return the document registry points for ``documents``, stamped as ingested now."""
+    ingested_at = datetime.now(timezone.utc).isoformat()
+    return [
+        models.PointStruct(
+            id=registry_point_id(document["doc_id"]),
+            vector={},
+            payload={"ingested_at": ingested_at, **document},
+        )
+        for document in documents
+    ]
+
+
+def uncached_texts(texts: List[str], cached: Dict[int, List[float]]) -> List[str]:
+    """Return each distinct text missing from ``cached`` once, in order."""
+    return list(dict.fromkeys(text for i, text in enumerate(texts) if i not in cached))
+
+
+def merge_embeddings(
+    texts: List[str],
+    cached: Dict[int, List[float]],
+    missing_texts: List[str],
+    new_embeddings: List[List[float]],
+) -> List[List[float]]:
+    """Return the embedding of every text from the cache hits and fresh embeddings."""
+    fresh = dict(zip(missing_texts, new_embeddings))
+    return [cached[i] if i in cached else fresh[text] for i, text in enumerate(texts)]
+
+
+class DocumentListCache:
+    """Document registry entries cached for ``ttl`` seconds.
+
+    Every :meth:`invalidate` bumps a generation, so a list fetched while
+    documents were changing is not cached.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl = ttl
+        self._entry: tuple[float, List[Dict[str, Any]]] | None = None
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def get(self) -> tuple[List[Dict[str, Any]] | None, int]:
+        """Return a copy of the cached list (None if expired) and the current generation."""
+        with self._lock:
+            entry, generation = self._entry, self._generation
+        if entry and time.monotonic() - entry[0] < self.ttl:
+            return list(entry[1]), generation
+        return None, generation
+
+    def put(self, documents: List[Dict[str, Any]], generation: int) -> None:
+        """Cache ``documents`` fetched at ``generation`` unless invalidated since."""
+        with self._lock:
+            if generation == self._generation:
+                self._entry = (time.monotonic(), documents)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._entry = None
+            self._generation += 1
+
+
+class VectorStoreBase:
+    """Configuration and bookkeeping shared by the sync and async stores.
+
+    Subclasses only add the I/O: Qdrant requests and embedding calls.
+    """
+
+    def _init_state(self) -> None:
+        """Set up the backend-independent search flags and document list cache."""
+        # Set once the collection is known to have BM25 sparse vectors
+        self.sparse_enabled = False
+        self.hybrid_search = False
+
+        # Document list cache, dropped whenever documents are added or deleted
+        self._document_cache = DocumentListCache(
+            float(os.getenv("DOCUMENT_LIST_CACHE_TTL", "30"))
+        )
+
+    def _init_embedding(self) -> None:
+        """Set up the embedding backend and its caches."""
+        self.embed_max_concurrency = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+        self.query_embedding_cache = LRUCache(
+            int(os.getenv("QUERY_EMBED_CACHE_SIZE", "1024"))
+        )
+
+        # Initialize the embedding backend (OpenAI unless configured otherwise)
+        self.embedder: Embedder = get_embedder()
+        self.embedding_model = self.embedder.model_name
+
+        # On-disk embedding cache; set EMBED_CACHE_PATH to an empty value to disable
+        embed_cache_path = os.getenv("EMBED_CACHE_PATH", "embedding_cache.sqlite3")
+        self.embedding_cache = None
+        if embed_cache_path:
+            self.embedding_cache = EmbeddingCache(
+                embed_cache_path,
+                max_entries=int(os.getenv("EMBED_CACHE_MAX_ENTRIES", "200000")),
+            )
 
-class QdrantVectorStore:
+    def _query_cache_key(self, query: str) -> tuple[str, str]:
+        return (self.embedding_model, query.strip())
+
+    def _chunk_points(
+        self, embeddings: List[List[float]], metadata_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        return chunk_points(embeddings, metadata_list, self.sparse_enabled)
+
+    def invalidate_document_cache(self) -> None:
+        """Drop the cached document list so the next read fetches it again."""
+        self._document_cache.invalidate()
+
+    @staticmethod
+    def _iter_batches(
+        chunks: Iterable[Dict[str, str]], batch_size: int
+    ) -> Iterator[List[Dict[str, str]]]:
+        """Yield successive lists of at most ``batch_size`` chunks."""
+        chunk_iter = iter(chunks)
+        while batch := list(islice(chunk_iter, batch_size)):
+            yield batch
+
+    @staticmethod
+    def _report_batch_progress(
+        progress_bar, completed_batches: int, num_batches: int | None
+    ) -> None:
+        """Update ``progress_bar`` after a batch when the total is known."""
+        if progress_bar and num_batches:
+            progress_bar.progress(
+                min(1.0, completed_batches / num_batches),
+                text=f"Embedding batch {completed_batches}/{num_batches}",
+            )
+
+
+class QdrantVectorStore(VectorStoreBase):
     """Synchronous wrapper around Qdrant for vector storage and retrieval."""
 
     def __init__(self) -> None:
@@ -19,10 +287,8 @@ class QdrantVectorStore:
         self.qdrant_url = os.getenv("QDRANT_URL")
         self.qdrant_api_key = os.getenv("QDRANT_API_KEY")
         self.collection_name = os.getenv("QDRANT_COLLECTION")
-        self.openai_api_key = os.getenv("OPENAI_API_KEY")
+        self.registry_collection_name = f"{self.collection_name}_documents"
 
-        if not self.openai_api_key:
-            raise ValueError("OPENAI_API_KEY environment variable not set.")
         if not self.qdrant_url:
             raise ValueError("QDRANT_URL environment variable not set.")
 
@@ -30,9 +296,11 @@ class QdrantVectorStore:
         self.client = QdrantClient(
             url=self.qdrant_url, api_key=self.qdrant_api_key, timeout=30.0
         )
+        # Quantization rescoring and HNSW search settings (see collection_config)
+        self.search_params = search_params()
 
-        # Initialize Sync OpenAI Client
-        self.openai_client = OpenAI(api_key=self.openai_api_key)
+        self._init_state()
+        self._init_embedding()
 
         # Initialize collection synchronously
         self._init_collection()
@@ -48,55 +316,120 @@ class QdrantVectorStore:
                 print(f"Creating Qdrant collection: {self.collection_name}")
                 self.client.recreate_collection(
                     collection_name=self.collection_name,
-                    vectors_config=models.VectorParams(
-                        size=1536, distance=models.Distance.COSINE
-                    ),
+                    **collection_params(self.embedder.dimension),
                 )
                 print(f"Collection {self.collection_name} created.")
             else:
                 print(f"Collection {self.collection_name} already exists.")
-                pass
+                check_vector_size(
+                    self.client.get_collection(self.collection_name),
+                    self.embedder.dimension,
+                    self.collection_name,
+                )
+
+            # Also creates the indexes on collections from older versions
+            self._ensure_payload_indexes()
+            self._check_sparse_vectors()
+
+            if self.registry_collection_name not in collection_names:
+                print(
+                    f"Creating document registry collection: {self.registry_collection_name}"
+                )
+                self.client.create_collection(
+                    collection_name=self.registry_collection_name,
+                    vectors_config={},
+                )
+                # Backfill the registry from chunks ingested before it existed
+                self.rebuild_document_registry()
 
         except Exception as e:
             print(f"Error initializing Qdrant collection (sync): {e}")
             raise
 
+    def _ensure_payload_indexes(self) -> None:
+        """Create keyword payload indexes for the filtered payload fields."""
+        collection_info = self.client.get_collection(self.collection_name)
+        existing = collection_info.payload_schema or {}
+        for field_name in INDEXED_PAYLOAD_FIELDS:
+            if field_name not in existing:
+                print(f"Creating payload index on '{field_name}'...")
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                    wait=True,
+                )
+
+    def _check_sparse_vectors(self) -> None:
+        """Enable BM25 vectors and hybrid search if the collection supports them.
+
+        Qdrant cannot add a sparse vector to an existing collection, so
+        collections created before hybrid retrieval stay dense-only until
+        migrated with ``scripts/migrate_collection.py --add-sparse``.
+        """
+        collection_info = self.client.get_collection(self.collection_name)
+        sparse_vectors = collection_info.config.params.sparse_vectors or {}
+        self.sparse_enabled = SPARSE_VECTOR_NAME in sparse_vectors
+        self.hybrid_search = self.sparse_enabled and retrieval_mode() == "hybrid"
+        if not self.sparse_enabled:
+            print(
+                f"Warning: collection {self.collection_name} has no '{SPARSE_VECTOR_NAME}' sparse vectors; using dense-only retrieval."
+            )
+
     def embed_texts_openai(self, texts: List[str]) -> List[List[float]]:
-        """Use OpenAI to generate embeddings for a list of texts."""
+        """Generate embeddings for a list of texts with the configured embedder.
+
+        Texts already present in the embedding cache are served from disk;
+        only cache misses are sent to the API.
+        """
         if not texts:
             return []
+
+        cache = self.embedding_cache
+        if cache is None:
+            return self._request_embeddings(texts)
+
+        cached = cache.get_many(self.embedding_model, texts)
+        if len(cached) == len(texts):
+            return [cached[i] for i in range(len(texts))]
+
+        missing_texts = uncached_texts(texts, cached)
+        new_embeddings = self._request_embeddings(missing_texts)
+        cache.put_many(self.embedding_model, missing_texts, new_embeddings)
+        return merge_embeddings(texts, cached, missing_texts, new_embeddings)
+
+    def _request_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Call the embedding backend for ``texts``."""
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-3-small", input=texts
-            )
-            return [d.embedding for d in response.data]
+            with span("embedding.batch", texts=len(texts)), EMBEDDING_SECONDS.time():
+                embeddings = self.embedder.embed(texts)
         except Exception as e:
-            print(f"Error getting OpenAI embeddings (sync) for {len(texts)} texts: {e}")
+            print(f"Error getting embeddings (sync) for {len(texts)} texts: {e}")
             raise
+        EMBEDDED_TEXTS_TOTAL.inc(len(texts))
+        return embeddings
 
     def upsert(
         self, embeddings: List[List[float]], metadata_list: List[Dict[str, Any]]
     ) -> None:
         """Store vectors and metadata in Qdrant.
 
-        Each point ID is generated automatically.
+        Point IDs are derived from each chunk's ``chunk_id`` when present,
+        otherwise generated randomly. BM25 sparse vectors are computed from
+        the chunk text when the collection has them.
         """
         if not embeddings:
             print("No embeddings provided to upsert.")
             return
 
-        points = [
-            models.PointStruct(
-                id=str(uuid4()),
-                vector=embedding,
-                payload=metadata,
-            )
-            for embedding, metadata in zip(embeddings, metadata_list)
-        ]
+        points = self._chunk_points(embeddings, metadata_list)
         try:
-            self.client.upsert(
-                collection_name=self.collection_name, points=points, wait=True
-            )
+            with span("qdrant.upsert", points=len(points)), QDRANT_SECONDS.time(
+                operation="upsert"
+            ):
+                self.client.upsert(
+                    collection_name=self.collection_name, points=points, wait=True
+                )
         except Exception as e:
             print(f"Error upserting {len(points)} points to Qdrant (sync): {e}")
             raise
@@ -106,6 +439,7 @@ class QdrantVectorStore:
         query_vector: List[float],
         top_k: int = 5,
         filter_doc_ids: List[str] | None = None,
+        query_text: str | None = None,
     ) -> List[Dict[str, Any]]:
         """Search the collection for vectors similar to ``query_vector``.
 
@@ -113,6 +447,9 @@ class QdrantVectorStore:
             query_vector: Vector representation of the query.
             top_k: Number of results to return.
             filter_doc_ids: Optional list of document IDs to filter by.
+            query_text: The query itself. In hybrid mode its BM25 matches are
+                fused with the dense results, which finds exact tokens such
+                as tickers, account numbers and figures.
 
         Returns:
             List[Dict[str, Any]]: Payloads from matching points.
@@ -121,73 +458,177 @@ class QdrantVectorStore:
         if filter_doc_ids:
             print(f"Applying search filter for {len(filter_doc_ids)} doc IDs.")
             # Create a filter that matches if doc_id is in the provided list
-            search_filter = models.Filter(
-                should=[
-                    models.FieldCondition(
-                        key="doc_id", match=models.MatchValue(value=doc_id)
+            search_filter = doc_ids_filter(filter_doc_ids)
+
+        try:
+            with span(
+                "qdrant.search", top_k=top_k, hybrid=bool(query_text and self.hybrid_search)
+            ), QDRANT_SECONDS.time(operation="search"):
+                if query_text and self.hybrid_search:
+                    response = self.client.query_points(
+                        collection_name=self.collection_name,
+                        **hybrid_query(
+                            query_vector, query_text, top_k, search_filter, self.search_params
+                        ),
                     )
-                    for doc_id in filter_doc_ids
-                ]
-            )
+                    return [point.payload for point in response.points]
+
+                results = self.client.search(
+                    collection_name=self.collection_name,
+                    query_vector=query_vector,
+                    query_filter=search_filter,  # Pass the filter here
+                    limit=top_k,
+                    search_params=self.search_params,
+                )
+                return [hit.payload for hit in results]
+        except Exception as e:
+            print(f"Error searching Qdrant (sync): {e}")
+            raise
 
+    def get_missing_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the chunks whose points are not yet stored in the collection."""
+        point_ids = [point_id_for_chunk(chunk) for chunk in chunks]
         try:
-            results = self.client.search(
+            existing = self.client.retrieve(
                 collection_name=self.collection_name,
-                query_vector=query_vector,
-                query_filter=search_filter,  # Pass the filter here
-                limit=top_k,
+                ids=point_ids,
+                with_payload=False,
+                with_vectors=False,
             )
-            return [hit.payload for hit in results]
         except Exception as e:
-            print(f"Error searching Qdrant (sync): {e}")
+            print(f"Error checking existing points in Qdrant (sync): {e}")
             raise
+        existing_ids = {str(point.id) for point in existing}
+        return [
+            chunk
+            for chunk, point_id in zip(chunks, point_ids)
+            if point_id not in existing_ids
+        ]
+
+    def _embed_batch(
+        self, batch: List[Dict[str, str]], resume: bool
+    ) -> tuple[List[Dict[str, str]], List[List[float]]]:
+        """Embed the chunks of ``batch`` that still need to be stored.
+
+        Returns:
+            tuple: The chunks to upsert and their embeddings.
+        """
+        if resume:
+            batch = self.get_missing_chunks(batch)
+            if not batch:
+                return [], []
+        return batch, self.embed_texts_openai([chunk["text"] for chunk in batch])
 
     def embed_and_store_chunks(
-        self, chunks: List[Dict[str, str]], batch_size: int = 128, progress_bar=None
-    ) -> None:
+        self,
+        chunks: Iterable[Dict[str, str]],
+        batch_size: int = 128,
+        progress_bar=None,
+        max_concurrency: int | None = None,
+        resume: bool = False,
+    ) -> int:
         """Embed and store text chunks in batches.
 
+        With ``max_concurrency`` greater than one the batches are pipelined:
+        several embedding requests are kept in flight at once and Qdrant
+        upserts overlap with the embedding of later batches.
+
         Args:
-            chunks: List of chunk metadata dictionaries.
+            chunks: List of chunk metadata dictionaries, or any iterable of
+                them (such as the generator from ``ingestion.stream_document``)
+                so that embedding starts while the document is still being
+                chunked.
             batch_size: Number of chunks to embed per batch.
-            progress_bar: Optional Streamlit progress bar to update.
+            progress_bar: Optional Streamlit progress bar to update. Progress
+                fractions are only reported when ``chunks`` has a length.
+            max_concurrency: Maximum number of embedding batches in flight.
+                Defaults to the ``EMBED_MAX_CONCURRENCY`` setting.
+            resume: Skip chunks whose points already exist, so a retried
+                ingestion only embeds and uploads the missing batches.
+
+        Returns:
+            int: Number of chunks stored (including those skipped on resume).
         """
-        if not chunks:
+        if isinstance(chunks, Sized) and not len(chunks):
             print("No chunks provided to embed and store.")
-            return
+            return 0
 
-        num_chunks = len(chunks)
-        num_batches = math.ceil(num_chunks / batch_size)
+        if max_concurrency is None:
+            max_concurrency = self.embed_max_concurrency
+        max_concurrency = max(1, max_concurrency)
+
+        num_chunks = len(chunks) if isinstance(chunks, Sized) else None
+        num_batches = math.ceil(num_chunks / batch_size) if num_chunks else None
+        documents: Dict[str, Dict[str, Any]] = {}
+        batches = self._iter_batches(
+            track_documents(chunks, documents), batch_size
+        )
+        mode = "PIPELINED" if max_concurrency > 1 and num_batches != 1 else "SYNC"
         print(
-            f"Starting SYNC embedding and storage for {num_chunks} chunks in {num_batches} batches (size: {batch_size})..."
+            f"Starting {mode} embedding and storage for {num_chunks or 'streamed'} chunks in {num_batches or 'streamed'} batches (size: {batch_size}, concurrency: {max_concurrency})..."
         )
 
-        total_processed_chunks = 0
         start_time = time.time()
-        for i in range(num_batches):
+        if mode == "PIPELINED":
+            total_processed_chunks, total_chunks = self._embed_and_store_pipelined(
+                batches, num_batches, max_concurrency, progress_bar, resume
+            )
+        else:
+            total_processed_chunks, total_chunks = self._embed_and_store_sequential(
+                batches, num_batches, progress_bar, resume
+            )
+
+        end_time = time.time()
+        print("-" * 30)
+        print(f"{mode} processing complete in {end_time - start_time:.2f} seconds.")
+        print(
+            f"Successfully processed {total_processed_chunks}/{num_chunks or total_chunks} chunks across {num_batches or math.ceil(total_chunks / batch_size)} batches."
+        )
+        print("-" * 30)
+
+        if total_processed_chunks == total_chunks:
+            self.register_documents(list(documents.values()))
+            if progress_bar:
+                progress_bar.progress(1.0, text="Embedding complete!")
+
+        return total_processed_chunks
+
+    def _embed_and_store_sequential(
+        self,
+        batches: Iterator[List[Dict[str, str]]],
+        num_batches: int | None,
+        progress_bar=None,
+        resume: bool = False,
+    ) -> tuple[int, int]:
+        """Embed and upsert ``batches`` one after another.
+
+        Returns:
+            tuple[int, int]: Number of chunks stored and number of chunks seen.
+        """
+        total_processed_chunks = 0
+        total_chunks = 0
+        for i, batch_chunks_metadata in enumerate(batches):
             current_batch_num = i + 1
-            start_index = i * batch_size
-            end_index = min(current_batch_num * batch_size, num_chunks)
-            batch_chunks_metadata = chunks[start_index:end_index]
-            batch_texts = [chunk["text"] for chunk in batch_chunks_metadata]
+            total_chunks += len(batch_chunks_metadata)
 
             try:
-                embeddings = self.embed_texts_openai(batch_texts)
+                pending_chunks, embeddings = self._embed_batch(
+                    batch_chunks_metadata, resume
+                )
+                # Chunks skipped on resume are already stored
+                total_processed_chunks += len(batch_chunks_metadata) - len(
+                    pending_chunks
+                )
                 if embeddings:
-                    self.upsert(embeddings, batch_chunks_metadata)
-                    total_processed_chunks += len(batch_texts)
-                else:
+                    self.upsert(embeddings, pending_chunks)
+                    total_processed_chunks += len(pending_chunks)
+                elif pending_chunks:
                     print(
                         f"Warning: Embedding returned empty for batch {current_batch_num}. Skipping upsert."
                     )
 
                 # Update progress bar if provided
-                if progress_bar:
-                    progress_percentage = min(1.0, current_batch_num / num_batches)
-                    progress_bar.progress(
-                        progress_percentage,
-                        text=f"Embedding batch {current_batch_num}/{num_batches}",
-                    )
+                self._report_batch_progress(progress_bar, current_batch_num, num_batches)
 
             except Exception as e:
                 print(f"Error processing batch {current_batch_num}/{num_batches}: {e}")
@@ -199,16 +640,132 @@ class QdrantVectorStore:
                 # Decide if processing should stop on error
                 break  # Stop processing further batches on error
 
-        end_time = time.time()
-        print("-" * 30)
-        print(f"SYNC processing complete in {end_time - start_time:.2f} seconds.")
-        print(
-            f"Successfully processed {total_processed_chunks}/{num_chunks} chunks across {num_batches} batches."
-        )
-        print("-" * 30)
+        return total_processed_chunks, total_chunks
 
-        if progress_bar and total_processed_chunks == num_chunks:
-            progress_bar.progress(1.0, text="Embedding complete!")
+    def _embed_and_store_pipelined(
+        self,
+        batches: Iterator[List[Dict[str, str]]],
+        num_batches: int | None,
+        max_concurrency: int,
+        progress_bar=None,
+        resume: bool = False,
+    ) -> tuple[int, int]:
+        """Embed and upsert ``batches`` with overlapping network calls.
+
+        At most ``max_concurrency`` embedding requests run at once, and at
+        most twice that many batches are held in memory between embedding
+        and upsert. The progress bar is only touched from the calling
+        thread, as Streamlit requires.
+
+        Returns:
+            tuple[int, int]: Number of chunks stored and number of chunks seen.
+        """
+        total_processed_chunks = 0
+        total_chunks = 0
+        completed_batches = 0
+        max_in_flight = 2 * max_concurrency
+        next_batch_num = 1
+        batches_exhausted = False
+        embeds_in_flight = 0
+        in_flight: Dict[Future, tuple[str, int, List[Dict[str, str]]]] = {}
+        source_error: Exception | None = None
+
+        with ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="embed"
+        ) as embed_pool, ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="upsert"
+        ) as upsert_pool:
+            try:
+                while not batches_exhausted or in_flight:
+                    # Top up the embedding stage while there is headroom
+                    while (
+                        not batches_exhausted
+                        and embeds_in_flight < max_concurrency
+                        and len(in_flight) < max_in_flight
+                    ):
+                        try:
+                            batch = next(batches, None)
+                        except Exception as e:
+                            source_error = e
+                            raise
+                        if batch is None:
+                            batches_exhausted = True
+                            break
+                        total_chunks += len(batch)
+                        # Copies of the caller's context keep trace spans nested
+                        future = embed_pool.submit(
+                            copy_context().run, self._embed_batch, batch, resume
+                        )
+                        in_flight[future] = ("embed", next_batch_num, batch)
+                        embeds_in_flight += 1
+                        next_batch_num += 1
+
+                    if not in_flight:
+                        continue
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        stage, current_batch_num, batch = in_flight.pop(future)
+                        try:
+                            result = future.result()
+                        except Exception as e:
+                            print(
+                                f"Error processing batch {current_batch_num}/{num_batches} ({stage}): {e}"
+                            )
+                            if progress_bar:
+                                progress_bar.progress(
+                                    1.0,
+                                    text=f"Error on batch {current_batch_num}! Check logs.",
+                                )
+                            raise
+
+                        if stage == "embed":
+                            embeds_in_flight -= 1
+                            pending_chunks, embeddings = result
+                            # Chunks skipped on resume are already stored
+                            total_processed_chunks += len(batch) - len(pending_chunks)
+                            if embeddings:
+                                upsert_future = upsert_pool.submit(
+                                    copy_context().run, self.upsert, embeddings, pending_chunks
+                                )
+                                in_flight[upsert_future] = (
+                                    "upsert",
+                                    current_batch_num,
+                                    pending_chunks,
+                                )
+                                continue
+                            if pending_chunks:
+                                print(
+                                    f"Warning: Embedding returned empty for batch {current_batch_num}. Skipping upsert."
+                                )
+                        else:
+                            total_processed_chunks += len(batch)
+
+                        completed_batches += 1
+                        self._report_batch_progress(
+                            progress_bar, completed_batches, num_batches
+                        )
+            except Exception:
+                # Stop processing further batches on error
+                for future in in_flight:
+                    future.cancel()
+                # A failing chunk source fails the ingest, as in the sequential path
+                if source_error is not None:
+                    raise
+
+        return total_processed_chunks, total_chunks
+
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a search query, reusing recent embeddings of the same text."""
+        key = self._query_cache_key(query)
+        query_vector = self.query_embedding_cache.get(key)
+        if query_vector is None:
+            embeddings = self.embed_texts_openai([query])
+            if not embeddings:
+                return []
+            query_vector = embeddings[0]
+            self.query_embedding_cache.put(key, query_vector)
+        return query_vector
 
     def embed_and_search(
         self, query: str, top_k: int = 10, filter_doc_ids: List[str] | None = None
@@ -223,77 +780,139 @@ class QdrantVectorStore:
         Returns:
             List[Dict[str, Any]]: Payloads from matching points.
         """
-        query_vector = self.embed_texts_openai([query])
+        query_vector = self.embed_query(query)
         if not query_vector:
             print("Warning: Failed to embed query.")
             return []
         # Pass the filter_doc_ids down to the search method
-        return self.search(query_vector[0], top_k=top_k, filter_doc_ids=filter_doc_ids)
+        return self.search(
+            query_vector, top_k=top_k, filter_doc_ids=filter_doc_ids, query_text=query
+        )
 
-    def get_indexed_document_ids(self) -> List[str]:
-        """Return all unique document IDs stored in the collection."""
-        unique_doc_ids = set()
-        next_offset = None  # Initialize offset for scrolling
+    def register_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """Add or update entries in the document registry.
+
+        Args:
+            documents: Dictionaries with ``doc_id``, ``filename``,
+                ``file_hash`` and ``chunk_count`` keys.
+        """
+        if not documents:
+            return
+        points = registry_points(documents)
+        try:
+            self.client.upsert(
+                collection_name=self.registry_collection_name, points=points, wait=True
+            )
+        except Exception as e:
+            print(f"Error registering {len(points)} documents (sync): {e}")
+            raise
+        finally:
+            self.invalidate_document_cache()
+
+    def get_document_registry(self) -> List[Dict[str, Any]]:
+        """Return the registry entry of every indexed document.
+
+        The list is cached for ``DOCUMENT_LIST_CACHE_TTL`` seconds; ingests
+        and deletes through this store invalidate it immediately.
+        """
+        documents, generation = self._document_cache.get()
+        if documents is None:
+            documents = self._fetch_document_registry()
+            self._document_cache.put(documents, generation)
+        return list(documents)
+
+    def _fetch_document_registry(self) -> List[Dict[str, Any]]:
+        """Scroll the registry collection."""
+        documents: List[Dict[str, Any]] = []
+        next_offset = None
 
-        print(
-            f"Fetching unique document IDs from collection: {self.collection_name}..."
-        )
         try:
             while True:
-                # Scroll through points, fetching only the payload containing 'doc_id'
                 results, next_offset = self.client.scroll(
-                    collection_name=self.collection_name,
-                    limit=250,  # Adjust batch size as needed
+                    collection_name=self.registry_collection_name,
+                    limit=250,
                     offset=next_offset,
-                    with_payload=["doc_id"],  # Fetch only the doc_id field
-                    with_vectors=False,  # Don't need vectors
+                    with_payload=True,
+                    with_vectors=False,
                 )
+                documents.extend(hit.payload for hit in results if hit.payload)
 
-                # Extract doc_ids from the current batch
-                for hit in results:
-                    if hit.payload and "doc_id" in hit.payload:
-                        unique_doc_ids.add(hit.payload["doc_id"])
-
-                # If no more results, break the loop
                 if not next_offset:
                     break
 
-            return list(unique_doc_ids)
+            return documents
 
         except Exception as e:
-            print(f"Error fetching document IDs: {e}")
+            print(f"Error fetching document registry: {e}")
             raise
 
+    def get_indexed_document_ids(self) -> List[str]:
+        """Return all unique document IDs stored in the collection."""
+        return [document["doc_id"] for document in self.get_document_registry()]
+
     def get_indexed_documents(self) -> List[tuple[str, str]]:
         """Return a list of document IDs and filenames stored in the collection."""
-        docs: dict[str, str] = {}
+        return [
+            (document["doc_id"], document.get("filename", "Unknown"))
+            for document in self.get_document_registry()
+        ]
+
+    def scan_indexed_documents(self) -> List[Dict[str, Any]]:
+        """Derive the document list by scrolling every chunk in the collection.
+
+        This is slow on large collections and is only meant for rebuilding
+        or repairing the document registry.
+        """
+        docs: Dict[str, Dict[str, Any]] = {}
         next_offset = None
 
+        print(f"Scanning all chunks in collection: {self.collection_name}...")
         try:
             while True:
+                # Scroll through points, fetching only the document fields
                 results, next_offset = self.client.scroll(
                     collection_name=self.collection_name,
                     limit=250,
                     offset=next_offset,
-                    with_payload=["doc_id", "filename"],
+                    with_payload=["doc_id", "filename", "file_hash"],
                     with_vectors=False,
                 )
 
-                for hit in results:
-                    payload = hit.payload or {}
-                    doc_id = payload.get("doc_id")
-                    filename = payload.get("filename", "Unknown")
-                    if doc_id and doc_id not in docs:
-                        docs[doc_id] = filename
+                # Count the chunks of each document in this batch
+                for _ in track_documents((hit.payload or {} for hit in results), docs):
+                    pass
 
+                # If no more results, break the loop
                 if not next_offset:
                     break
 
-            return [(doc_id, filename) for doc_id, filename in docs.items()]
+            return list(docs.values())
+
+        except Exception as e:
+            print(f"Error scanning indexed documents: {e}")
+            raise
+
+    def rebuild_document_registry(self) -> int:
+        """Rebuild the document registry from the chunks in the collection.
 
+        Returns:
+            int: Number of documents registered.
+        """
+        documents = self.scan_indexed_documents()
+        try:
+            self.client.delete(
+                collection_name=self.registry_collection_name,
+                points_selector=models.FilterSelector(filter=models.Filter()),
+                wait=True,
+            )
         except Exception as e:
-            print(f"Error fetching indexed documents: {e}")
+            print(f"Error clearing document registry: {e}")
             raise
+        finally:
+            self.invalidate_document_cache()
+        self.register_documents(documents)
+        print(f"Document registry rebuilt with {len(documents)} documents.")
+        return len(documents)
 
     def delete_documents_by_ids(self, doc_ids_to_delete: List[str]) -> None:
         """Delete all points associated with the given document IDs.
@@ -310,17 +929,7 @@ class QdrantVectorStore:
         )
 
         # Construct a filter to match any of the provided doc_ids
-        # We use a 'should' filter which acts like an OR condition.
-        # If we wanted to match ALL conditions, we'd use 'must'.
-        qdrant_filter = models.Filter(
-            should=[
-                models.FieldCondition(
-                    key="doc_id",  # The field in the payload to filter on
-                    match=models.MatchValue(value=doc_id),  # Match this specific value
-                )
-                for doc_id in doc_ids_to_delete
-            ]
-        )
+        qdrant_filter = doc_ids_filter(doc_ids_to_delete)
 
         try:
             # Perform the delete operation
@@ -330,6 +939,13 @@ class QdrantVectorStore:
                 wait=True,  # Wait for the operation to complete
             )
             print(f"Qdrant delete operation status: {response.status}")
+            self.client.delete(
+                collection_name=self.registry_collection_name,
+                points_selector=models.PointIdsList(
+                    points=[registry_point_id(doc_id) for doc_id in doc_ids_to_delete]
+                ),
+                wait=True,
+            )
             if response.status == models.UpdateStatus.COMPLETED:
                 print(
                     f"Successfully deleted points for IDs: {', '.join(doc_ids_to_delete)}"
@@ -341,4 +957,41 @@ class QdrantVectorStore:
 
         except Exception as e:
             print(f"Error deleting points from Qdrant (sync): {e}")
+        finally:
+            self.invalidate_document_cache()
             # Depending on requirements, you might want to raise the exception
+
+
+_shared_vectorstore: QdrantVectorStore | None = None
+_shared_vectorstore_lock = threading.Lock()
+
+
+def get_shared_vectorstore() -> QdrantVectorStore:
+    """Return the vector store shared by every Streamlit session in this process.
+
+    The store is created with :func:`create_vectorstore` on first use, so
+    clients, caches and the collection check are set up once per process
+    rather than once per session. A failed creation is retried on the next
+    call.
+    """
+    global _shared_vectorstore
+    with _shared_vectorstore_lock:
+        if _shared_vectorstore is None:
+            _shared_vectorstore = create_vectorstore()
+        return _shared_vectorstore
+
+
+def create_vectorstore() -> QdrantVectorStore:
+    """Create the vector store selected by the ``VECTOR_BACKEND`` setting.
+
+    ``qdrant`` (the default) connects to the configured Qdrant server;
+    ``numpy`` uses the in-process index at ``NUMPY_INDEX_PATH``.
+    """
+    backend = os.getenv("VECTOR_BACKEND", "qdrant").lower()
+    if backend == "qdrant":
+        return QdrantVectorStore()
+    if backend == "numpy":
+        from numpy_vectorstore import NumpyVectorStore
+
+        return NumpyVectorStore()
+    raise ValueError(f"Unknown VECTOR_BACKEND: {backend}")
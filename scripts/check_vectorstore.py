@@ -1,54 +1,35 @@
-import json
 import os
+import sys
 
-from app.vectorstore import QdrantVectorStore
-
-CACHE_FILE = "processed_cache.json"
-
-
-def load_cache() -> dict:
-    """Load the processed file hash cache from ``CACHE_FILE``.
-
-    Returns:
-        dict: Mapping of document IDs to file hashes.
-    """
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, "r") as f:
-                # Invert the cache for easy lookup: doc_id -> hash
-                original_cache = json.load(f)
-                inverted_cache = {v: k for k, v in original_cache.items()}
-                return inverted_cache
-        except json.JSONDecodeError:
-            print(f"Warning: Cache file {CACHE_FILE} is corrupted.")
-            return {}
-        except Exception as e:
-            print(f"Error loading or inverting cache: {e}")
-            return {}
-    return {}
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
 
+from app.ingestion_ledger import open_ledger
+from app.vectorstore import create_vectorstore
 
 # --- Main logic ---
 try:
     # Initialize Vector Store
-    vectorstore = QdrantVectorStore()
+    vectorstore = create_vectorstore()
 
     # Get indexed document IDs from Qdrant
     indexed_doc_ids = vectorstore.get_indexed_document_ids()
     print(f"\nDocument IDs found in Qdrant: {len(indexed_doc_ids)}")
 
-    # Load and invert the cache (doc_id -> hash)
-    id_to_hash_cache = load_cache()
-    print(f"Cache entries loaded (doc_id -> hash): {len(id_to_hash_cache)}")
+    # Look up the ledger entries (doc_id -> entry) for the indexed documents
+    ledger = open_ledger()
+    id_to_entry = ledger.get_by_doc_ids(indexed_doc_ids)
+    print(f"Ledger entries matched (doc_id -> hash): {len(id_to_entry)}")
 
     # Find corresponding hashes for indexed documents
     found_hashes = []
     missing_in_cache = []
     if indexed_doc_ids:
-        print("\nComparing Qdrant IDs with Cache...")
+        print("\nComparing Qdrant IDs with the ingestion ledger...")
         for doc_id in indexed_doc_ids:
-            if doc_id in id_to_hash_cache:
-                found_hashes.append(id_to_hash_cache[doc_id])
+            if doc_id in id_to_entry:
+                found_hashes.append(id_to_entry[doc_id]["file_hash"])
             else:
                 missing_in_cache.append(doc_id)
 
@@ -57,10 +38,10 @@ try:
             for file_hash in found_hashes:
                 print(f"- Hash: {file_hash}")
         else:
-            print("No matching hashes found in the cache for documents in Qdrant.")
+            print("No matching hashes found in the ledger for documents in Qdrant.")
 
         if missing_in_cache:
-            print("\n--- Document IDs in Qdrant but NOT in Cache ---")
+            print("\n--- Document IDs in Qdrant but NOT in the Ledger ---")
             for doc_id in missing_in_cache:
                 print(f"- ID: {doc_id}")
 
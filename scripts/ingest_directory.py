@@ -0,0 +1,184 @@
+import argparse
+import hashlib
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Iterator, List
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.ingestion import doc_id_for_hash, stream_document
+from app.ingestion_ledger import open_ledger
+from app.vectorstore import create_vectorstore
+
+
+def iter_pdf_paths(source: Path) -> Iterator[Path]:
+    """Yield the PDFs under a directory, or the paths listed in a manifest file.
+
+    A manifest is a text file with one PDF path per line; blank lines and
+    lines starting with ``#`` are ignored. Relative paths are resolved
+    against the manifest's directory.
+    """
+    if source.is_dir():
+        yield from sorted(p for p in source.rglob("*") if p.suffix.lower() == ".pdf")
+        return
+
+    with open(source, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                path = Path(line)
+                yield path if path.is_absolute() else source.parent / path
+
+
+def ingest(
+    paths: List[Path], workers: int, concurrency: int, batch_size: int
+) -> None:
+    """Ingest ``paths``, skipping files the ingestion ledger already knows.
+
+    Each PDF is streamed: its pages are extracted (by up to ``workers``
+    processes for large documents) and chunked while earlier chunks are
+    being embedded and upserted with bounded concurrency, so no document is
+    ever held in memory as a whole.
+    """
+    ledger = open_ledger()
+    vectorstore = create_vectorstore()
+
+    # Each file is claimed just before it is ingested, and the held claim is
+    # renewed so a long document never lets it go stale and get ingested twice
+    held: dict[str, str] = {}
+    held_lock = threading.Lock()
+    seen_hashes: set[str] = set()
+    stop_renewing = threading.Event()
+
+    def renew_claims() -> None:
+        while not stop_renewing.wait(ledger.stale_after / 3):
+            with held_lock:
+                file_hashes = list(held.values())
+            ledger.renew(file_hashes)
+
+    renewer = threading.Thread(target=renew_claims, name="ledger-renew", daemon=True)
+    renewer.start()
+
+    ingested = 0
+    skipped = 0
+    failed = 0
+    total_pages = 0
+    total_chunks = 0
+    start_time = time.time()
+    try:
+        for path in paths:
+            file_hash = hashlib.sha256(path.read_bytes()).hexdigest()
+            if file_hash in seen_hashes or not ledger.claim(
+                file_hash, doc_id_for_hash(file_hash), path.name
+            ):
+                skipped += 1
+                continue
+            seen_hashes.add(file_hash)
+            with held_lock:
+                held[str(path)] = file_hash
+
+            extracted = {}
+            try:
+                doc_data = stream_document(path, max_workers=workers)
+
+                def counted_chunks():
+                    num_chunks = 0
+                    for chunk in doc_data["chunks"]:
+                        num_chunks += 1
+                        yield chunk
+                    extracted["num_chunks"] = num_chunks
+
+                try:
+                    stored_chunks = vectorstore.embed_and_store_chunks(
+                        counted_chunks(),
+                        batch_size=batch_size,
+                        max_concurrency=concurrency,
+                        resume=True,
+                    )
+                finally:
+                    # Closes the PDF and its extraction processes
+                    doc_data["chunks"].close()
+                num_chunks = extracted.get("num_chunks")
+                if num_chunks is None or stored_chunks < num_chunks:
+                    raise RuntimeError(
+                        f"only {stored_chunks}/{num_chunks or 'unknown'} chunks stored"
+                    )
+            except Exception as e:
+                failed += 1
+                with held_lock:
+                    del held[str(path)]
+                ledger.fail(file_hash, str(e))
+                print(f"Failed to ingest {path}: {e}")
+                continue
+
+            with held_lock:
+                del held[str(path)]
+            ledger.complete(file_hash, num_chunks=num_chunks)
+            ingested += 1
+            total_pages += doc_data["num_pages"]
+            total_chunks += num_chunks
+            elapsed = time.time() - start_time
+            print(
+                f"Ingested {path} ({doc_data['num_pages']} pages, {num_chunks} chunks) "
+                f"- {total_pages / elapsed:.1f} pages/s, {total_chunks / elapsed:.1f} chunks/s"
+            )
+    finally:
+        stop_renewing.set()
+        # Release the claim on a file that was never finished (e.g. Ctrl+C)
+        with held_lock:
+            unfinished = list(held.values())
+            held.clear()
+        for file_hash in unfinished:
+            ledger.fail(file_hash, "Bulk ingestion interrupted")
+
+    elapsed = time.time() - start_time
+    print("-" * 30)
+    print(f"Bulk ingestion complete in {elapsed:.2f} seconds.")
+    print(
+        f"{ingested} files ingested, {failed} failed, {skipped} skipped as already "
+        f"processed or in progress: "
+        f"{total_pages} pages ({total_pages / elapsed:.1f} pages/s), "
+        f"{total_chunks} chunks ({total_chunks / elapsed:.1f} chunks/s)."
+    )
+    print("-" * 30)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Ingest every PDF in a directory tree or manifest file."
+    )
+    parser.add_argument(
+        "source", type=Path, help="Directory to scan, or a manifest file of PDF paths."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Page extraction processes per large PDF (default: CPU count).",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Embedding batches in flight (default: EMBED_MAX_CONCURRENCY).",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=128, help="Chunks per embedding batch."
+    )
+    args = parser.parse_args()
+
+    paths = list(iter_pdf_paths(args.source))
+    print(f"Found {len(paths)} PDF files in {args.source}.")
+    try:
+        ingest(paths, args.workers, args.concurrency, args.batch_size)
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
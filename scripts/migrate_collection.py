@@ -0,0 +1,150 @@
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, models
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.collection_config import (
+    collection_params,
+    collection_update_params,
+    quantization_mode,
+)
+from app.vectorstore import INDEXED_PAYLOAD_FIELDS, point_vector
+
+
+def describe_collection(client: QdrantClient, collection_name: str) -> None:
+    """Print the storage settings and size of ``collection_name``."""
+    info = client.get_collection(collection_name)
+    params = info.config.params
+    print(f"  points:        {info.points_count}")
+    print(f"  status:        {info.status}")
+    print(f"  vectors:       {params.vectors}")
+    print(f"  hnsw:          m={info.config.hnsw_config.m}, ef_construct={info.config.hnsw_config.ef_construct}")
+    print(f"  quantization:  {info.config.quantization_config}")
+
+
+def add_sparse_vectors(
+    client: QdrantClient, source: str, target: str, batch_size: int = 256
+) -> int:
+    """Copy ``source`` into a new ``target`` collection with BM25 sparse vectors.
+
+    Qdrant cannot add a sparse vector to an existing collection, so the
+    points are copied with their dense vectors and payloads, and the sparse
+    vectors are computed from the stored chunk text. Nothing is re-embedded.
+
+    Returns:
+        int: Number of points copied.
+    """
+    dimension = client.get_collection(source).config.params.vectors.size
+    client.create_collection(collection_name=target, **collection_params(dimension))
+    for field_name in INDEXED_PAYLOAD_FIELDS:
+        client.create_payload_index(
+            collection_name=target,
+            field_name=field_name,
+            field_schema=models.PayloadSchemaType.KEYWORD,
+            wait=True,
+        )
+
+    copied = 0
+    next_offset = None
+    while True:
+        points, next_offset = client.scroll(
+            collection_name=source,
+            limit=batch_size,
+            offset=next_offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        if points:
+            new_points = []
+            for point in points:
+                # Collections with sparse vectors return the dense one under ""
+                dense = point.vector.get("") if isinstance(point.vector, dict) else point.vector
+                new_points.append(
+                    models.PointStruct(
+                        id=point.id,
+                        vector=point_vector(dense, point.payload or {}, with_sparse=True),
+                        payload=point.payload,
+                    )
+                )
+            client.upsert(collection_name=target, points=new_points, wait=True)
+            copied += len(points)
+            print(f"Copied {copied} points...")
+        if not next_offset:
+            break
+    return copied
+
+
+def migrate_collection(dry_run: bool = False, add_sparse_to: str | None = None) -> None:
+    """Apply the configured quantization, on-disk and HNSW settings in place.
+
+    With ``add_sparse_to`` the collection is instead copied into a new
+    collection that also stores BM25 sparse vectors.
+
+    Qdrant rebuilds the quantized vectors and HNSW graph in the background,
+    so the existing embeddings are kept and nothing is re-embedded. Search
+    keeps working during the rebuild.
+    """
+    load_dotenv()
+
+    qdrant_url = os.getenv("QDRANT_URL")
+    qdrant_api_key = os.getenv("QDRANT_API_KEY")
+    collection_name = os.getenv("QDRANT_COLLECTION")
+
+    if not all([qdrant_url, collection_name]):
+        print(
+            "Error: QDRANT_URL and QDRANT_COLLECTION environment variables must be set."
+        )
+        return
+
+    try:
+        client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=300.0)
+        print(f"Current configuration of '{collection_name}':")
+        describe_collection(client, collection_name)
+
+        if add_sparse_to:
+            if dry_run:
+                print(
+                    f"Dry run: would copy '{collection_name}' to '{add_sparse_to}' with BM25 sparse vectors."
+                )
+                return
+            copied = add_sparse_vectors(client, collection_name, add_sparse_to)
+            print(
+                f"Copied {copied} points to '{add_sparse_to}'. Set QDRANT_COLLECTION={add_sparse_to} to use it; the document registry is rebuilt on first start."
+            )
+            return
+
+        update_params = collection_update_params()
+        print(f"Target quantization: {quantization_mode()}")
+        print(f"Target settings: {update_params}")
+        if dry_run:
+            print("Dry run, no changes made.")
+            return
+
+        client.update_collection(collection_name=collection_name, **update_params)
+        print(f"Collection '{collection_name}' updated; Qdrant is re-indexing it.")
+        describe_collection(client, collection_name)
+
+    except Exception as e:
+        print(f"An error occurred while migrating the collection: {e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Apply the QDRANT_QUANTIZATION, QDRANT_ON_DISK and QDRANT_HNSW_* settings to an existing collection."
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Show the changes without applying them."
+    )
+    parser.add_argument(
+        "--add-sparse",
+        metavar="TARGET",
+        help="Copy the collection into a new TARGET collection with BM25 sparse vectors for hybrid retrieval.",
+    )
+    args = parser.parse_args()
+    migrate_collection(dry_run=args.dry_run, add_sparse_to=args.add_sparse)
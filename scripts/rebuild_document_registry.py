@@ -0,0 +1,30 @@
+import os
+import sys
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.vectorstore import create_vectorstore
+
+
+def rebuild_document_registry():
+    """Rebuild the document registry by scanning every chunk in Qdrant.
+
+    Use this to repair the registry if it has drifted from the chunks stored
+    in the main collection.
+    """
+    try:
+        vectorstore = create_vectorstore()
+        num_documents = vectorstore.rebuild_document_registry()
+        print(
+            f"Registry '{vectorstore.registry_collection_name}' now lists {num_documents} documents."
+        )
+    except ValueError as e:
+        print(f"Configuration Error: {e}")
+    except Exception as e:
+        print(f"An error occurred while rebuilding the document registry: {e}")
+
+
+if __name__ == "__main__":
+    rebuild_document_registry()
@@ -1,7 +1,15 @@
 import os
+import sys
 
 from dotenv import load_dotenv
-from qdrant_client import QdrantClient, models
+from qdrant_client import QdrantClient
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.collection_config import collection_params
+from app.embedders import get_embedder
 
 
 def reset_qdrant_collection():
@@ -26,22 +34,25 @@ def reset_qdrant_collection():
         client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key, timeout=30.0)
         print(f"Connected to Qdrant at {qdrant_url}.")
 
-        # Define the vector parameters based on your project's configuration
-        vector_size = 1536  # From your app/vectorstore.py
-        distance_metric = models.Distance.COSINE  # From your app/vectorstore.py
+        # Vector size from the configured embedder; quantization, on-disk
+        # storage and HNSW settings from the QDRANT_* environment variables
+        vector_size = get_embedder().dimension
 
         print(f"Attempting to delete and recreate collection: '{collection_name}'...")
 
         client.recreate_collection(
-            collection_name=collection_name,
-            vectors_config=models.VectorParams(
-                size=vector_size, distance=distance_metric
-            ),
+            collection_name=collection_name, **collection_params(vector_size)
         )
 
         print(f"Collection '{collection_name}' has been successfully reset.")
         print("All previous data in this collection has been deleted.")
 
+        # The document registry is recreated empty when the app next starts
+        registry_collection_name = f"{collection_name}_documents"
+        if client.collection_exists(registry_collection_name):
+            client.delete_collection(registry_collection_name)
+            print(f"Document registry '{registry_collection_name}' has been deleted.")
+
     except Exception as e:
         print(f"An error occurred while resetting the collection: {e}")
 
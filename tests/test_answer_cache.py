@@ -0,0 +1,41 @@
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.answer_cache import LRUCache, SemanticAnswerCache
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_similar_question_hits_within_same_scope():
+    cache = SemanticAnswerCache(threshold=0.95)
+    scope = cache.make_scope(["doc-1", "doc-2"])
+    cache.store([1.0, 0.0, 0.0], scope, "Revenue was $10m.")
+
+    assert cache.lookup([0.99, 0.05, 0.0], scope) == "Revenue was $10m."
+    assert cache.lookup([0.0, 1.0, 0.0], scope) is None
+    # Adding a document changes the scope, so the old answer is not reused
+    assert cache.lookup([1.0, 0.0, 0.0], cache.make_scope(["doc-1", "doc-2", "doc-3"])) is None
+
+
+def test_streamed_answer_is_cached_after_completion():
+    cache = SemanticAnswerCache()
+    scope = cache.make_scope(["doc-1"])
+    tokens = cache.store_stream([0.0, 1.0], scope, iter(["Net ", "income"]))
+    assert cache.lookup([0.0, 1.0], scope) is None
+    assert "".join(tokens) == "Net income"
+    assert cache.lookup([0.0, 1.0], scope) == "Net income"
+
+    cache.invalidate()
+    assert cache.lookup([0.0, 1.0], scope) is None
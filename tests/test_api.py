@@ -0,0 +1,125 @@
+import sys
+import os
+import asyncio
+import threading
+import time
+from types import ModuleType
+
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+# Stub external dependencies
+dotenv_stub = ModuleType("dotenv")
+dotenv_stub.load_dotenv = lambda *a, **kw: None
+sys.modules.setdefault("dotenv", dotenv_stub)
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+from fastapi.testclient import TestClient
+
+from app import main
+from app.answer_cache import SemanticAnswerCache
+
+
+class FakeStore:
+    async def embed_query(self, question):
+        return [1.0, 0.0]
+
+    async def get_indexed_document_ids(self):
+        return ["doc"]
+
+    async def close(self):
+        pass
+
+
+class FakeQueue:
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def services(monkeypatch):
+    """Mark the services as started, with fakes in place of Qdrant and the LLM."""
+    monkeypatch.setattr(main, "vectorstore", FakeStore())
+    monkeypatch.setattr(main, "job_queue", FakeQueue())
+    monkeypatch.setattr(main, "answer_cache", SemanticAnswerCache())
+
+    async def no_chunks(question, vectorstore):
+        return []
+
+    monkeypatch.setattr(main, "aget_relevant_chunks", no_chunks)
+    # Without the lifespan the warm-up task never runs
+    return TestClient(main.app)
+
+
+def test_streamed_answer_is_framed_as_events_ending_with_done(services, monkeypatch):
+    monkeypatch.setattr(
+        main, "stream_answer", lambda question, context: iter(["Revenue", " was\n$5M."])
+    )
+
+    response = services.post("/ask", data={"question": "Q3 revenue?", "stream": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    # Multi-line tokens get one data field per line
+    assert response.text == (
+        "data: Revenue\n\n"
+        "data:  was\ndata: $5M.\n\n"
+        "event: done\ndata: \n\n"
+    )
+
+    # The cached answer is replayed as a single event, still ending with done
+    cached = services.post("/ask", data={"question": "Q3 revenue?", "stream": "true"})
+    assert cached.text == "data: Revenue was\ndata: $5M.\n\nevent: done\ndata: \n\n"
+
+
+def test_stream_failing_midway_ends_with_an_error_event(services, monkeypatch):
+    def failing_stream(question, context):
+        yield "Revenue"
+        raise RuntimeError("upstream closed the stream")
+
+    monkeypatch.setattr(main, "stream_answer", failing_stream)
+
+    response = services.post("/ask", data={"question": "Q3 revenue?", "stream": "true"})
+    assert response.text == (
+        "data: Revenue\n\n"
+        "event: error\ndata: upstream closed the stream\n\n"
+    )
+    # The partial answer is not cached
+    assert main.answer_cache.lookup([1.0, 0.0], frozenset(["doc"])) is None
+
+
+def test_ready_answers_503_until_warm_up_finishes(monkeypatch):
+    monkeypatch.setattr(main, "vectorstore", None)
+    monkeypatch.setattr(main, "job_queue", None)
+    monkeypatch.setattr(main, "llm_ready", False)
+    monkeypatch.setattr(main, "startup_errors", {})
+    monkeypatch.setattr(main, "get_gateway", lambda: None)
+    release = threading.Event()
+
+    async def start_services():
+        while not release.is_set():
+            await asyncio.sleep(0.01)
+        main.vectorstore = FakeStore()
+        main.job_queue = FakeQueue()
+
+    monkeypatch.setattr(main, "_start_services", start_services)
+
+    with TestClient(main.app) as client:
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json()["components"]["qdrant"] is False
+
+        release.set()
+        deadline = time.monotonic() + 5
+        while client.get("/ready").status_code != 200:
+            assert time.monotonic() < deadline, "service never became ready"
+            time.sleep(0.01)
+
+    assert client.get("/ready").json() == {
+        "ready": True,
+        "components": {"qdrant": True, "llm": True},
+        "errors": {},
+    }
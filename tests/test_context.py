@@ -0,0 +1,50 @@
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+
+import app.context as context
+from app.context import CONTEXT_SEPARATOR, build_context, merge_chunks
+
+
+def make_chunk(doc_id, index, text, page=1):
+    return {
+        "chunk_id": f"{doc_id}_{index}",
+        "doc_id": doc_id,
+        "filename": f"{doc_id}.pdf",
+        "text": text,
+        "page_start": page,
+        "page_end": page,
+    }
+
+
+def test_merge_chunks_joins_adjacent_chunks_without_overlap():
+    chunks = [
+        make_chunk("a", 4, "the quarter. Net income rose 8%.", page=3),
+        make_chunk("b", 0, "Unrelated text."),
+        make_chunk("a", 3, "Revenue grew 12% in the quarter.", page=2),
+        make_chunk("a", 4, "the quarter. Net income rose 8%.", page=3),
+    ]
+    passages = merge_chunks(chunks)
+    assert [p["text"] for p in passages] == [
+        "Revenue grew 12% in the quarter. Net income rose 8%.",
+        "Unrelated text.",
+    ]
+    assert (passages[0]["page_start"], passages[0]["page_end"]) == (2, 3)
+
+
+def test_build_context_packs_passages_into_budget(monkeypatch):
+    monkeypatch.setattr(context, "get_token_counter", lambda: lambda text: len(text) // 4)
+    chunks = [
+        make_chunk("a", 0, "x" * 400),
+        make_chunk("b", 0, "y" * 4000),
+        make_chunk("c", 0, "z" * 400),
+    ]
+    # The oversized second passage is skipped in favour of the third
+    assert build_context(chunks, token_budget=250) == CONTEXT_SEPARATOR.join(
+        ["x" * 400, "z" * 400]
+    )
+
+    truncated = build_context(chunks[1:2], token_budget=100)
+    assert 0 < len(truncated) <= 400
@@ -0,0 +1,71 @@
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.embedding_cache import EmbeddingCache
+
+
+def test_cache_roundtrip_is_keyed_by_model_and_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many("model-a", ["hello", "world"], [[0.5, 1.0], [2.0, -1.5]])
+
+    found = cache.get_many("model-a", ["world", "missing", "hello", "world"])
+    assert found == {0: [2.0, -1.5], 2: [0.5, 1.0], 3: [2.0, -1.5]}
+    assert cache.get_many("model-b", ["hello"]) == {}
+
+    # Entries survive reopening the database
+    cache.close()
+    reopened = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    assert reopened.get_many("model-a", ["hello"]) == {0: [0.5, 1.0]}
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    cache.put_many("m", ["a"], [[1.0]])
+    cache.put_many("m", ["b"], [[2.0]])
+    cache.get_many("m", ["a"])  # touch "a" so "b" becomes the oldest
+    cache.put_many("m", ["c"], [[3.0]])
+
+    assert len(cache) == 2
+    assert set(cache.get_many("m", ["a", "b", "c"])) == {0, 2}
+
+
+def test_cache_count_ignores_replaced_entries(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"), max_entries=3)
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    cache.put_many("m", ["a", "b", "c"], [[1.5], [2.0], [3.0]])
+
+    assert len(cache) == 3
+    assert cache.get_many("m", ["a", "b", "c"]) == {0: [1.5], 1: [2.0], 2: [3.0]}
+    assert (cache.hits, cache.misses) == (3, 0)
+
+
+def test_cache_recounts_entries_added_by_other_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = EmbeddingCache(path, max_entries=3)
+    other = EmbeddingCache(path, max_entries=3)
+    cache.RECOUNT_INTERVAL = 3
+    cache.put_many("m", ["a", "b"], [[1.0], [2.0]])
+    other.put_many("m", ["c", "d"], [[3.0], [4.0]])
+
+    # Neither connection counted more than 3 entries, but the table holds 5
+    cache.put_many("m", ["e"], [[5.0]])
+    assert len(cache) == 3
+
+
+def test_cache_hits_are_recorded_in_batches(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    cache.put_many("m", ["a"], [[1.0]])
+    (stored,) = cache._conn.execute("SELECT last_access FROM embeddings").fetchone()
+
+    cache.get_many("m", ["a"])
+    assert cache._conn.execute("SELECT last_access FROM embeddings").fetchone() == (stored,)
+
+    cache.close()
+    reopened = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+    (flushed,) = reopened._conn.execute("SELECT last_access FROM embeddings").fetchone()
+    assert flushed >= stored
+    assert reopened._pending_access == {}
@@ -3,6 +3,8 @@ import sys
 import os
 from types import ModuleType
 
+import pytest
+
 root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, root)
 sys.path.insert(0, os.path.join(root, "app"))
@@ -39,6 +41,7 @@ class DummyPage:
 class DummyPdf:
     def __init__(self, texts):
         self.pages = [DummyPage(t) for t in texts]
+        self.closed = False
 
     def __len__(self):
         return len(self.pages)
@@ -46,6 +49,9 @@ class DummyPdf:
     def load_page(self, index):
         return self.pages[index]
 
+    def close(self):
+        self.closed = True
+
 
 def test_process_document_with_mocked_pymupdf(tmp_path, monkeypatch):
     dummy_pdf = DummyPdf(["page one", "page two"])
@@ -65,3 +71,78 @@ def test_process_document_with_mocked_pymupdf(tmp_path, monkeypatch):
     assert len(result["chunks"]) == result["num_chunks"]
     assert all(chunk["doc_id"] == result["doc_id"] for chunk in result["chunks"])
     assert all(chunk["filename"] == pdf_path.name for chunk in result["chunks"])
+
+
+def test_split_pages_tracks_page_range():
+    chunks = list(ingestion.split_pages(iter(["first page", "", "third page"])))
+    # The dummy splitter never splits, so everything carries into one chunk
+    assert len(chunks) == 1
+    assert chunks[0]["page_start"] == 1
+    assert chunks[0]["page_end"] == 3
+    assert "first page" in chunks[0]["text"] and "third page" in chunks[0]["text"]
+
+
+def test_stream_document_yields_chunks_lazily(tmp_path, monkeypatch):
+    dummy_pdf = DummyPdf(["page one", "page two"])
+    monkeypatch.setattr(
+        ingestion, "pymupdf", type("m", (), {"open": staticmethod(lambda *a, **kw: dummy_pdf)})
+    )
+    pdf_path = tmp_path / "dummy.pdf"
+    pdf_path.write_bytes(b"pdfcontent")
+
+    doc_data = ingestion.stream_document(pdf_path)
+    assert doc_data["num_pages"] == 2
+    assert not isinstance(doc_data["chunks"], list)
+    chunks = list(doc_data["chunks"])
+    assert chunks[0]["chunk_id"] == f"{doc_data['doc_id']}_0"
+    assert (chunks[0]["page_start"], chunks[-1]["page_end"]) == (1, 2)
+    assert dummy_pdf.closed
+
+
+def test_doc_id_is_derived_from_file_hash(tmp_path, monkeypatch):
+    monkeypatch.setattr(
+        ingestion, "pymupdf", type("m", (), {"open": staticmethod(lambda *a, **kw: DummyPdf(["text"]))})
+    )
+    first = tmp_path / "first.pdf"
+    second = tmp_path / "second.pdf"
+    first.write_bytes(b"same content")
+    second.write_bytes(b"same content")
+
+    first_result = ingestion.process_document(first)
+    second_result = ingestion.process_document(second)
+    assert first_result["doc_id"] == second_result["doc_id"]
+    assert first_result["chunks"][0]["chunk_id"] == second_result["chunks"][0]["chunk_id"]
+
+
+def test_parallel_extraction_matches_sequential(monkeypatch):
+    # The stub installed above hides the real module, if it is installed
+    monkeypatch.delitem(sys.modules, "pymupdf")
+    pymupdf = pytest.importorskip("pymupdf")
+    monkeypatch.setattr(ingestion, "pymupdf", pymupdf)
+
+    generated = pymupdf.open()
+    for page_num in range(120):
+        page = generated.new_page()
+        page.insert_text((72, 72), f"Page {page_num} of the annual report")
+    pdf_bytes = generated.tobytes()
+    generated.close()
+
+    pools = []
+
+    class RecordingPool(ingestion.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(kwargs["max_workers"])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(ingestion, "ProcessPoolExecutor", RecordingPool)
+    pdf = pymupdf.open(stream=pdf_bytes, filetype="pdf")
+    try:
+        parallel = list(ingestion.iter_page_texts(pdf, pdf_bytes, max_workers=2))
+        sequential = list(ingestion.iter_page_texts(pdf, pdf_bytes, max_workers=1))
+    finally:
+        pdf.close()
+
+    assert pools == [2]
+    assert len(parallel) == 120
+    assert parallel == sequential
+    assert "Page 119 of the annual report" in parallel[-1]
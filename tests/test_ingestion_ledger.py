@@ -0,0 +1,64 @@
+import sys
+import os
+import threading
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+from app.ingestion_ledger import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    STATUS_PROCESSING,
+    IngestionLedger,
+)
+
+
+def test_claim_is_exclusive_until_failure(tmp_path):
+    ledger = IngestionLedger(str(tmp_path / "ledger.sqlite3"))
+    assert ledger.claim("hash", "doc", "a.pdf")
+    assert ledger.get("hash")["status"] == STATUS_PROCESSING
+    assert not ledger.claim("hash", "doc", "a.pdf")
+
+    ledger.fail("hash", "boom")
+    assert ledger.get("hash")["status"] == STATUS_FAILED
+    assert ledger.claim("hash", "doc", "a.pdf")
+
+    ledger.complete("hash", num_chunks=7)
+    entry = ledger.get("hash")
+    assert (entry["status"], entry["num_chunks"]) == (STATUS_COMPLETED, 7)
+    assert ledger.is_processed("hash")
+    assert not ledger.claim("hash", "doc", "a.pdf")
+    assert ledger.get_by_doc_ids(["doc", "other"])["doc"]["file_hash"] == "hash"
+
+
+def test_stale_claims_can_be_taken_over(tmp_path):
+    ledger = IngestionLedger(str(tmp_path / "ledger.sqlite3"), stale_after=-1)
+    assert ledger.claim("hash", "doc")
+    assert ledger.claim("hash", "doc")
+
+
+def test_renewed_claims_do_not_go_stale(tmp_path):
+    ledger = IngestionLedger(str(tmp_path / "ledger.sqlite3"), stale_after=60)
+    assert ledger.claim("hash", "doc")
+    ledger._conn.execute("UPDATE ingestions SET updated_at = 0")
+
+    ledger.renew(["hash"])
+    assert not ledger.claim("hash", "doc")
+
+
+def test_only_one_concurrent_claim_wins(tmp_path):
+    path = str(tmp_path / "ledger.sqlite3")
+    IngestionLedger(path)
+    results = []
+
+    def worker():
+        # Separate connections, as separate workers would have
+        results.append(IngestionLedger(path).claim("hash", "doc"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results.count(True) == 1
@@ -0,0 +1,124 @@
+import asyncio
+import sys
+import os
+from types import ModuleType
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+# Stub external dependencies
+sys.modules.setdefault("pymupdf", ModuleType("pymupdf"))
+langchain_stub = ModuleType("langchain")
+text_splitter_stub = ModuleType("langchain.text_splitter")
+text_splitter_stub.RecursiveCharacterTextSplitter = object
+langchain_stub.text_splitter = text_splitter_stub
+sys.modules.setdefault("langchain", langchain_stub)
+sys.modules.setdefault("langchain.text_splitter", text_splitter_stub)
+
+import jobs
+from ingestion_ledger import STATUS_COMPLETED, STATUS_FAILED, IngestionLedger
+
+
+class FakeVectorStore:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.stored = []
+
+    async def embed_and_store_chunks(self, chunks, resume=False, progress_callback=None):
+        if self.fail:
+            raise RuntimeError("embedding failed")
+        chunks = list(chunks)
+        self.stored.extend(chunks)
+        await progress_callback(1, None, len(chunks))
+        return len(chunks)
+
+
+def fake_stream_document(path):
+    chunks = [
+        {"chunk_id": f"doc_{i}", "text": f"chunk {i}", "filename": "spooled.pdf", "page_end": i + 1}
+        for i in range(3)
+    ]
+    return {"num_pages": 3, "chunks": (chunk for chunk in chunks)}
+
+
+def make_queue(tmp_path, vectorstore):
+    ledger = IngestionLedger(str(tmp_path / "ledger.sqlite3"))
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"))
+    queue = jobs.IngestionQueue(vectorstore, ledger, store, spool_dir=str(tmp_path / "spool"))
+    return queue, ledger, store
+
+
+async def run_upload(queue, ledger, file_hash):
+    await queue.start()
+    assert ledger.claim(file_hash, "doc", "report.pdf")
+    job = await queue.submit(b"%PDF", file_hash, "report.pdf")
+    await queue._queue.join()
+    await queue.stop()
+    return queue.store.get(job["job_id"])
+
+
+def test_job_completes_with_progress(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "stream_document", fake_stream_document)
+    vectorstore = FakeVectorStore()
+    queue, ledger, store = make_queue(tmp_path, vectorstore)
+
+    job = asyncio.run(run_upload(queue, ledger, "hash"))
+
+    assert job["status"] == jobs.JOB_COMPLETED
+    assert jobs.job_status(job)["progress"] == {
+        "num_pages": 3,
+        "pages_extracted": 3,
+        "num_chunks": 3,
+        "chunks_embedded": 3,
+        "num_batches": 1,
+        "batches_upserted": 1,
+    }
+    assert {chunk["filename"] for chunk in vectorstore.stored} == {"report.pdf"}
+    assert ledger.get("hash")["status"] == STATUS_COMPLETED
+    assert not os.listdir(tmp_path / "spool")
+
+
+def test_failed_job_records_error(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "stream_document", fake_stream_document)
+    queue, ledger, store = make_queue(tmp_path, FakeVectorStore(fail=True))
+
+    job = asyncio.run(run_upload(queue, ledger, "hash"))
+
+    assert job["status"] == jobs.JOB_FAILED
+    assert job["error"] == "embedding failed"
+    assert ledger.get("hash")["status"] == STATUS_FAILED
+
+
+def test_unfinished_jobs_are_requeued_on_start(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "stream_document", fake_stream_document)
+    queue, ledger, store = make_queue(tmp_path, FakeVectorStore())
+    spooled = tmp_path / "spool" / "hash.pdf"
+    spooled.parent.mkdir()
+    spooled.write_bytes(b"%PDF")
+    ledger.claim("hash", "doc", "report.pdf")
+    job = store.create("hash", "doc", "report.pdf", str(spooled))
+    store.update(job["job_id"], status=jobs.JOB_RUNNING)
+
+    async def restart():
+        await queue.start()
+        await queue._queue.join()
+        await queue.stop()
+
+    asyncio.run(restart())
+    assert store.get(job["job_id"])["status"] == jobs.JOB_COMPLETED
+
+
+def test_jobs_leased_by_a_live_worker_are_not_claimed(tmp_path):
+    store = jobs.JobStore(str(tmp_path / "jobs.sqlite3"), lease_seconds=60)
+    job = store.create("hash", "doc", "report.pdf", "spooled.pdf", owner="worker-a")
+
+    assert store.unfinished() == []
+    assert not store.claim(job["job_id"], "worker-b")
+    assert [j["job_id"] for j in store.renew_leases("worker-a")] == [job["job_id"]]
+
+    store.update(job["job_id"], lease_expires_at=0)
+    assert [j["job_id"] for j in store.unfinished()] == [job["job_id"]]
+    assert store.claim(job["job_id"], "worker-b")
+    assert not store.claim(job["job_id"], "worker-a")
+    assert store.get(job["job_id"])["owner"] == "worker-b"
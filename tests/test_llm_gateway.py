@@ -0,0 +1,207 @@
+import sys
+import os
+import threading
+from types import SimpleNamespace
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+import llm_gateway
+from llm_gateway import LLMGateway, LLMTimeoutError
+
+MESSAGES = [{"role": "user", "content": "What was Q3 revenue?"}]
+
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+
+class FakeCompletions:
+    """Chat completions API failing with the queued errors, then answering."""
+
+    def __init__(self, errors=(), release=None):
+        self.errors = list(errors)
+        self.release = release
+        self.calls = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def create(self, model, messages, max_tokens, timeout, stream=False):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.release is not None:
+                self.release.wait(5)
+            if self.errors:
+                raise self.errors.pop(0)
+            message = SimpleNamespace(content=f"answer to {messages[-1]['content']}")
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def make_gateway(completions, **kwargs):
+    client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    return LLMGateway(client, **kwargs)
+
+
+def run_concurrently(function, arguments):
+    results = [None] * len(arguments)
+
+    def run(i):
+        try:
+            results[i] = function(*arguments[i])
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(arguments))]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def test_identical_requests_in_flight_are_coalesced():
+    release = threading.Event()
+    completions = FakeCompletions(release=release)
+    gateway = make_gateway(completions)
+
+    threads, results = run_concurrently(
+        gateway.complete, [("model", MESSAGES, 64)] * 5
+    )
+    threading.Timer(0.1, release.set).start()
+    for thread in threads:
+        thread.join()
+
+    assert completions.calls == 1
+    assert results == ["answer to What was Q3 revenue?"] * 5
+    assert not gateway._in_flight
+
+
+def test_concurrency_is_bounded():
+    release = threading.Event()
+    completions = FakeCompletions(release=release)
+    gateway = make_gateway(completions, max_concurrency=2)
+
+    threads, results = run_concurrently(
+        gateway.complete,
+        [("model", [{"role": "user", "content": str(i)}], 64) for i in range(6)],
+    )
+    threading.Timer(0.1, release.set).start()
+    for thread in threads:
+        thread.join()
+
+    assert completions.calls == 6
+    assert completions.max_in_flight == 2
+    assert results == [f"answer to {i}" for i in range(6)]
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(llm_gateway.time, "sleep", sleeps.append)
+    completions = FakeCompletions(errors=[APIError(429), APIError(502)])
+    gateway = make_gateway(completions)
+
+    assert gateway.complete("model", MESSAGES, 64) == "answer to What was Q3 revenue?"
+    assert completions.calls == 3
+    assert len(sleeps) == 2
+
+
+def test_client_errors_are_not_retried():
+    completions = FakeCompletions(errors=[APIError(400)])
+    gateway = make_gateway(completions)
+
+    try:
+        gateway.complete("model", MESSAGES, 64)
+    except APIError as e:
+        assert e.status_code == 400
+    else:
+        raise AssertionError("expected the API error to propagate")
+    assert completions.calls == 1
+
+
+def test_deadline_covers_waiting_for_a_slot():
+    release = threading.Event()
+    completions = FakeCompletions(release=release)
+    gateway = make_gateway(completions, max_concurrency=1)
+
+    threads, _ = run_concurrently(gateway.complete, [("model", MESSAGES, 64)])
+    while not completions.in_flight:
+        pass
+    try:
+        gateway.complete("model", [{"role": "user", "content": "other"}], 64, timeout=0.05)
+    except LLMTimeoutError:
+        pass
+    else:
+        raise AssertionError("expected the call to time out")
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+
+class FakeStreamingCompletions:
+    """Streaming chat completions API yielding one piece per word."""
+
+    def __init__(self, words, release=None):
+        self.words = words
+        self.release = release
+        self.calls = 0
+        self.closed = threading.Event()
+
+    def create(self, model, messages, max_tokens, timeout, stream=False):
+        self.calls += 1
+        return self._chunks()
+
+    def _chunks(self):
+        try:
+            for i, word in enumerate(self.words):
+                if i and self.release is not None:
+                    self.release.wait(5)
+                delta = SimpleNamespace(content=word)
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        finally:
+            self.closed.set()
+
+
+def test_identical_streams_share_one_upstream_stream():
+    release = threading.Event()
+    completions = FakeStreamingCompletions(["Revenue ", "was ", "$5M."], release=release)
+    gateway = make_gateway(completions)
+
+    first = gateway.stream("model", MESSAGES, 64)
+    # The first piece arrives before the rest of the stream is released
+    assert next(first) == "Revenue "
+    threads, results = run_concurrently(
+        lambda: "".join(gateway.stream("model", MESSAGES, 64)), [()] * 3
+    )
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert "Revenue " + "".join(first) == "Revenue was $5M."
+    # Callers that joined late still received the pieces generated earlier
+    assert results == ["Revenue was $5M."] * 3
+    assert completions.calls == 1
+    assert not gateway._streams_in_flight
+
+
+def test_abandoned_stream_releases_its_slot():
+    release = threading.Event()
+    completions = FakeStreamingCompletions(["a", "b", "c"], release=release)
+    gateway = make_gateway(completions, max_concurrency=1)
+
+    tokens = gateway.stream("model", MESSAGES, 64)
+    assert next(tokens) == "a"
+    tokens.close()
+    release.set()
+
+    assert completions.closed.wait(5)
+    assert list(gateway.stream("model", MESSAGES, 64)) == ["a", "b", "c"]
+    assert completions.calls == 2
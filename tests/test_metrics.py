@@ -0,0 +1,65 @@
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+import pytest
+
+import metrics
+from metrics import Counter, Histogram, render_cache_stats
+
+
+def test_counter_renders_labelled_samples():
+    counter = Counter("test_requests_total", "Requests.", ("service",))
+    counter.inc(service="llm")
+    counter.inc(2, service="embedding")
+
+    assert counter.value(service="llm") == 1
+    assert counter.render() == (
+        "# HELP test_requests_total Requests.\n"
+        "# TYPE test_requests_total counter\n"
+        'test_requests_total{service="embedding"} 2\n'
+        'test_requests_total{service="llm"} 1\n'
+    )
+    with pytest.raises(ValueError):
+        counter.inc(stage="llm")
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("test_latency_seconds", "Latency.", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5.0)
+
+    lines = histogram.render().splitlines()[2:]
+    assert lines == [
+        'test_latency_seconds_bucket{le="0.1"} 1',
+        'test_latency_seconds_bucket{le="1"} 2',
+        'test_latency_seconds_bucket{le="+Inf"} 3',
+        "test_latency_seconds_sum 5.55",
+        "test_latency_seconds_count 3",
+    ]
+
+
+def test_histogram_times_blocks():
+    histogram = Histogram("test_stage_seconds", "Stage latency.", ("stage",))
+    with histogram.time(stage="search"):
+        pass
+    assert histogram.count(stage="search") == 1
+    assert histogram.count(stage="upsert") == 0
+
+
+def test_unlabelled_metrics_render_zero_before_first_use():
+    Counter("test_unused_total", "Unused.")
+    assert "test_unused_total 0\n" in metrics.render()
+
+
+def test_cache_stats_include_hit_ratio():
+    text = render_cache_stats({"answer": (3, 1), "embedding": (0, 0)})
+
+    assert 'cache_hits_total{cache="answer"} 3' in text
+    assert 'cache_misses_total{cache="answer"} 1' in text
+    assert 'cache_hit_ratio{cache="answer"} 0.75' in text
+    assert 'cache_hit_ratio{cache="embedding"} 0' in text
@@ -0,0 +1,150 @@
+import sys
+import os
+from types import ModuleType
+
+import numpy as np
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+# Stub external dependencies
+dotenv_stub = ModuleType("dotenv")
+dotenv_stub.load_dotenv = lambda *a, **kw: None
+sys.modules.setdefault("dotenv", dotenv_stub)
+
+qdrant_stub = ModuleType("qdrant_client")
+qdrant_stub.QdrantClient = object
+qdrant_stub.models = ModuleType("qdrant_client.models")
+qdrant_stub.models.Filter = object
+sys.modules.setdefault("qdrant_client", qdrant_stub)
+
+# Other test modules may have stubbed out the vectorstore module
+if not hasattr(sys.modules.get("vectorstore"), "point_id_for_chunk"):
+    sys.modules.pop("vectorstore", None)
+
+import vectorstore
+from embedders import Embedder
+from numpy_vectorstore import NumpyVectorStore
+
+
+class FakeEmbedder(Embedder):
+    model_name = "fake"
+    dimension = 4
+
+    def embed(self, texts):
+        # Each text embeds onto the axis given by its first character
+        return [np.eye(self.dimension)[int(text[0])].tolist() for text in texts]
+
+
+def make_store(tmp_path, monkeypatch, **kwargs):
+    monkeypatch.setenv("EMBED_CACHE_PATH", "")
+    monkeypatch.setattr(vectorstore, "get_embedder", FakeEmbedder)
+    return NumpyVectorStore(path=str(tmp_path / "index"), **kwargs)
+
+
+def make_chunks(doc_id, texts):
+    return [
+        {"chunk_id": f"{doc_id}_{i}", "text": text, "doc_id": doc_id, "filename": f"{doc_id}.pdf"}
+        for i, text in enumerate(texts)
+    ]
+
+
+def test_search_returns_nearest_chunks(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.embed_and_store_chunks(make_chunks("a", ["0 x", "1 x", "2 x"]))
+    store.embed_and_store_chunks(make_chunks("b", ["1 y", "3 y"]))
+
+    results = store.search([0.1, 1.0, 0.0, 0.0], top_k=3)
+    assert [r["text"] for r in results[:2]] in (["1 x", "1 y"], ["1 y", "1 x"])
+    assert len(results) == 3
+
+    filtered = store.search([0.1, 1.0, 0.0, 0.0], top_k=3, filter_doc_ids=["b"])
+    assert [r["text"] for r in filtered] == ["1 y", "3 y"]
+    assert store.get_indexed_documents() == [("a", "a.pdf"), ("b", "b.pdf")]
+
+
+def test_index_persists_and_upserts_replace_rows(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.embed_and_store_chunks(make_chunks("a", ["0 x", "1 x"]))
+    # Re-ingesting the same chunk IDs overwrites instead of duplicating
+    store.embed_and_store_chunks(make_chunks("a", ["2 x", "3 x"]))
+    store.close()
+
+    reopened = make_store(tmp_path, monkeypatch)
+    assert reopened.num_points == 2
+    assert [r["text"] for r in reopened.search([0, 0, 1, 0], top_k=1)] == ["2 x"]
+    assert reopened.get_missing_chunks(make_chunks("a", ["x", "x", "x"])) == [
+        make_chunks("a", ["x", "x", "x"])[2]
+    ]
+
+
+def test_delete_and_compaction(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch, compact_threshold=0.5)
+    store.embed_and_store_chunks(make_chunks("a", ["0 x", "1 x"]))
+    store.embed_and_store_chunks(make_chunks("b", ["2 y", "3 y"]))
+
+    store.delete_documents_by_ids(["a"])
+    assert store.num_dead_rows == 2
+    assert store.get_indexed_document_ids() == ["b"]
+    assert [r["doc_id"] for r in store.search([1, 0, 0, 0], top_k=5)] == ["b", "b"]
+
+    store.embed_and_store_chunks(make_chunks("c", ["0 z"]))
+    store.delete_documents_by_ids(["b"])
+    # More than half of the rows were dead, so the index was compacted
+    assert store.num_dead_rows == 0
+    store.close()
+
+    reopened = make_store(tmp_path, monkeypatch)
+    assert [r["text"] for r in reopened.search([1, 0, 0, 0], top_k=5)] == ["0 z"]
+    assert reopened.get_indexed_document_ids() == ["c"]
+
+
+def test_interrupted_compaction_keeps_previous_generation(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch, compact_threshold=1.0)
+    store.embed_and_store_chunks(make_chunks("a", ["0 x", "1 x"]))
+    store.embed_and_store_chunks(make_chunks("b", ["2 y"]))
+    store.delete_documents_by_ids(["a"])
+
+    def crash(generation):
+        raise OSError("crashed before committing the new generation")
+
+    # The new files are written, but meta.json still points at the old ones
+    monkeypatch.setattr(store, "_save_meta", crash)
+    with pytest.raises(OSError):
+        store.compact()
+    store.close()
+
+    reopened = make_store(tmp_path, monkeypatch)
+    assert reopened.num_points == 1
+    assert [r["text"] for r in reopened.search([0, 0, 1, 0], top_k=5)] == ["2 y"]
+    assert sorted(os.listdir(tmp_path / "index")) == [
+        ".lock",
+        "meta.json",
+        "payloads.jsonl",
+        "registry.json",
+        "vectors.f32",
+    ]
+
+    reopened.compact()
+    reopened.close()
+    again = make_store(tmp_path, monkeypatch)
+    assert again.num_dead_rows == 0
+    assert [r["text"] for r in again.search([0, 0, 1, 0], top_k=5)] == ["2 y"]
+
+
+def test_document_cache_can_be_invalidated(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    store.embed_and_store_chunks(make_chunks("a", ["0 x"]))
+    store.invalidate_document_cache()
+    assert store.get_indexed_document_ids() == ["a"]
+
+
+def test_index_cannot_be_opened_twice(tmp_path, monkeypatch):
+    store = make_store(tmp_path, monkeypatch)
+    with pytest.raises(RuntimeError, match="open in another process"):
+        make_store(tmp_path, monkeypatch)
+
+    store.close()
+    make_store(tmp_path, monkeypatch).close()
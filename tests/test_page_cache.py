@@ -9,9 +9,11 @@ sys.path.insert(0, root)
 sys.path.insert(0, os.path.join(root, "app"))
 
 sys.modules.setdefault("streamlit", ModuleType("streamlit"))
+sys.modules.setdefault("pymupdf", ModuleType("pymupdf"))
 
 vectorstore_stub = ModuleType("vectorstore")
 vectorstore_stub.QdrantVectorStore = object
+vectorstore_stub.get_shared_vectorstore = lambda: None
 sys.modules.setdefault("vectorstore", vectorstore_stub)
 
 langchain_stub = ModuleType("langchain")
@@ -32,17 +34,24 @@ sys.modules.setdefault("langchain.text_splitter", text_splitter_stub)
 from app.pages import page_add_documents as pages
 
 
-def test_cache_roundtrip(tmp_path):
+def test_ledger_migrates_legacy_cache(tmp_path, monkeypatch):
     cache_file = tmp_path / "cache.json"
-    # monkeypatch the module-level CACHE_FILE
-    pages.CACHE_FILE = str(cache_file)
+    cache_file.write_text(json.dumps({"abc": "123"}))
+    monkeypatch.setenv("LEGACY_CACHE_FILE", str(cache_file))
+    monkeypatch.setenv("INGESTION_LEDGER_PATH", str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr(pages, "_ledger", None)
 
-    data = {"abc": "123"}
-    pages.save_cache(data)
-    assert cache_file.exists()
-    loaded = pages.load_cache()
-    assert loaded == data
+    ledger = pages.get_ledger()
+    assert pages.get_ledger() is ledger
+    assert ledger.is_processed("abc")
+    assert ledger.get("abc")["doc_id"] == "123"
 
-    # corrupt file -> load_cache returns empty dict
+
+def test_corrupt_legacy_cache_is_ignored(tmp_path, monkeypatch):
+    cache_file = tmp_path / "cache.json"
     cache_file.write_text("not json")
-    assert pages.load_cache() == {}
+    monkeypatch.setenv("LEGACY_CACHE_FILE", str(cache_file))
+    monkeypatch.setenv("INGESTION_LEDGER_PATH", str(tmp_path / "ledger.sqlite3"))
+    monkeypatch.setattr(pages, "_ledger", None)
+
+    assert not pages.get_ledger().is_processed("abc")
@@ -0,0 +1,133 @@
+import sys
+import os
+from types import SimpleNamespace
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+import embedders
+import rate_limit
+from embedders import OpenAIEmbedder
+from rate_limit import RateLimiter, backoff_delay
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def test_rate_limiter_waits_for_request_budget(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    limiter = RateLimiter(requests_per_minute=2)
+
+    limiter.acquire()
+    limiter.acquire()
+    assert clock.sleeps == []
+    # Out of requests: one request refills in 30 seconds
+    limiter.acquire()
+    assert clock.sleeps == [30.0]
+
+
+def test_rate_limiter_waits_for_token_budget(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    limiter = RateLimiter(tokens_per_minute=600)
+
+    limiter.acquire(500)
+    # 100 tokens left; 300 more refill in 30 seconds
+    limiter.acquire(400)
+    assert clock.sleeps == [30.0]
+    # Requests larger than the bucket wait for a full bucket
+    limiter.acquire(10_000)
+    assert clock.sleeps[1:] == [60.0]
+
+
+def test_backoff_delay_is_jittered_and_capped():
+    for attempt in range(10):
+        cap = min(60.0, 2**attempt)
+        assert cap / 2 <= backoff_delay(attempt) <= cap
+    assert backoff_delay(0, retry_after=7) == 7
+
+
+class APIError(Exception):
+    def __init__(self, status_code, message="", retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        headers = {"retry-after": str(retry_after)} if retry_after else {}
+        self.response = SimpleNamespace(headers=headers)
+
+
+class FakeEmbeddings:
+    """Embeddings API failing with the queued errors, then with oversize batches."""
+
+    def __init__(self, errors=(), max_inputs=None):
+        self.errors = list(errors)
+        self.max_inputs = max_inputs
+        self.requests = []
+
+    def create(self, model, input):
+        self.requests.append(list(input))
+        if self.errors:
+            raise self.errors.pop(0)
+        if self.max_inputs and len(input) > self.max_inputs:
+            raise APIError(400, "Too many tokens: maximum request size exceeded")
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+
+def make_embedder(embeddings, max_batch_tokens=100_000):
+    embedder = OpenAIEmbedder.__new__(OpenAIEmbedder)
+    embedder.model_name = "text-embedding-3-small"
+    embedder.client = SimpleNamespace(embeddings=embeddings)
+    embedder._connection_errors = (ConnectionError,)
+    embedder.rate_limiter = RateLimiter()
+    embedder.max_batch_tokens = max_batch_tokens
+    embedder.max_retries = 3
+    embedder.count_tokens = len
+    return embedder
+
+
+def test_batches_are_sized_by_tokens():
+    embeddings = FakeEmbeddings()
+    embedder = make_embedder(embeddings, max_batch_tokens=5)
+
+    assert embedder.embed(["aa", "bbb", "cccc", "d", "eeeeee"]) == [[2.0], [3.0], [4.0], [1.0], [6.0]]
+    assert embeddings.requests == [["aa", "bbb"], ["cccc", "d"], ["eeeeee"]]
+
+
+def test_transient_errors_are_retried(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(embedders.time, "sleep", sleeps.append)
+    embeddings = FakeEmbeddings(errors=[APIError(429, retry_after=5), APIError(503), ConnectionError()])
+    embedder = make_embedder(embeddings)
+
+    assert embedder.embed(["a"]) == [[1.0]]
+    assert len(embeddings.requests) == 4
+    assert len(sleeps) == 3 and sleeps[0] >= 5
+
+
+def test_client_errors_are_not_retried():
+    embedder = make_embedder(FakeEmbeddings(errors=[APIError(401, "bad key")]))
+    try:
+        embedder.embed(["a"])
+    except APIError as e:
+        assert e.status_code == 401
+    else:
+        raise AssertionError("expected the API error to propagate")
+
+
+def test_oversize_batches_are_split():
+    embeddings = FakeEmbeddings(max_inputs=2)
+    embedder = make_embedder(embeddings)
+
+    assert embedder.embed(["a", "bb", "ccc", "dddd", "e"]) == [[1.0], [2.0], [3.0], [4.0], [1.0]]
+    assert [len(r) for r in embeddings.requests] == [5, 2, 3, 1, 2]
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import os
 from types import ModuleType
@@ -10,7 +11,11 @@ vectorstore_stub = ModuleType("vectorstore")
 vectorstore_stub.QdrantVectorStore = object
 sys.modules.setdefault("vectorstore", vectorstore_stub)
 
-from app.retriever import get_relevant_chunks
+async_vectorstore_stub = ModuleType("async_vectorstore")
+async_vectorstore_stub.AsyncQdrantVectorStore = object
+sys.modules.setdefault("async_vectorstore", async_vectorstore_stub)
+
+from app.retriever import aget_relevant_chunks, get_relevant_chunks
 
 
 class DummyVectorStore:
@@ -28,3 +33,15 @@ def test_get_relevant_chunks_passes_arguments():
     chunks = get_relevant_chunks("question", store, filter_doc_ids=["1"])
     assert chunks == [{"text": "chunk"}]
     assert store.called_args == ("question", 5, ["1"])
+
+
+class DummyAsyncVectorStore(DummyVectorStore):
+    async def embed_and_search(self, query, top_k=5, filter_doc_ids=None):
+        return super().embed_and_search(query, top_k, filter_doc_ids)
+
+
+def test_aget_relevant_chunks_passes_arguments():
+    store = DummyAsyncVectorStore([{"text": "chunk"}])
+    chunks = asyncio.run(aget_relevant_chunks("question", store, filter_doc_ids=["1"]))
+    assert chunks == [{"text": "chunk"}]
+    assert store.called_args == ("question", 5, ["1"])
@@ -0,0 +1,32 @@
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+
+from app.sparse import document_sparse_vector, query_sparse_vector, term_index, tokenize
+
+
+def test_tokenize_keeps_tickers_and_figures():
+    tokens = tokenize("The CUSIP for AAPL is 037833100; net income was $1,234.56M.")
+    assert "aapl" in tokens
+    assert "037833100" in tokens
+    assert "1,234.56m" in tokens
+    # Compound figures are also indexed without separators
+    assert "123456m" in tokens
+    assert "the" not in tokens
+
+
+def test_document_vector_saturates_term_frequency():
+    indices, values = document_sparse_vector("revenue revenue revenue revenue margin")
+    weights = dict(zip(indices, values))
+    assert indices == sorted(indices)
+    assert weights[term_index("revenue")] > weights[term_index("margin")]
+    # BM25 saturation: four occurrences weigh less than four times one
+    assert weights[term_index("revenue")] < 4 * weights[term_index("margin")]
+
+
+def test_query_vector_weights_each_term_once():
+    indices, values = query_sparse_vector("AAPL aapl revenue")
+    assert sorted(indices) == sorted({term_index("aapl"), term_index("revenue")})
+    assert values == [1.0, 1.0]
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import sys
+import os
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+import pytest
+
+import tracing
+from tracing import JsonFileExporter, span, start_span
+
+
+@pytest.fixture
+def trace_file(tmp_path, monkeypatch):
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(tracing, "_backend", ("json", JsonFileExporter(str(path), "test")))
+
+    def read():
+        return {record["name"]: record for record in map(json.loads, path.read_text().splitlines())}
+
+    return read
+
+
+def test_nested_spans_share_a_trace(trace_file):
+    with span("request", route="/ask"):
+        with span("qdrant.search", top_k=5, unset=None) as current:
+            current.set_attribute("hits", 3)
+
+    spans = trace_file()
+    request, search = spans["request"], spans["qdrant.search"]
+    assert request["parentSpanId"] is None
+    assert search["traceId"] == request["traceId"]
+    assert search["parentSpanId"] == request["spanId"]
+    assert search["attributes"] == {"top_k": 5, "hits": 3}
+    assert search["startTimeUnixNano"] <= search["endTimeUnixNano"]
+
+
+def test_exceptions_are_recorded(trace_file):
+    with pytest.raises(ValueError):
+        with span("llm.complete"):
+            raise ValueError("throttled")
+
+    record = trace_file()["llm.complete"]
+    assert record["status"] == "ERROR"
+    assert record["events"][0]["attributes"]["exception.message"] == "throttled"
+
+
+def test_started_spans_do_not_become_current(trace_file):
+    with span("request"):
+        stream = start_span("llm.stream")
+        with span("context.build"):
+            pass
+        stream.end()
+
+    spans = trace_file()
+    assert spans["llm.stream"]["parentSpanId"] == spans["request"]["spanId"]
+    assert spans["context.build"]["parentSpanId"] == spans["request"]["spanId"]
+
+
+def test_context_follows_tasks_and_threads(trace_file):
+    def embed():
+        with span("embedding.batch"):
+            pass
+
+    async def handle():
+        with span("request"):
+            await asyncio.gather(asyncio.to_thread(embed))
+
+    asyncio.run(handle())
+    spans = trace_file()
+    assert spans["embedding.batch"]["parentSpanId"] == spans["request"]["spanId"]
+
+
+def test_disabled_tracing_records_nothing(monkeypatch):
+    monkeypatch.setattr(tracing, "_backend", ("none", None))
+    with span("request") as current:
+        current.set_attribute("ignored", True)
+    start_span("llm.stream").end()
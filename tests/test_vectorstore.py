@@ -0,0 +1,278 @@
+import sys
+import os
+import threading
+import time
+from types import ModuleType
+
+import pytest
+
+root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, root)
+sys.path.insert(0, os.path.join(root, "app"))
+
+# Stub external dependencies
+dotenv_stub = ModuleType("dotenv")
+dotenv_stub.load_dotenv = lambda *a, **kw: None
+sys.modules.setdefault("dotenv", dotenv_stub)
+
+openai_stub = ModuleType("openai")
+openai_stub.OpenAI = object
+sys.modules.setdefault("openai", openai_stub)
+
+qdrant_stub = ModuleType("qdrant_client")
+qdrant_stub.QdrantClient = object
+qdrant_stub.models = ModuleType("qdrant_client.models")
+qdrant_stub.models.Filter = object
+sys.modules.setdefault("qdrant_client", qdrant_stub)
+
+from app.vectorstore import QdrantVectorStore
+
+
+class DummyProgressBar:
+    def __init__(self):
+        self.calls = []
+
+    def progress(self, value, text=None):
+        self.calls.append((value, text))
+
+
+class FakeStore(QdrantVectorStore):
+    """QdrantVectorStore with network calls replaced by in-memory fakes."""
+
+    def __init__(self, fail_on=None):
+        self.embed_max_concurrency = 1
+        self.embedding_cache = None
+        self.fail_on = fail_on
+        self.stored = []
+        self.registered = []
+        self.max_parallel_embeds = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def embed_texts_openai(self, texts):
+        with self._lock:
+            self._active += 1
+            self.max_parallel_embeds = max(self.max_parallel_embeds, self._active)
+        time.sleep(0.01)
+        with self._lock:
+            self._active -= 1
+        if self.fail_on and self.fail_on in texts:
+            raise RuntimeError("embedding failed")
+        return [[float(len(t))] for t in texts]
+
+    def upsert(self, embeddings, metadata_list):
+        with self._lock:
+            self.stored.extend(metadata_list)
+
+    def register_documents(self, documents):
+        self.registered.extend(documents)
+
+
+def make_chunks(n):
+    return [{"text": f"chunk {i}", "doc_id": "doc"} for i in range(n)]
+
+
+def test_pipelined_embedding_stores_all_chunks():
+    store = FakeStore()
+    progress_bar = DummyProgressBar()
+    chunks = make_chunks(50)
+
+    store.embed_and_store_chunks(
+        chunks, batch_size=5, progress_bar=progress_bar, max_concurrency=4
+    )
+
+    assert sorted(c["text"] for c in store.stored) == sorted(c["text"] for c in chunks)
+    assert 1 < store.max_parallel_embeds <= 4
+    assert progress_bar.calls[-1] == (1.0, "Embedding complete!")
+    assert [(d["doc_id"], d["chunk_count"]) for d in store.registered] == [("doc", 50)]
+
+
+def test_pipelined_embedding_stops_on_error():
+    store = FakeStore(fail_on="chunk 12")
+    progress_bar = DummyProgressBar()
+
+    store.embed_and_store_chunks(
+        make_chunks(100), batch_size=5, progress_bar=progress_bar, max_concurrency=2
+    )
+
+    assert len(store.stored) < 100
+    assert store.registered == []
+    assert any("Error on batch" in (text or "") for _, text in progress_bar.calls)
+
+
+def test_embed_texts_only_requests_cache_misses(tmp_path):
+    from app.embedding_cache import EmbeddingCache
+
+    requested = []
+
+    class CachedStore(QdrantVectorStore):
+        def __init__(self):
+            self.embedding_model = "test-model"
+            self.embedding_cache = EmbeddingCache(str(tmp_path / "cache.sqlite3"))
+
+        def _request_embeddings(self, texts):
+            requested.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    store = CachedStore()
+    assert store.embed_texts_openai(["aa", "bbb", "aa"]) == [[2.0], [3.0], [2.0]]
+    assert store.embed_texts_openai(["bbb", "c"]) == [[3.0], [1.0]]
+    assert requested == [["aa", "bbb"], ["c"]]
+
+
+def test_embed_and_store_accepts_chunk_generator():
+    store = FakeStore()
+    progress_bar = DummyProgressBar()
+
+    store.embed_and_store_chunks(
+        (chunk for chunk in make_chunks(23)),
+        batch_size=5,
+        progress_bar=progress_bar,
+        max_concurrency=3,
+    )
+
+    assert len(store.stored) == 23
+    assert progress_bar.calls == [(1.0, "Embedding complete!")]
+
+
+def test_failing_chunk_generator_is_not_registered():
+    store = FakeStore()
+    progress_bar = DummyProgressBar()
+
+    def chunks():
+        yield from make_chunks(12)
+        raise RuntimeError("extraction failed")
+
+    with pytest.raises(RuntimeError, match="extraction failed"):
+        store.embed_and_store_chunks(
+            chunks(), batch_size=5, progress_bar=progress_bar, max_concurrency=3
+        )
+
+    assert store.registered == []
+    assert (1.0, "Embedding complete!") not in progress_bar.calls
+
+
+def test_point_ids_are_deterministic_per_chunk():
+    from app.vectorstore import point_id_for_chunk
+
+    chunk = {"chunk_id": "doc_0", "text": "t"}
+    assert point_id_for_chunk(chunk) == point_id_for_chunk(dict(chunk))
+    assert point_id_for_chunk(chunk) != point_id_for_chunk({"chunk_id": "doc_1"})
+
+
+def test_resume_only_embeds_missing_chunks():
+    class ResumingStore(FakeStore):
+        def __init__(self, existing):
+            super().__init__()
+            self.existing = existing
+            self.embedded = []
+
+        def get_missing_chunks(self, chunks):
+            return [c for c in chunks if c["text"] not in self.existing]
+
+        def embed_texts_openai(self, texts):
+            self.embedded.extend(texts)
+            return super().embed_texts_openai(texts)
+
+    chunks = make_chunks(20)
+    existing = {c["text"] for c in chunks[:12]}
+    for max_concurrency in (1, 3):
+        store = ResumingStore(existing)
+        progress_bar = DummyProgressBar()
+        store.embed_and_store_chunks(
+            chunks,
+            batch_size=5,
+            progress_bar=progress_bar,
+            max_concurrency=max_concurrency,
+            resume=True,
+        )
+        assert sorted(store.embedded) == sorted(c["text"] for c in chunks[12:])
+        assert progress_bar.calls[-1] == (1.0, "Embedding complete!")
+
+
+def test_document_list_is_cached_until_invalidated():
+    class RegistryStore(FakeStore):
+        def __init__(self):
+            super().__init__()
+            self._init_state()
+            self._document_cache.ttl = 60
+            self.fetches = 0
+
+        def _fetch_document_registry(self):
+            self.fetches += 1
+            return [{"doc_id": "doc", "filename": "doc.pdf"}]
+
+    store = RegistryStore()
+    assert store.get_indexed_documents() == [("doc", "doc.pdf")]
+    assert store.get_indexed_document_ids() == ["doc"]
+    assert store.fetches == 1
+
+    store.invalidate_document_cache()
+    store.get_indexed_documents()
+    assert store.fetches == 2
+
+    store._document_cache.ttl = 0
+    store.get_indexed_documents()
+    assert store.fetches == 3
+
+
+def test_document_list_fetched_during_a_change_is_not_cached():
+    from app.vectorstore import DocumentListCache
+
+    cache = DocumentListCache(ttl=60)
+    documents, generation = cache.get()
+    assert documents is None
+    cache.invalidate()
+    cache.put([{"doc_id": "stale"}], generation)
+    assert cache.get()[0] is None
+
+    documents, generation = cache.get()
+    cache.put([{"doc_id": "doc"}], generation)
+    assert cache.get()[0] == [{"doc_id": "doc"}]
+
+
+def test_cache_hits_and_fresh_embeddings_are_merged_in_order():
+    from app.vectorstore import merge_embeddings, uncached_texts
+
+    texts = ["a", "b", "c", "b"]
+    cached = {0: [1.0], 2: [3.0]}
+    missing = uncached_texts(texts, cached)
+    assert missing == ["b"]
+    assert merge_embeddings(texts, cached, missing, [[2.0]]) == [[1.0], [2.0], [3.0], [2.0]]
+
+
+def test_onnx_mean_pooling_ignores_padding():
+    import numpy as np
+    from app.embedders import OnnxEmbedder
+
+    token_embeddings = np.array([[[3.0, 4.0], [100.0, 100.0]]])
+    attention_mask = np.array([[1, 0]])
+    pooled = OnnxEmbedder._mean_pool(token_embeddings, attention_mask)
+    assert np.allclose(pooled, [[0.6, 0.8]])
+
+
+def test_onnx_cache_key_depends_on_model_contents(tmp_path):
+    from app.embedders import _files_digest
+
+    first = tmp_path / "a" / "model.onnx"
+    second = tmp_path / "b" / "model.onnx"
+    first.parent.mkdir()
+    second.parent.mkdir()
+    first.write_bytes(b"weights one")
+    second.write_bytes(b"weights two")
+
+    assert _files_digest([str(first)]) != _files_digest([str(second)])
+    assert _files_digest([str(first)]) == _files_digest([str(first)])
+
+
+def test_existing_collection_must_match_embedder_dimension():
+    from types import SimpleNamespace
+
+    from app.collection_config import check_vector_size
+
+    info = SimpleNamespace(
+        config=SimpleNamespace(params=SimpleNamespace(vectors=SimpleNamespace(size=1536)))
+    )
+    check_vector_size(info, 1536, "docs")
+    with pytest.raises(ValueError, match="1536-dimensional"):
+        check_vector_size(info, 384, "docs")